@@ -1,12 +1,22 @@
-import dataclasses
 from   dataclasses import dataclass
 from   dataclasses import field
 from   dataclasses import fields
 from   collections import deque
+import time
 import numpy as np
 from   numpy.typing import NDArray
 from   typing import Callable
 
+from   .pyramid import TracePyramid
+from   .updatesignal import UpdateSignal
+
+
+# initial number of points preallocated per trace column, and the factor by which full columns are grown
+TRACE_INIT_CAPACITY = 1024
+TRACE_GROWTH_FACTOR = 2
+# the per-layer statistics (see LayerStatsTracker), in this order, and the number of tracked steps that are kept
+LAYER_STATS         = ["grad norm", "weight norm", "update ratio"]
+LAYER_RING_CAPACITY = 512
 
 @dataclass
 class ProcsData:
@@ -14,34 +24,349 @@ class ProcsData:
     t0:    float = None
     t1:    float = None
    
+@dataclass(frozen=True)
+class TraceSnapshot:
+    """ consistent, read-only view of one trace at one point in time. the column views are zero-copy and all cut at the
+    same published length, ymin / ymax belong to exactly that length """
+    
+    x:      NDArray
+    y:      NDArray
+    ylo:    NDArray | None
+    yhi:    NDArray | None
+    ymin:   float
+    ymax:   float
+    length: int
+    # versions of the running min / max, increase with every append / extend that set a new min / max
+    yminver: int
+    ymaxver: int
+
+@dataclass
+class TraceCursor:
+    """ reader side state of one trace for one viewer: how far its figure is filled and which min / max versions it 
+    has already shown. every reader (browser session) needs its own cursor, the trace data itself is shared """
+    
+    # last raw index (or downsampled grid index) that was sent to the figure
+    chkp:          int = -1
+    yminver_seen:  int = 0
+    ymaxver_seen:  int = 0
+    
+    def consume_minmax(self, snap: TraceSnapshot) -> tuple[bool, bool]:
+        """ replacement for a "new min / max" flag. returns whether the snapshot has a newer min / max than what was
+        consumed before. the writer never resets anything, so no update can get lost """
+        
+        hasNewMin = snap.yminver > self.yminver_seen
+        hasNewMax = snap.ymaxver > self.ymaxver_seen
+        self.yminver_seen = max(self.yminver_seen, snap.yminver)
+        self.ymaxver_seen = max(self.ymaxver_seen, snap.ymaxver)
+        return hasNewMin, hasNewMax
+
+class GraphCursors(list):
+    """ the TraceCursors of one viewer for all traces of one graph. also keeps the write counts of the traces 
+    (GraphStore.trc_writes) that the viewer has already looked at, so that the traces without new data are found with one
+    vectorized comparison, instead of snapshotting and checking every trace on every update. also keeps the y ranges
+    that were last sent to the viewer's figure ((n_axes, 2), None before the first one) """
+    
+    def __init__(self, n_traces: int):
+        super().__init__(TraceCursor() for _ in range(n_traces))
+        self.writes_seen = np.zeros(n_traces, dtype=np.int64)
+        self.yrange_sent = None
+    
+    def take_pending(self, g_store: "GraphStore") -> list[int]:
+        """ numbers of the traces that were written to since the last call, which are marked as seen right away. has to
+        be called before the traces are read, so that nothing can be missed """
+        
+        writes  = g_store.trc_writes.copy()
+        pending = np.flatnonzero(writes != self.writes_seen)
+        self.writes_seen[pending] = writes[pending]
+        return pending.tolist()
+
 @dataclass
 class TraceData():
-    # the main x and y data of this trace
-    x:       list  = field(default_factory=list)
-    y:       list  = field(default_factory=list)
+    """ columnar, append-only storage for one trace. all columns are preallocated float64 buffers that grow
+    geometrically, only the first `length` entries are valid. access the data through the zero-copy views """
+    
+    # the raw column buffers, everything past `length` is uninitialized memory
+    _x:      NDArray = field(default_factory=lambda: np.empty(TRACE_INIT_CAPACITY, dtype=np.float64))
+    _y:      NDArray = field(default_factory=lambda: np.empty(TRACE_INIT_CAPACITY, dtype=np.float64))
+    # errorband buffers, optional (only allocated with add_errorband)
+    _ylo:    NDArray = None
+    _yhi:    NDArray = None
+    # valid-length watermark of all the column buffers (always written last when appending)
+    length:  int     = 0
+    
     # stores the "range of y"
     ymin:    float = float("inf")
     ymax:    float = float("-inf")
-    # stores if a new min or max was added to the y data (can probably be integrated better)
-    ynewmin: bool  = False
-    ynewmax: bool  = False
+    # count every new min or max that was added to the y data. only ever written by the writer (add_data) 
+    yminver: int   = 0
+    ymaxver: int   = 0
     
-    # errorband, optional, check that nothing actually depends on this being optional! is easier if just inited
-    ylo:     list  = None
-    yhi:     list  = None
+    # seqlock counter: odd while the writer is modifying the trace, even when all fields are consistent
+    _seq:    int   = 0
+    # cursor for the simple single reader case. (the dashboard keeps one cursor per browser session instead)
+    _cursor: TraceCursor = field(default_factory=TraceCursor)
     
     # optional before, downsampled x range. maybe cached property?
     xdown:   NDArray = None
     
+    # level-of-detail pyramids per column name ("y", "ylo", "yhi"), only created and built by the readers on demand
+    _pyramids: dict  = field(default_factory=dict)
+    
+    # graph store (and number within it) whose write counter is bumped after every publish, see GraphStore.trc_writes
+    _parent:   "GraphStore" = field(default=None, repr=False, compare=False)
+    _trace_nr: int          = None
+    
+    @property
+    def x(self) -> NDArray:
+        return self._x[:self.length]
+    
+    @property
+    def y(self) -> NDArray:
+        return self._y[:self.length]
+    
+    @property
+    def ylo(self) -> NDArray | None:
+        return None if self._ylo is None else self._ylo[:self.length]
+    
+    @property
+    def yhi(self) -> NDArray | None:
+        return None if self._yhi is None else self._yhi[:self.length]
+    
+    @property
+    def capacity(self) -> int:
+        return self._x.shape[0]
+    
+    def views(self, length: int) -> tuple[NDArray, NDArray, NDArray | None, NDArray | None]:
+        """ zero-copy views of all columns, cut at a length that was "frozen" by the caller beforehand. (use this
+        instead of the single properties when reading while data is appended, so that all columns match) """
+        
+        ylo = None if self._ylo is None else self._ylo[:length]
+        yhi = None if self._yhi is None else self._yhi[:length]
+        return self._x[:length], self._y[:length], ylo, yhi
+    
+    def snapshot(self) -> TraceSnapshot:
+        """ lock-free consistent read of the whole trace (seqlock reader side). retries if the writer was active in 
+        between, never blocks the writer. works without copying because points below the published length are never
+        modified again and old buffers stay valid after a reallocation """
+        
+        while True:
+            seq_start = self._seq
+            if seq_start & 1: # writer is in the middle of an append, let it finish
+                time.sleep(0)
+                continue
+            
+            length  = self.length
+            cols    = self.views(length)
+            ymin    = self.ymin
+            ymax    = self.ymax
+            yminver = self.yminver
+            ymaxver = self.ymaxver
+            
+            if self._seq == seq_start:
+                return TraceSnapshot(*cols, ymin, ymax, length, yminver, ymaxver)
+    
+    def consume_minmax(self, snap: TraceSnapshot) -> tuple[bool, bool]:
+        """ single reader version of TraceCursor.consume_minmax """
+        
+        return self._cursor.consume_minmax(snap)
+    
+    def pyramid(self, column: str) -> TracePyramid:
+        """ the (lazily created) min / max pyramid of one column, for zoom-aware level-of-detail queries """
+        
+        if column not in self._pyramids:
+            self._pyramids.setdefault(column, TracePyramid()) # setdefault, so that racing readers share one pyramid
+        return self._pyramids[column]
+    
+    def _register_parent(self, parent: "GraphStore", trace_nr: int):
+        self._parent   = parent
+        self._trace_nr = trace_nr
+    
+    def _count_write(self):
+        # after the seqlock is even again, so a reader that sees the new count also gets the new data (and the axis min
+        # / max of the graph that includes it)
+        if self._parent is not None:
+            self._parent._fold_minmax(self._trace_nr, self.ymin, self.ymax)
+            self._parent.trc_writes[self._trace_nr] += 1
+    
     def add_xdown(self, totalx: int, nxdown: int):
         self.xdown = np.linspace(0, totalx, nxdown)
         return
        
     def add_errorband(self):
-        self.ylo = []
-        self.yhi = []
+        self._ylo = np.empty(self.capacity, dtype=np.float64)
+        self._yhi = np.empty(self.capacity, dtype=np.float64)
+        return
+    
+    def attach_columns(
+        self, 
+        x:    NDArray, 
+        y:    NDArray, 
+        ylo:  NDArray = None, 
+        yhi:  NDArray = None, 
+        ymin: float   = float("inf"), 
+        ymax: float   = float("-inf"),
+    ):
+        """ uses existing, completely filled columns instead of the own buffers (e.g. read-only memory maps of a run log
+        for replay). nothing is copied, appending later on moves everything to new buffers like a regular growth """
+        
+        self._seq += 1 # odd: write in progress
+        try:
+            self._x = x
+            self._y = y
+            if self._ylo is not None:
+                self._ylo = y if ylo is None else ylo
+                self._yhi = y if yhi is None else yhi
+            self.length = len(x)
+            
+            # attached again with longer columns (a run log that is followed), only a changed range is a new min / max
+            if ymin != self.ymin:
+                self.ymin     = ymin
+                self.yminver += 1
+            if ymax != self.ymax:
+                self.ymax     = ymax
+                self.ymaxver += 1
+        finally:
+            self._seq += 1 # even: consistent again
+        self._count_write()
+        return
+    
+    def _grow(self, min_capacity: int):
+        """ reallocates all column buffers with (at least) geometrically increased capacity. the old buffers are not
+        touched, so views that were handed out before stay valid """
+        
+        new_capacity = max(min_capacity, TRACE_GROWTH_FACTOR * self.capacity)
+        for name in ("_x", "_y", "_ylo", "_yhi"):
+            old_buf = getattr(self, name)
+            if old_buf is None:
+                continue
+            new_buf = np.empty(new_capacity, dtype=np.float64)
+            new_buf[:self.length] = old_buf[:self.length]
+            setattr(self, name, new_buf)
+        return
+    
+    def append(self, x: float, y: float, ylo: float = None, yhi: float = None):
+        """ appends one point (and optionally its absolute errorband values) and tracks the running min / max. only one
+        thread is allowed to write to a trace (seqlock writer side) """
+        
+        self._seq += 1 # odd: write in progress
+        try:
+            idx = self.length
+            if idx == self.capacity:
+                self._grow(idx + 1)
+            
+            self._x[idx] = x
+            self._y[idx] = y
+            # errorband columns need an entry for every point, default to a zero-width band if no values are given
+            if self._ylo is not None:
+                self._ylo[idx] = y if ylo is None else ylo
+                self._yhi[idx] = y if yhi is None else yhi
+            
+            # only publish the new point after all columns have been written
+            self.length = idx + 1
+            
+            # track the running max / min to avoid taking min / max over all data
+            if y < self.ymin:
+                self.ymin     = float(y)
+                self.yminver += 1
+            if y > self.ymax:
+                self.ymax     = float(y)
+                self.ymaxver += 1
+        finally:
+            self._seq += 1 # even: consistent again
+        self._count_write()
+        return
+    
+    def extend(self, x: NDArray, y: NDArray, ylo: NDArray = None, yhi: NDArray = None):
+        """ vectorized version of append for 1D arrays of equal length. copies the whole batch into the columns in one
+        go and updates the running min / max with a single reduction each """
+        
+        n_new = x.shape[0]
+        if n_new == 0:
+            return
+        
+        self._seq += 1 # odd: write in progress
+        try:
+            idx = self.length
+            if idx + n_new > self.capacity:
+                self._grow(idx + n_new)
+            
+            self._x[idx:idx+n_new] = x
+            self._y[idx:idx+n_new] = y
+            # errorband columns need an entry for every point, default to a zero-width band if no values are given
+            if self._ylo is not None:
+                self._ylo[idx:idx+n_new] = y if ylo is None else ylo
+                self._yhi[idx:idx+n_new] = y if yhi is None else yhi
+            
+            # only publish the new points after all columns have been written
+            self.length = idx + n_new
+            
+            # fmin / fmax ignore NaNs (like the scalar comparisons in append do), unless the batch is all NaN
+            batch_min = float(np.fmin.reduce(y))
+            batch_max = float(np.fmax.reduce(y))
+            if batch_min < self.ymin:
+                self.ymin     = batch_min
+                self.yminver += 1
+            if batch_max > self.ymax:
+                self.ymax     = batch_max
+                self.ymaxver += 1
+        finally:
+            self._seq += 1 # even: consistent again
+        self._count_write()
         return
 
+@dataclass
+class LayerStatsData:
+    """ the per-layer statistics (LAYER_STATS) of the last `capacity` tracked steps, as one compact (step x stat x layer)
+    float32 ring buffer. one writer, lock-free readers (seqlock like TraceData, but rows get overwritten, so the readers
+    copy what they read) """
+    
+    # one name per layer (parameter tensor), in the order of the values
+    names:    list[str]
+    capacity: int     = LAYER_RING_CAPACITY
+    # total number of steps ever written, the newest one is at (count - 1) % capacity
+    count:    int     = 0
+    
+    _steps:   NDArray = None
+    _values:  NDArray = None
+    _seq:     int     = 0
+    
+    def __post_init__(self):
+        self._steps  = np.zeros(self.capacity, dtype=np.int64)
+        self._values = np.zeros((self.capacity, len(LAYER_STATS), len(self.names)), dtype=np.float32)
+    
+    def extend(self, steps: NDArray, values: NDArray):
+        """ appends n steps with their (n, stat, layer) values, only the last capacity of them if there are more """
+        
+        n_new  = min(len(steps), self.capacity)
+        rows   = (self.count + len(steps) - n_new + np.arange(n_new)) % self.capacity
+        self._seq += 1 # odd: write in progress
+        try:
+            self._steps[rows]  = steps[-n_new:]
+            self._values[rows] = values[-n_new:]
+            self.count += len(steps)
+        finally:
+            self._seq += 1 # even: consistent again
+        return
+    
+    def read(self, since: int) -> tuple[int, NDArray, NDArray]:
+        """ copies of the steps that were written after the first `since` ones (at most the last capacity): (index of the
+        first returned step, steps, (n, stat, layer) values) """
+        
+        while True:
+            seq_start = self._seq
+            if seq_start & 1:
+                time.sleep(0)
+                continue
+            
+            count  = self.count
+            start  = max(since, count - self.capacity)
+            rows   = np.arange(start, count) % self.capacity
+            steps  = self._steps[rows]
+            values = self._values[rows]
+            
+            if self._seq == seq_start:
+                return start, steps, values
+
 @dataclass
 class BaseHandle2Id:
     """ generic id registry. gives plotly element numbers (given out sequentially) a nice handle for convenience """
@@ -87,6 +412,13 @@ class GraphStore:
     trc_data: list[TraceData] = field(default_factory=list)
     trc_t2id: list[TraceT2Id] = field(default_factory=list)
     trc_a2id: list[TraceA2Id] = field(default_factory=list)
+    # number of publishes per trace (append / extend / attach_columns), lets the readers skip all unchanged traces at once
+    trc_writes: NDArray       = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    # y axis of every trace (0 primary, 1 secondary) and the min / max over all traces of each axis, kept up to date on
+    # ingest. the mins of the traces only ever decrease and the maxes only increase, so running values are exact
+    trc_axis:   NDArray       = field(default_factory=lambda: np.zeros(0, dtype=np.int8))
+    axis_ymin:  NDArray       = field(default_factory=lambda: np.full(2, np.inf))
+    axis_ymax:  NDArray       = field(default_factory=lambda: np.full(2, -np.inf))
     
     _plotly_trace_counter: int = 0
     _plotly_annot_counter: int = 0
@@ -101,8 +433,18 @@ class GraphStore:
         self._plotly_annot_counter += 1
         return temp_counter
     
-    def add_trc_data(self, new_trc_data: TraceData):
+    def add_trc_data(self, new_trc_data: TraceData, yaxis: str = "primary"):
+        new_trc_data._register_parent(self, len(self.trc_data))
         self.trc_data.append(new_trc_data)
+        self.trc_writes = np.append(self.trc_writes, 0)
+        self.trc_axis   = np.append(self.trc_axis, np.int8(yaxis == "secondary"))
+    
+    def _fold_minmax(self, trace_nr: int, ymin: float, ymax: float):
+        axis = self.trc_axis[trace_nr]
+        if ymin < self.axis_ymin[axis]:
+            self.axis_ymin[axis] = ymin
+        if ymax > self.axis_ymax[axis]:
+            self.axis_ymax[axis] = ymax
     
     def add_trc_t2id(self):
         new_t2id = TraceT2Id()
@@ -116,14 +458,24 @@ class GraphStore:
     
 @dataclass
 class Store:
-    # for storing the graph main data
-    graph1: GraphStore = field(default_factory=GraphStore)
-    graph2: GraphStore = field(default_factory=GraphStore)
-    graph3: GraphStore = field(default_factory=GraphStore)
+    # for storing the graph main data, one GraphStore per graph of the config (same names, "graph1", "graph2", ...)
+    graphs: dict[str, GraphStore] = field(default_factory=dict)
     
     # for storing everything procesing speed related
     procs: ProcsData   = field(default_factory=ProcsData)
     
     # torchinfo model summary string, can be overwritten if available
     msummary: str      = "no information available"
-
+    
+    # per-layer statistics over the steps, only with layer tracking (DashPlotter(layer_stats=...))
+    layers: LayerStatsData = None
+    
+    # notifies the dashboard about newly published data (push mode)
+    signal: UpdateSignal = field(default_factory=UpdateSignal)
+    
+    def __getattr__(self, name: str) -> GraphStore:
+        # store.graph1, ... (only called for names that are not regular attributes)
+        graphs = self.__dict__.get("graphs", {})
+        if name in graphs:
+            return graphs[name]
+        raise AttributeError(f"store has no {name}!")
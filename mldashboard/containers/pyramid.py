@@ -0,0 +1,147 @@
+import threading
+
+import numpy as np
+from   numpy.typing import NDArray
+
+
+# every pyramid level aggregates PYRAMID_FANOUT blocks (or raw points) of the level below
+PYRAMID_FANOUT = 4
+
+
+class _PyramidLevel:
+    """ growable columns of one pyramid level, one entry per block """
+
+    COLUMNS = ("xmin", "ymin", "xmax", "ymax")
+
+    def __init__(self):
+        self.length = 0
+        self.cols   = {name: np.empty(64, dtype=np.float64) for name in self.COLUMNS}
+
+    def extend(self, new_cols: dict[str, NDArray]):
+        n_new = len(new_cols["xmin"])
+        if self.length + n_new > len(self.cols["xmin"]):
+            new_capacity = max(self.length + n_new, 2 * len(self.cols["xmin"]))
+            for name, buf in self.cols.items():
+                new_buf = np.empty(new_capacity, dtype=np.float64)
+                new_buf[:self.length] = buf[:self.length]
+                self.cols[name] = new_buf
+        for name in self.COLUMNS:
+            self.cols[name][self.length:self.length+n_new] = new_cols[name]
+        self.length += n_new
+
+    def view(self, name: str, start: int, stop: int) -> NDArray:
+        return self.cols[name][start:stop]
+
+
+class TracePyramid:
+    """ incrementally built min / max pyramid over one y column of a trace, for level-of-detail queries. level k
+    holds blocks of PYRAMID_FANOUT**(k+1) raw points. the pyramid is only built by the readers (catches up with the raw
+    data on every query), so it costs the writer nothing. update and query are guarded by a lock, because several
+    dash worker threads can query at the same time """
+
+    def __init__(self):
+        self.levels: list[_PyramidLevel] = []
+        self._lock  = threading.Lock()
+
+    def update(self, x: NDArray, y: NDArray):
+        """ aggregates all raw points / blocks that completed since the last update (x, y: consistent raw views) """
+
+        with self._lock:
+            self._update(x, y)
+
+    def _update(self, x: NDArray, y: NDArray):
+        # level 0 from the raw data
+        k = 0
+        n_done_below = len(x) // PYRAMID_FANOUT
+        while n_done_below > 0:
+            if k == len(self.levels):
+                self.levels.append(_PyramidLevel())
+            level = self.levels[k]
+            if n_done_below <= level.length:
+                break
+
+            start, stop = level.length * PYRAMID_FANOUT, n_done_below * PYRAMID_FANOUT
+            if k == 0:
+                level.extend(self._aggregate_raw(x[start:stop], y[start:stop]))
+            else:
+                level.extend(self._aggregate_blocks(self.levels[k-1], start, stop))
+
+            n_done_below = level.length // PYRAMID_FANOUT
+            k += 1
+
+    @staticmethod
+    def _aggregate_raw(x: NDArray, y: NDArray) -> dict[str, NDArray]:
+        xb = x.reshape(-1, PYRAMID_FANOUT)
+        yb = y.reshape(-1, PYRAMID_FANOUT)
+        finite  = ~np.isnan(yb)
+        idx_min = np.argmin(np.where(finite, yb,  np.inf), axis=1)
+        idx_max = np.argmax(np.where(finite, yb, -np.inf), axis=1)
+        rows    = np.arange(len(yb))
+        return {
+            "xmin": xb[rows, idx_min],
+            "ymin": yb[rows, idx_min],
+            "xmax": xb[rows, idx_max],
+            "ymax": yb[rows, idx_max],
+        }
+
+    @staticmethod
+    def _aggregate_blocks(below: _PyramidLevel, start: int, stop: int) -> dict[str, NDArray]:
+        cols    = {name: below.view(name, start, stop).reshape(-1, PYRAMID_FANOUT) for name in below.COLUMNS}
+        # all-NaN blocks carry NaN as min / max, they must not win against real values
+        idx_min = np.argmin(np.where(np.isnan(cols["ymin"]),  np.inf, cols["ymin"]), axis=1)
+        idx_max = np.argmax(np.where(np.isnan(cols["ymax"]), -np.inf, cols["ymax"]), axis=1)
+        rows    = np.arange(len(cols["ymin"]))
+        return {
+            "xmin": cols["xmin"][rows, idx_min],
+            "ymin": cols["ymin"][rows, idx_min],
+            "xmax": cols["xmax"][rows, idx_max],
+            "ymax": cols["ymax"][rows, idx_max],
+        }
+
+    def query(self, x: NDArray, y: NDArray, i_start: int, i_stop: int, npix: int) -> tuple[NDArray, NDArray]:
+        """ min / max envelope of the raw index range [i_start, i_stop) with about npix blocks, in O(npix) no matter how
+        long the history is. every block contributes its min and max point (in x order), parts of the range that are
+        not covered by complete blocks of the chosen level are filled in with finer levels and finally raw points """
+
+        with self._lock:
+            self._update(x, y)
+
+            # finest level with at most npix blocks in the range (-1 is the raw data itself)
+            k = -1
+            while (k + 1 < len(self.levels)) and ((i_stop - i_start) / PYRAMID_FANOUT**(k+1) > npix):
+                k += 1
+
+            xs, ys = [], []
+            self._collect(x, y, i_start, i_stop, k, xs, ys)
+
+        if len(xs) == 0:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(xs), np.concatenate(ys)
+
+    def _collect(self, x: NDArray, y: NDArray, i_start: int, i_stop: int, k: int, xs: list, ys: list):
+        if i_stop <= i_start:
+            return
+        if k < 0:
+            xs.append(x[i_start:i_stop])
+            ys.append(y[i_start:i_stop])
+            return
+
+        # blocks of level k that lie completely within the range
+        size    = PYRAMID_FANOUT**(k+1)
+        level   = self.levels[k]
+        b_start = -(-i_start // size)
+        b_stop  = min(i_stop // size, level.length)
+        if b_stop <= b_start:
+            self._collect(x, y, i_start, i_stop, k-1, xs, ys)
+            return
+
+        # head (finer), complete blocks, tail (finer)
+        self._collect(x, y, i_start, b_start*size, k-1, xs, ys)
+
+        xmin, ymin = level.view("xmin", b_start, b_stop), level.view("ymin", b_start, b_stop)
+        xmax, ymax = level.view("xmax", b_start, b_stop), level.view("ymax", b_start, b_stop)
+        min_first  = xmin <= xmax
+        xs.append(np.column_stack([np.where(min_first, xmin, xmax), np.where(min_first, xmax, xmin)]).reshape(-1))
+        ys.append(np.column_stack([np.where(min_first, ymin, ymax), np.where(min_first, ymax, ymin)]).reshape(-1))
+
+        self._collect(x, y, b_stop*size, i_stop, k-1, xs, ys)
@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+import time
+
+import h5py
+import numpy as np
+from   numpy.typing import NDArray
+
+from .setupconfig import Config, config_to_dict, config_from_dict
+
+
+# seconds between two writes of the background writer
+LOG_FLUSH_INTERVAL = 1.0
+# values per chunk of the columns while the log is written (float64, 128 kB)
+LOG_CHUNK          = 2**14
+# values per block when the finished log is copied to contiguous columns
+LOG_COPY_BLOCK     = 2**20
+# a log can be read while the writer is just creating or finishing it, the read is then tried again a few times
+LOG_READ_ATTEMPTS  = 5
+LOG_READ_RETRY     = 0.05
+
+
+def _column_names(errors: bool) -> list[str]:
+    return ["x", "y", "ylo", "yhi"] if errors is True else ["x", "y"]
+
+
+class RunLogWriter:
+    """ append-only on-disk log of one run (HDF5). one group per trace (graph<g>/trace<t>) with one column per value.
+    put() only queues the values, a background thread writes everything that was queued every LOG_FLUSH_INTERVAL
+    seconds and flushes the file, so a crash loses at most the last interval.
+
+    while the run goes on, the columns are chunked and resized as they grow (nothing is ever copied or left behind) and
+    the file is in SWMR mode (single writer, multiple readers), so it can be read (also by another process) at any time.
+    the number of complete values of a trace is published in its "length" dataset after all columns are written.
+    close() copies the columns to contiguous ones in a new file (block by block) and puts it in place of the old one,
+    with the min / max per trace: a finished log is memory-mapped on replay, a log that is still being written (or the
+    log of a crashed run) is read with h5py """
+
+    def __init__(self, path: str, CONFIG: Config, flush_interval: float = LOG_FLUSH_INTERVAL):
+        self.path    = path
+        self._config = json.dumps(config_to_dict(CONFIG))
+        self._file   = h5py.File(path, "w", libver="latest")
+        self._file.attrs["config"] = self._config
+
+        self._yrange = {} # (g_nr, t_nr): [min, max] of the values written so far
+        for g_name, G_CFG in config_to_dict(CONFIG).items():
+            for t_nr, t_cfg in enumerate(G_CFG["traces"]):
+                grp = self._file.create_group(f"{g_name}/trace{t_nr}")
+                grp.create_dataset("length", data=np.zeros(1, dtype=np.int64))
+                for name in _column_names(t_cfg["errors"]):
+                    grp.create_dataset(name, shape=(0,), maxshape=(None,), chunks=(LOG_CHUNK,), dtype="<f8")
+                self._yrange[(int(g_name.removeprefix("graph")), t_nr)] = [np.inf, -np.inf]
+        # no new objects from here on, only the columns grow
+        self._file.swmr_mode = True
+
+        self._pending      = []
+        self._pending_lock = threading.Lock()
+        self._file_lock    = threading.Lock()
+
+        self._stop   = threading.Event()
+        self._thread = threading.Thread(target=self._run_background, args=(flush_interval,), daemon=True)
+        self._thread.start()
+
+    def put(self, g_nr: int, t_nr: int, x: NDArray, y: NDArray, ylo: NDArray = None, yhi: NDArray = None):
+        """ queues values for one trace (scalars or 1D arrays, absolute errorband values or None) """
+
+        with self._pending_lock:
+            self._pending.append((g_nr, t_nr, x, y, ylo, yhi))
+
+    def flush(self):
+        """ writes everything that was queued so far and flushes the file """
+
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+
+        per_trace = {} # (g_nr, t_nr): [(x, y, ylo, yhi), ...], keeping the order
+        for g_nr, t_nr, *values in pending:
+            per_trace.setdefault((g_nr, t_nr), []).append(values)
+
+        with self._file_lock:
+            if self._file is None or len(per_trace) == 0:
+                return
+            for (g_nr, t_nr), batches in per_trace.items():
+                self._write_trace(self._file[f"graph{g_nr}/trace{t_nr}"], batches, self._yrange[(g_nr, t_nr)])
+            self._file.flush()
+
+    def close(self):
+        """ writes what is left and finishes the log (contiguous columns, see the class docstring) """
+
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        with self._file_lock:
+            if self._file is None:
+                return
+            self._file.close()
+            self._file = None
+            self._finish()
+
+    def _run_background(self, flush_interval: float):
+        while not self._stop.wait(flush_interval):
+            self.flush()
+
+    @staticmethod
+    def _write_trace(grp: h5py.Group, batches: list, yrange: list):
+        """ appends the values to the columns of one trace and updates its min / max """
+
+        x = np.concatenate([np.asarray(b[0], dtype=np.float64).reshape(-1) for b in batches])
+        y = np.concatenate([np.asarray(b[1], dtype=np.float64).reshape(-1) for b in batches])
+        if len(x) == 0:
+            return
+        columns = {"x": x, "y": y}
+        if "ylo" in grp:
+            # points without errorband values get a zero-width band (same as TraceData)
+            columns["ylo"] = np.concatenate([np.broadcast_to(b[1] if b[2] is None else b[2], np.shape(b[1])).reshape(-1)
+                                             for b in batches]).astype(np.float64)
+            columns["yhi"] = np.concatenate([np.broadcast_to(b[1] if b[3] is None else b[3], np.shape(b[1])).reshape(-1)
+                                             for b in batches]).astype(np.float64)
+
+        length = grp["x"].shape[0]
+        for name, values in columns.items():
+            grp[name].resize((length + len(x),))
+            grp[name][length:] = values
+        grp["length"][0] = length + len(x) # published after the values (a resized column is not written yet)
+        yrange[0] = min(yrange[0], float(np.fmin.reduce(y)))
+        yrange[1] = max(yrange[1], float(np.fmax.reduce(y)))
+
+    def _finish(self):
+        """ copies the log to contiguous columns (which can be memory-mapped) in a new file, that replaces the log """
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with h5py.File(self.path, "r") as src, h5py.File(tmp_path, "w", libver="latest") as dst:
+            dst.attrs["config"] = self._config
+            for (g_nr, t_nr), (ymin, ymax) in self._yrange.items():
+                src_grp = src[f"graph{g_nr}/trace{t_nr}"]
+                dst_grp = dst.create_group(src_grp.name)
+                dst_grp.attrs["ymin"] = ymin
+                dst_grp.attrs["ymax"] = ymax
+                for name, src_col in [(name, col) for name, col in src_grp.items() if name != "length"]:
+                    dst_col = dst_grp.create_dataset(name, shape=src_col.shape, dtype="<f8")
+                    for start in range(0, src_col.shape[0], LOG_COPY_BLOCK):
+                        dst_col[start:start+LOG_COPY_BLOCK] = src_col[start:start+LOG_COPY_BLOCK]
+            dst.attrs["finished"] = True
+        try:
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # (e.g. a reader that has the log open on windows) the log stays as it was written, it is only not mapped
+            os.remove(tmp_path)
+
+
+def _map_column(path: str, dset: h5py.Dataset) -> np.memmap | NDArray:
+    """ read-only memory map of a contiguous column of a finished log """
+
+    if dset.shape[0] == 0:
+        return np.empty(0, dtype=np.float64) # (no storage allocated)
+    return np.memmap(path, dtype="<f8", mode="r", offset=dset.id.get_offset(), shape=dset.shape)
+
+def load_run_log(path: str, since: dict = None) -> tuple[Config, dict]:
+    """ opens a run log for replay: returns the config and, per (graph nr, trace nr), the columns with their min / max.
+    the columns of a finished log are read-only memory maps (nothing is read until it is used), the ones of a log that
+    is still being written are read into memory. since {(graph nr, trace nr): number of values} only reads the values
+    after those (e.g. the ones a follower does not have yet, min / max are then the ones of the new values). a log that
+    is just being created or finished is read again, after LOG_READ_ATTEMPTS failed reads the last error is raised """
+
+    for attempt in range(LOG_READ_ATTEMPTS):
+        try:
+            return _load_run_log(path, since or {})
+        except FileNotFoundError:
+            raise
+        except Exception:
+            # (whatever h5py raises for a file that is not in SWMR mode yet or that is just being replaced)
+            if attempt == LOG_READ_ATTEMPTS - 1:
+                raise
+            time.sleep(LOG_READ_RETRY)
+
+def _load_run_log(path: str, since: dict) -> tuple[Config, dict]:
+    traces = {}
+    with h5py.File(path, "r", swmr=True) as file:
+        config   = json.loads(file.attrs["config"])
+        finished = bool(file.attrs.get("finished", False))
+        for g_name, G_CFG in config.items():
+            g_nr = int(g_name.removeprefix("graph"))
+            for t_nr, t_cfg in enumerate(G_CFG["traces"]):
+                grp   = file[f"{g_name}/trace{t_nr}"]
+                start = since.get((g_nr, t_nr), 0)
+                cols  = {"ylo": None, "yhi": None}
+                if finished and (start == 0):
+                    for name in _column_names(t_cfg["errors"]):
+                        cols[name] = _map_column(path, grp[name])
+                    ymin, ymax = float(grp.attrs["ymin"]), float(grp.attrs["ymax"])
+                else:
+                    # what the writer has published, and what all the columns have (another process only sees the new
+                    # sizes of the columns with the next flush)
+                    length = min(grp[name].shape[0] for name in _column_names(t_cfg["errors"]))
+                    length = length if finished else min(length, int(grp["length"][0]))
+                    for name in _column_names(t_cfg["errors"]):
+                        cols[name] = grp[name][start:max(start, length)]
+                    y          = cols["y"]
+                    ymin, ymax = np.inf, -np.inf
+                    if len(y) > 0:
+                        ymin, ymax = float(np.fmin.reduce(y)), float(np.fmax.reduce(y))
+                traces[(g_nr, t_nr)] = (cols, ymin, ymax)
+    return config_from_dict(config), traces
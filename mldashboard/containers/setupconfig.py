@@ -1,7 +1,16 @@
+import dataclasses
 from dataclasses import dataclass
 from functools import cached_property
 
 
+# available wire formats for the bulk trace data of a graph (GraphConfig.transport), with their typed array dtype
+TRANSPORTS = {
+    "json":     None,
+    "binary64": "f8",
+    "binary32": "f4",
+}
+
+
 @dataclass(frozen=True)
 class TraceConfig:
     """ each trace that's added to a graph will need these config params """
@@ -18,6 +27,19 @@ class TraceConfig:
     point: bool  = True
     # to control how the line is drawn. technically more possible but only linear and spline are nice {spline, linear}
     shape: str   = "spline"
+    # streaming statistics computed on ingest, each shown as an extra (derived) trace (see utils.streamstats)
+    # exponential moving average: false or the smoothing weight (tensorboard style, True is 0.9)
+    ema: bool | float        = False
+    # rolling mean with a +- std band: false or the window size in points (True is 100)
+    rolling: bool | int      = False
+    # P² quantiles, middle one as line with a band between the outer ones: false or (lo, mid, hi) (True is .1, .5, .9)
+    quantiles: bool | tuple  = False
+    # ingest-side aggregation into one mean point with an errorband per window, instead of caller computed yerrLo / yerrHi
+    # (implies errors): false or every N raw points (window) / x-buckets of this width (xbucket). band is the errorband
+    # of a window {std, minmax, quantiles}
+    window: bool | int       = False
+    xbucket: bool | float    = False
+    band: str                = "std"
     
     def _sanitize(self):
         raise NotImplementedError
@@ -43,7 +65,17 @@ class GraphConfig:
     totalx:  int
     # for downsampling the plots to a fixed resolution to conserve resources (false or some resolution) 
     nxdown:  bool | int = False
-    # flags to show one max or min value in the graph. can be none or ONE trace number for one of the options
+    # strategy used with nxdown {interp, m4, lttb}. interp is smoothest, m4 / lttb keep spikes (see utils.downsampling)
+    downsampling: str   = "interp"
+    # zoom-aware level of detail: false or the number of points served for the visible x range (~ screen resolution)
+    lod:     bool | int = False
+    # wire format of the trace data patches {json, binary64, binary32}. binary sends base64 typed arrays (dash.wire),
+    # binary32 only for the y values (x stays float64, exact for any step count)
+    transport: str      = "json"
+    # milliseconds between two updates of this graph (polling). slow graphs (validation, weight norms) can be updated less
+    # often. the dashboard polls at the rate of its fastest graph and backs off while there is no new data at all
+    update_interval: int = 500
+    # flags to show one max or min value in the graph. can be false or ONE trace, as "trace<nr>" or by its name
     showmax: bool | str = False 
     showmin: bool | str = False 
     # these are just the labels for the plot axes. x is for sure not optional, but still, they could be None
@@ -55,6 +87,17 @@ class GraphConfig:
     @cached_property
     def has_subplots(self):
         return any(tr.yaxis=="secondary" for tr in self.traces)
+    
+    def trace_nr(self, key: str) -> int:
+        """ number of the trace that key refers to, either "trace<nr>" (any number of digits) or the trace's name. only
+        meant for resolving the config once at startup, everything at runtime uses the numbers """
+        
+        names = [tr.name for tr in self.traces]
+        if key in names:
+            return names.index(key)
+        if isinstance(key, str) and key.startswith("trace") and key[5:].isdigit() and int(key[5:]) < len(self.traces):
+            return int(key[5:])
+        raise ValueError(f"trace has to be one of {{trace0 ... trace{len(self.traces)-1}, {', '.join(names)}}}! (got {key})")
 
         
     def _sanitize(self):
@@ -71,12 +114,59 @@ class GraphConfig:
             # subplots and showmin/showmax is exclusive!
         # )
 
-@dataclass(frozen=True)
 class Config:
-    graph1: GraphConfig
-    graph2: GraphConfig
-    graph3: GraphConfig
+    """ registry of all the graphs of the dashboard, any number of them. either positional Config(G_CFG_a, G_CFG_b, ...)
+    or named Config(graph1=..., graph2=..., ...), numbered from 1 without gaps. the number is the g_nr of add_data and
+    the name (e.g. CONFIG.graph2) is used for the store, the run logs and the dashboard ids """
+    
+    def __init__(self, *graphs: GraphConfig, **named_graphs: GraphConfig):
+        if (len(graphs) > 0) and (len(named_graphs) > 0):
+            raise ValueError("graphs have to be either all positional or all named!")
+        if len(named_graphs) > 0:
+            names = [f"graph{g_nr}" for g_nr in range(1, len(named_graphs) + 1)]
+            if set(named_graphs) != set(names):
+                raise ValueError(f"graphs have to be named graph1 ... graph{len(named_graphs)}! (got {list(named_graphs)})")
+            graphs = [named_graphs[name] for name in names]
+        if len(graphs) == 0:
+            raise ValueError("a config needs at least one graph!")
+        
+        self._graphs: dict[str, GraphConfig] = {f"graph{g_nr}": G_CFG for g_nr, G_CFG in enumerate(graphs, start=1)}
+    
+    @property
+    def graphs(self) -> dict[str, GraphConfig]:
+        """ graph name: graph config, in order """
+        return self._graphs
+    
+    def __getattr__(self, name: str) -> GraphConfig:
+        # CONFIG.graph1, ... (only called for names that are not regular attributes)
+        graphs = self.__dict__.get("_graphs", {})
+        if name in graphs:
+            return graphs[name]
+        raise AttributeError(f"config has no {name}!")
+    
+    def __len__(self) -> int:
+        return len(self._graphs)
+    
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Config) and (self._graphs == other._graphs)
+    
+    def __repr__(self) -> str:
+        return f"Config({', '.join(f'{g_name}={G_CFG!r}' for g_name, G_CFG in self._graphs.items())})"
     
     def sanitize(self):
         ...
-        # TODO ipmlement
\ No newline at end of file
+        # TODO ipmlement
+
+
+def config_to_dict(CONFIG: Config) -> dict:
+    """ plain (json serializable) version of a full config, e.g. for storing it with a run log """
+    
+    return {g_name: dataclasses.asdict(G_CFG) for g_name, G_CFG in CONFIG.graphs.items()}
+
+def config_from_dict(cfg: dict) -> Config:
+    """ inverse of config_to_dict """
+    
+    return Config(**{
+        g_name: GraphConfig(**{**g_cfg, "traces": [TraceConfig(**t_cfg) for t_cfg in g_cfg["traces"]]})
+        for g_name, g_cfg in cfg.items()
+    })
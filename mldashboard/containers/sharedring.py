@@ -0,0 +1,133 @@
+import struct
+import threading
+from   multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+from   numpy.typing import NDArray
+
+
+# number of records the ring holds by default (6 float64 each, ~12.5 MB). the reader drains it many times per second
+RING_CAPACITY = 2**18
+# record layout: graph number (0 for processing speed records, -1 for layer statistics), trace number, x, y, ylo, yhi 
+# (NaN without errorband)
+RING_COLUMNS  = ("g_nr", "t_nr", "x", "y", "ylo", "yhi")
+_HEADER_BYTES = 64
+_RECORD       = struct.Struct(f"{len(RING_COLUMNS)}d")
+_COUNT        = struct.Struct("q")
+# byte offsets of the two counters in the header (see SharedRingBuffer.__init__)
+_END_OFFSET   = 0
+_START_OFFSET = 24
+
+
+class SharedRingBuffer:
+    """ ring buffer of fixed size float64 records in a multiprocessing.shared_memory block, used to get the logged values
+    from the training process to the dashboard process without pickling anything. one reading process, the writing
+    threads of the creating process are serialized with a lock (e.g. training loop and deferred transfer thread). the
+    writer never waits for the reader: if the reader falls behind by more than the capacity, the oldest records are 
+    overwritten and the reader counts them as dropped. like a seqlock, the writer reserves the records it is about to
+    write (start counter) before touching them and publishes them (end counter) afterwards, so the reader can tell the
+    records it copied while they were overwritten from the valid ones. the creator can leave some metadata (e.g. the
+    config) behind the records, for readers that attach by name only """
+
+    def __init__(self, capacity: int = RING_CAPACITY, name: str = None, meta: bytes = b"", track: bool = True):
+        """
+        Args:
+            capacity: number of records, only used when creating a new block
+            name    : attach to an existing block (reader side) instead of creating a new one (writer side)
+            meta    : metadata behind the records, only used when creating a new block
+            track   : False for readers that are not children of the creating process (e.g. mldashboard-view), so that
+                      their resource tracker does not free the block when they exit
+        """
+
+        self._owner = name is None
+        if self._owner:
+            n_bytes  = _HEADER_BYTES + capacity * len(RING_COLUMNS) * 8 + len(meta)
+            self.shm = shared_memory.SharedMemory(create=True, size=n_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            if track is False:
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        # header: total number of records ever written (end counter, only the writer updates it, after the records), 
+        # capacity, number of metadata bytes, total number of records ever reserved (start counter, updated by the
+        # writer before the records)
+        self._header = np.ndarray((4,), dtype=np.int64, buffer=self.shm.buf)
+        if self._owner:
+            self._header[:] = [0, capacity, len(meta), 0]
+        self.capacity = int(self._header[1])
+        meta_offset   = _HEADER_BYTES + self.capacity * len(RING_COLUMNS) * 8
+        if self._owner:
+            self.shm.buf[meta_offset:meta_offset+len(meta)] = meta
+        self.meta     = bytes(self.shm.buf[meta_offset:meta_offset+int(self._header[2])])
+        self._records = np.ndarray(
+            (self.capacity, len(RING_COLUMNS)), dtype=np.float64, buffer=self.shm.buf, offset=_HEADER_BYTES
+        )
+        self._write_lock = threading.Lock()
+
+        # reader side state
+        self._n_read = 0
+        self.dropped = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def append(self, g_nr: int, t_nr: int, x: float, y: float, ylo: float = np.nan, yhi: float = np.nan):
+        # struct instead of numpy for single records, about 4x cheaper per call
+        with self._write_lock:
+            n_written = _COUNT.unpack_from(self.shm.buf, _END_OFFSET)[0]
+            offset    = _HEADER_BYTES + (n_written % self.capacity) * _RECORD.size
+            _COUNT.pack_into(self.shm.buf, _START_OFFSET, n_written + 1) # reserve before the slot is touched
+            _RECORD.pack_into(self.shm.buf, offset, g_nr, t_nr, x, y, ylo, yhi)
+            _COUNT.pack_into(self.shm.buf, _END_OFFSET, n_written + 1) # publish after the record is complete
+
+    def extend(self, g_nr: int, t_nr: int, x: NDArray, y: NDArray, ylo: NDArray = None, yhi: NDArray = None):
+        """ vectorized append of a whole batch of one trace (1D arrays of equal length) """
+
+        n_new = min(len(x), self.capacity) # more than the capacity would only overwrite itself
+        cols  = [g_nr, t_nr, x[-n_new:], y[-n_new:]]
+        cols += [np.nan, np.nan] if ylo is None else [ylo[-n_new:], yhi[-n_new:]]
+
+        with self._write_lock:
+            n_written = int(self._header[0])
+            start     = (n_written + len(x) - n_new) % self.capacity
+            first     = min(n_new, self.capacity - start) # records until the end of the buffer, the rest wraps around
+            self._header[3] = n_written + len(x) # reserve before the slots are touched
+            for c, col in enumerate(cols):
+                col = np.broadcast_to(col, (n_new,))
+                self._records[start:start+first, c] = col[:first]
+                self._records[:n_new-first, c]      = col[first:]
+            self._header[0] = n_written + len(x)
+
+    def read(self) -> NDArray:
+        """ copy of all records written since the last read (reader side), in write order """
+
+        n_written = int(self._header[0])
+        if n_written - self._n_read > self.capacity:
+            self.dropped += n_written - self._n_read - self.capacity
+            self._n_read  = n_written - self.capacity
+
+        idx     = np.arange(self._n_read, n_written)
+        records = self._records[idx % self.capacity] # fancy indexing copies
+
+        # records the writer has (started to) overwrite(n) while they were copied are not valid anymore: every record
+        # whose slot is within the capacity of the reserved end
+        n_reserved = int(self._header[3])
+        n_invalid  = min(len(records), max(0, n_reserved - self.capacity - self._n_read))
+        if n_invalid > 0:
+            self.dropped += n_invalid
+            records = records[n_invalid:]
+
+        self._n_read = n_written
+        return records
+
+    def close(self):
+        """ detaches from the block, the creating side also frees it. (safe to call more than once) """
+
+        if self._records is None:
+            return
+        self._header  = None
+        self._records = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
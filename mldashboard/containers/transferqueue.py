@@ -0,0 +1,148 @@
+import threading
+from   typing import Any, Callable
+
+import numpy as np
+from   numpy.typing import NDArray
+import torch
+
+
+class TransferQueue:
+    """ deferred device-to-host transfer for logged values. put() only records the (detached) tensors without any device
+    sync. flush() moves everything that was queued to host in one transfer per device and folds it into the store
+    through the sink, one vectorized batch per trace. on cuda the copy is started asynchronously and only collected
+    (folded) with the next flush, so even the flush itself does not stall the training step """
+
+    def __init__(self, sink: Callable, flush_every: int = None, flush_interval: float = None):
+        """
+        Args:
+            sink          : called as sink(g_nr, t_nr, x, y, yerrLo, yerrHi) with flat float64 arrays (errs can be None)
+            flush_every   : automatically flush every n put calls (in the thread that calls put)
+            flush_interval: if given, a daemon thread flushes every flush_interval seconds instead
+        """
+
+        self._sink        = sink
+        self._flush_every = flush_every
+
+        # queued entries, each is (g_nr, t_nr, [x, y, yerrLo, yerrHi])
+        self._pending       = []
+        self._pending_lock  = threading.Lock()
+        # transfers that were started but not folded into the store yet (entries, host tensors per device, events)
+        self._inflight      = []
+        self._flush_lock    = threading.Lock()
+        self._n_put         = 0
+
+        self._stop   = threading.Event()
+        self._thread = None
+        if flush_interval is not None:
+            self._thread = threading.Thread(target=self._run_background, args=(flush_interval,), daemon=True)
+            self._thread.start()
+
+    def put(self, g_nr: int, t_nr: int, x: Any, y: Any, yerrLo: Any = None, yerrHi: Any = None):
+        """ queues one add_data / add_batch call. tensors are detached and cloned (async on the device, no sync) so that
+        later in-place changes of the caller's tensors can not leak into the logged values """
+
+        values = [v.detach().clone() if isinstance(v, torch.Tensor) else v for v in (x, y, yerrLo, yerrHi)]
+        with self._pending_lock:
+            self._pending.append((g_nr, t_nr, values))
+            self._n_put += 1
+            auto_flush = (self._flush_every is not None) and (self._n_put % self._flush_every == 0)
+
+        if auto_flush is True:
+            self.flush(wait=False)
+
+    def flush(self, wait: bool = True):
+        """ starts the transfer of everything that is queued and folds all finished transfers into the store. with
+        wait=False, transfers that are still running on the device are left for the next flush """
+
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+
+            if len(pending) > 0:
+                self._inflight.append(self._start_transfer(pending))
+
+            # fold in order, stop at the first transfer that is not done yet (to keep the order per trace)
+            while len(self._inflight) > 0:
+                entries, host_flat, events = self._inflight[0]
+                if (wait is False) and not all(event.query() for event in events):
+                    break
+                for event in events:
+                    event.synchronize()
+                self._fold(entries, host_flat)
+                self._inflight.pop(0)
+
+    def close(self):
+        """ stops the background thread (if any) and folds everything that is still queued """
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush(wait=True)
+
+    def _run_background(self, flush_interval: float):
+        while not self._stop.wait(flush_interval):
+            self.flush(wait=True)
+
+    def _start_transfer(self, pending: list) -> tuple[list, dict, list]:
+        """ concatenates all queued tensors per device and starts one copy to host per device """
+
+        flat_tensors = {} # device: [flattened tensors]
+        for _, _, values in pending:
+            for v in values:
+                if isinstance(v, torch.Tensor):
+                    flat_tensors.setdefault(v.device, []).append(v.reshape(-1))
+
+        host_flat = {}
+        events    = []
+        for device, tensors in flat_tensors.items():
+            if device.type == "cuda":
+                # lands in pinned memory without blocking, only valid after the event has completed
+                with torch.cuda.device(device):
+                    host_flat[device] = torch.cat(tensors).to("cpu", non_blocking=True)
+                    events.append(torch.cuda.Event())
+                    events[-1].record()
+            else:
+                host_flat[device] = torch.cat(tensors).cpu()
+
+        return pending, host_flat, events
+
+    def _fold(self, entries: list, host_flat: dict):
+        """ splits the transferred data back into the single values and hands one batch per trace to the sink """
+
+        host_flat = {device: tensor.to(torch.float64).numpy() for device, tensor in host_flat.items()}
+        offsets   = {device: 0 for device in host_flat}
+
+        def _to_host(v: Any) -> NDArray:
+            if v is None:
+                return None
+            if isinstance(v, torch.Tensor):
+                start = offsets[v.device]
+                offsets[v.device] += v.numel()
+                return host_flat[v.device][start:start + v.numel()]
+            return np.asarray(v, dtype=np.float64).reshape(-1)
+
+        # group per trace, keeping the order in which the values were put
+        per_trace = {} # (g_nr, t_nr): [(x, y, yerrLo, yerrHi), ...]
+        for g_nr, t_nr, values in entries:
+            x, y, yerrLo, yerrHi = (_to_host(v) for v in values)
+            x, y = np.broadcast_arrays(x, y)
+            # same rule as add_data, an errorband needs both sides
+            if (yerrLo is None) or (yerrHi is None):
+                yerrLo, yerrHi = None, None
+            per_trace.setdefault((g_nr, t_nr), []).append((x, y, yerrLo, yerrHi))
+
+        for (g_nr, t_nr), batches in per_trace.items():
+            x = np.concatenate([b[0] for b in batches])
+            y = np.concatenate([b[1] for b in batches])
+
+            # errors are only passed on if at least one entry has them, the others get a zero-width band
+            yerrLo, yerrHi = None, None
+            if any(b[2] is not None for b in batches):
+                yerrLo = np.concatenate([
+                    np.broadcast_to(b[2] if b[2] is not None else 0.0, b[1].shape) for b in batches
+                ])
+                yerrHi = np.concatenate([
+                    np.broadcast_to(b[3] if b[3] is not None else 0.0, b[1].shape) for b in batches
+                ])
+
+            self._sink(g_nr, t_nr, x, y, yerrLo, yerrHi)
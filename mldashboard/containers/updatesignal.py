@@ -0,0 +1,37 @@
+import threading
+
+
+class UpdateSignal:
+    """ "new data was published" notifications from the training loop to the dashboard (push mode). the writer side only
+    increments a version counter per topic (e.g. "graph1", "procs") and wakes up the subscribers that are currently
+    waiting, so publishing stays cheap enough to be called on every add_data """
+
+    def __init__(self):
+        self.versions: dict[str, int] = {}
+        # copy-on-write tuple, so that publish can iterate it without a lock while subscribers come and go
+        self._subscribers: tuple[threading.Event, ...] = ()
+        self._lock = threading.Lock()
+
+    def publish(self, topic: str):
+        self.versions[topic] = self.versions.get(topic, 0) + 1
+        for event in self._subscribers:
+            if not event.is_set(): # set() always takes the event's lock, skip it if the subscriber is awake anyway
+                event.set()
+
+    def subscribe(self) -> threading.Event:
+        """ new subscriber event, starts out set so that the subscriber picks up the current versions right away """
+
+        event = threading.Event()
+        event.set()
+        with self._lock:
+            self._subscribers = self._subscribers + (event,)
+        return event
+
+    def unsubscribe(self, event: threading.Event):
+        with self._lock:
+            self._subscribers = tuple(e for e in self._subscribers if e is not event)
+
+    def snapshot(self) -> dict[str, int]:
+        """ copy of the current versions (a single C level copy, safe while the writer adds new topics) """
+
+        return dict(self.versions)
@@ -0,0 +1,46 @@
+/* clientside end of the push mode (see dash/components/push.py). listens to the server sent events of the dashboard
+and sets the "push-graphs" store (versions of all graphs with new data, one batched update for all of them) and the
+"push-procs" store, which triggers the regular update callbacks. all events that arrive within one animation frame are
+applied together (and nothing happens while the tab is hidden). */
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    push: {
+        connect: function (route) {
+            // only one connection per page, EventSource reconnects by itself if the server goes away
+            if (!route || window.mldashboardPushSource) {
+                return window.dash_clientside.no_update;
+            }
+
+            let pending   = {};
+            let scheduled = false;
+            const source  = new EventSource(route);
+
+            source.onmessage = function (event) {
+                Object.assign(pending, JSON.parse(event.data));
+                if (scheduled) {
+                    return;
+                }
+                scheduled = true;
+                window.requestAnimationFrame(function () {
+                    const versions = pending;
+                    pending   = {};
+                    scheduled = false;
+                    const graphs = {};
+                    for (const [topic, version] of Object.entries(versions)) {
+                        if (topic === "procs") {
+                            window.dash_clientside.set_props("push-procs", {data: version});
+                        } else {
+                            graphs[topic] = version;
+                        }
+                    }
+                    if (Object.keys(graphs).length > 0) {
+                        window.dash_clientside.set_props("push-graphs", {data: graphs});
+                    }
+                });
+            };
+
+            window.mldashboardPushSource = source;
+            return true;
+        },
+    },
+});
@@ -0,0 +1,40 @@
+/* clientside decoder for the binary transports of the graph patches (see dash/components/wire.py). the server sends the
+patch operations with the bulk trace data as base64 typed array buffers, they are decoded here and applied to the
+figure as a regular dash Patch. every buffer carries its own dtype: x arrays are always float64, the y arrays are
+float32 with the binary32 transport. */
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    wire: {
+        apply_patch: function (wire) {
+            if (!wire || !wire.operations) {
+                return window.dash_clientside.no_update;
+            }
+
+            const patch = new window.dash_clientside.Patch();
+            for (const op of wire.operations) {
+                const params = Object.assign({}, op.params);
+                if ("value" in params) {
+                    params.value = decodeTypedArray(params.value);
+                }
+                patch.operations.push({operation: op.operation, location: op.location, params: params});
+            }
+            return patch.build();
+        },
+    },
+});
+
+function decodeTypedArray(value) {
+    // anything that is not a typed array spec is passed on unchanged (small values of the regular patch operations)
+    if (value === null || typeof value !== "object" || !("bdata" in value)) {
+        return value;
+    }
+
+    const raw   = atob(value.bdata);
+    const bytes = new Uint8Array(raw.length);
+    for (let i = 0; i < raw.length; i++) {
+        bytes[i] = raw.charCodeAt(i);
+    }
+    const typed = (value.dtype === "f4") ? new Float32Array(bytes.buffer) : new Float64Array(bytes.buffer);
+    // plain arrays, because the renderer extends figure data with a regular array concat
+    return Array.from(typed);
+}
@@ -1,208 +1,410 @@
 ### IMPORTS ############################################################################################################
 import numpy as np
+from   numpy.typing import NDArray
 from   dash import Dash, Input, Output, State, Patch, dcc, html, no_update
 import plotly.graph_objects as go
 
-from   mldashboard.utils import determine_single_range, determine_mixed_range, idx_next_smaller
+from   mldashboard.utils import determine_single_range, determine_mixed_range
+from   mldashboard.utils.downsampling import DOWNSAMPLERS, lttb_anchor_stop
+
+from .wire import PatchWriter
+from .sessions import SegmentCache
+from .comparison import RunArchive, make_overlay_trace
 
 from ...containers.setupconfig import Config, GraphConfig, TraceConfig
-from ...containers.datastore import Store, GraphStore, TraceData, TraceT2Id, TraceA2Id, ProcsData
+from ...containers.datastore import Store, GraphStore, TraceData, TraceT2Id, TraceA2Id, ProcsData, TraceCursor
+from ...containers.datastore import GraphCursors, LayerStatsData, LAYER_STATS
 
 ### DEFINITIONS ########################################################################################################
 
+# y ranges are only sent again when they moved by more than this fraction of the span that is shown (or some data would
+# be outside of it). early in training, nearly every step has a new min / max that hardly changes the range
+RANGE_TOLERANCE = 0.02
+
+def _overlay_values(overlay_range: list | None, idx: int) -> list[float]:
+    """ entry idx of the range of the overlaid runs [min primary, max primary, min secondary, max secondary] as a list of
+    candidates for the min / max (empty if nothing is overlaid there) """
+    
+    if (overlay_range is None) or (overlay_range[idx] is None):
+        return []
+    return [overlay_range[idx]]
+
+def _autorange(G_CFG: GraphConfig, g_store: GraphStore, overlay_range: list | None) -> tuple[NDArray, NDArray]:
+    """ the y extent of the data ((n_axes, 2), min / max over all traces of each axis, with a ceil / floor of 0, and
+    of the overlaid runs) and the y range(s) that fit it. the min / max per axis are kept by the store on ingest, so 
+    nothing here depends on the number of traces """
+    
+    n_axes = 2 if G_CFG.has_subplots is True else 1
+    MINS   = np.minimum(g_store.axis_ymin[:n_axes], 0.0)
+    MAXS   = np.maximum(g_store.axis_ymax[:n_axes], 0.0)
+    for axis in range(n_axes):
+        MINS[axis] = min([MINS[axis]] + _overlay_values(overlay_range, 2*axis))
+        MAXS[axis] = max([MAXS[axis]] + _overlay_values(overlay_range, 2*axis + 1))
+    
+    # TODO: route factor out
+    yRngs = [determine_single_range(MIN, MAX, factor=0.1) for MIN, MAX in zip(MINS, MAXS)]
+    if n_axes == 2:
+        # subplot Figure, both axes get the same ratio above / below the zeroline
+        yRngs = determine_mixed_range(*yRngs)
+    return np.column_stack([MINS, MAXS]), np.array(yRngs, dtype=np.float64)
+
+def _range_changed(extent: NDArray, yRngs: NDArray, sent: NDArray | None) -> bool:
+    """ whether the figure needs the new y range(s): if some data is outside of the range it shows, or if the range
+    moved by more than RANGE_TOLERANCE of its span """
+    
+    if sent is None:
+        return True
+    if np.any(extent[:, 0] < sent[:, 0]) or np.any(extent[:, 1] > sent[:, 1]):
+        return True
+    span = (sent[:, 1] - sent[:, 0])[:, None]
+    return bool(np.any(np.abs(yRngs - sent) > RANGE_TOLERANCE * span))
+
+def _patch_yrange(PTCH: PatchWriter, yRngs: NDArray):
+    """ fixes the y range(s) of the figure (autorange within them) """
+    
+    for axis, (lo, hi) in zip(["yaxis", "yaxis2"], yRngs.tolist()):
+        PTCH["layout"][axis]["autorangeoptions"]["minallowed"] = lo
+        PTCH["layout"][axis]["autorangeoptions"]["maxallowed"] = hi
+
 # TODO: also split this up into clean subfunctions, then the main workflow is more apparent
-def callback_generate_flexgraph_patch(G_CFG: GraphConfig, g_store: GraphStore, g_chkp: list):
+def callback_generate_flexgraph_patch(
+    G_CFG:         GraphConfig, 
+    g_store:       GraphStore, 
+    g_cursors:     list[TraceCursor], 
+    seg_cache:     SegmentCache = None,
+    overlay_range: list         = None,
+):
+    """ patch with everything that is new for one viewer since its cursors (one per trace, advanced in place). with a
+    seg_cache, the downsampled segments are shared between all viewers that are at the same checkpoints. overlay_range
+    is the y range of the runs that the viewer overlaid for comparison (see callback_generate_comparison_patch) """
 
 
+    # the dirty traces: the ones that were written to since this viewer last looked, taken from the store's write
+    # counts and drained in one go (all of them for a plain list of cursors). nothing new, nothing to do
+    if isinstance(g_cursors, GraphCursors):
+        trace_nrs = g_cursors.take_pending(g_store)
+    else:
+        trace_nrs = range(len(G_CFG.traces))
+    if len(trace_nrs) == 0:
+        return no_update
+    
     # too keep track of wheter a range update is necessary, check if any min or max values have changed
     anyMinMaxChange = False
     
     # all possible changes are tracked with this patch. If no changes are made, the patch will just not change anything
-    PTCH = Patch()
+    # (bulk trace data goes through extend_array, so that it can be sent in the configured wire format)
+    PTCH = PatchWriter(G_CFG.transport)
     
-    # loop through each trace - updates --------------------------------------------------------------------------------
-    for trace_nr, trace_cfg in enumerate(G_CFG.traces):
-        # TODO: maybe make some handles for gstore.trc_data[trace_nr] xD
-        # TODO: maybe also some handles for the registration
+    # one consistent snapshot per dirty trace for this whole callback (lock-free, the training loop can keep appending)
+    snaps = {trace_nr: g_store.trc_data[trace_nr].snapshot() for trace_nr in trace_nrs}
+    
+    # loop through each changed trace - updates ------------------------------------------------------------------------
+    for trace_nr in trace_nrs:
+        trace_cfg = G_CFG.traces[trace_nr]
+        t2id      = g_store.trc_t2id[trace_nr]
+        a2id      = g_store.trc_a2id[trace_nr]
+        
+        # the snapshot "freezes" the current length of the raw data store, so that it can handle having data appended to the store while this callback runs. all column views are cut at this length, so they always match up
+        snap = snaps[trace_nr]
         
         # skip this trace, when it has no main data anyways (avoidy empty list issues down the line)
-        if len(g_store.trc_data[trace_nr].x)==0 or len(g_store.trc_data[trace_nr].y)==0:
+        if snap.length == 0:
             continue
         
+        x, y, ylo, yhi = snap.x, snap.y, snap.ylo, snap.yhi
+        idx_raw_newest = snap.length - 1
+        
         # raw-data dependent updates -----------------------------------------------------------------------------------
         
         # main data update NO downsampling -------------------------------------
         if G_CFG.nxdown is False:
-            # "freeze" the current length of the raw data store, so that it can handle having data appended to the store while this callback runs. It can actually happen, that data is appended in between accessing storex and storey, so that they have unequal length! (can use either x or y length)
-            idx_raw_newest = min(len(g_store.trc_data[trace_nr].x), len(g_store.trc_data[trace_nr].y)) - 1
-            
-            old_chkp = g_chkp[trace_nr]
+            old_chkp = g_cursors[trace_nr].chkp
             new_chkp = idx_raw_newest 
 
             # only do data update if there is some new data
             if new_chkp > old_chkp:
                 # -------------------------------------------- main trace update
-                plotly_id = g_store.trc_t2id[trace_nr].main
-                PTCH["data"][plotly_id]["x"].extend(g_store.trc_data[trace_nr].x[old_chkp+1:new_chkp+1])
-                PTCH["data"][plotly_id]["y"].extend(g_store.trc_data[trace_nr].y[old_chkp+1:new_chkp+1])
+                plotly_id = t2id.main
+                PTCH.extend_array(["data", plotly_id, "x"], x[old_chkp+1:new_chkp+1])
+                PTCH.extend_array(["data", plotly_id, "y"], y[old_chkp+1:new_chkp+1])
                 # ----------------------------------------------- endpoint trace 
-                if G_CFG.traces[trace_nr].point is True:
-                    plotly_id = g_store.trc_t2id[trace_nr].point
-                    PTCH["data"][plotly_id]["x"] = [g_store.trc_data[trace_nr].x[new_chkp]]*2
-                    PTCH["data"][plotly_id]["y"] = [g_store.trc_data[trace_nr].y[new_chkp]]*2
+                if trace_cfg.point is True:
+                    plotly_id = t2id.point
+                    PTCH["data"][plotly_id]["x"] = [float(x[new_chkp])]*2
+                    PTCH["data"][plotly_id]["y"] = [float(y[new_chkp])]*2
                 # -------------------------------------------------- error trace     
-                if G_CFG.traces[trace_nr].errors is True:
-                    plotly_id = g_store.trc_t2id[trace_nr].lo
-                    PTCH["data"][plotly_id]["x"].extend(g_store.trc_data[trace_nr].x[old_chkp+1:new_chkp+1])
-                    PTCH["data"][plotly_id]["y"].extend(g_store.trc_data[trace_nr].ylo[old_chkp+1:new_chkp+1])
-                    plotly_id = g_store.trc_t2id[trace_nr].hi
-                    PTCH["data"][plotly_id]["x"].extend(g_store.trc_data[trace_nr].x[old_chkp+1:new_chkp+1])
-                    PTCH["data"][plotly_id]["y"].extend(g_store.trc_data[trace_nr].yhi[old_chkp+1:new_chkp+1])
+                if trace_cfg.errors is True:
+                    plotly_id = t2id.lo
+                    PTCH.extend_array(["data", plotly_id, "x"], x[old_chkp+1:new_chkp+1])
+                    PTCH.extend_array(["data", plotly_id, "y"], ylo[old_chkp+1:new_chkp+1])
+                    plotly_id = t2id.hi
+                    PTCH.extend_array(["data", plotly_id, "x"], x[old_chkp+1:new_chkp+1])
+                    PTCH.extend_array(["data", plotly_id, "y"], yhi[old_chkp+1:new_chkp+1])
                 
-                g_chkp[trace_nr] = new_chkp
+                g_cursors[trace_nr].chkp = new_chkp
     
         # main data update WITH downsampling -----------------------------------
         if G_CFG.nxdown is not False:
-            # TODO: idx names are a bit weird here? 
-            # "freeze" the current length of the raw data store, so that it can handle having data appended to the store while this callback runs. It can actually happen, that data is appended in between accessing storex and storey, so that they have unequal length! (can use either x or y length)
-            idx_raw_newest = min(len(g_store.trc_data[trace_nr].x), len(g_store.trc_data[trace_nr].y)) - 1
+            xdown = g_store.trc_data[trace_nr].xdown
             
-            # determine the potential new checkpoint: finds the index of the next smaller element (to latest raw x) in the downsampled x "grid". this will be the latest downsampled point that is fully covered by raw data.
-            old_chkp = g_chkp[trace_nr]
-            new_chkp = idx_next_smaller(
-                g_store.trc_data[trace_nr].xdown, 
-                g_store.trc_data[trace_nr].x[idx_raw_newest]
-            )
+            # determine the potential new checkpoint: the last point of the downsampled x "grid" that is smaller or equal to the latest raw x. this will be the latest downsampled point that is fully covered by raw data.
+            old_chkp = g_cursors[trace_nr].chkp
+            new_chkp = int(np.searchsorted(xdown, x[idx_raw_newest], side="right")) - 1
 
             # only do data update and downsample if there is enough new data to cover a new xDown point
             if new_chkp > old_chkp:
                 
-                # find the lower end of the raw data that actually needs to be sampled. (just needs to fully cover the x downsampled interval from old_chkp to new_chkp, anything else is redundant)
-                idx_raw_oldest = idx_next_smaller(
-                    g_store.trc_data[trace_nr].x, 
-                    g_store.trc_data[trace_nr].xdown[old_chkp+1]
-                )
+                # the downsampling strategy only processes the newly covered part of the grid
+                ys = [y] if trace_cfg.errors is False else [y, ylo, yhi]
+                downsample = lambda: DOWNSAMPLERS[G_CFG.downsampling](xdown, x, ys, old_chkp, new_chkp)
+                if seg_cache is None:
+                    xDown, ysDown = downsample()
+                else:
+                    key = (trace_nr, old_chkp, new_chkp)
+                    if G_CFG.downsampling == "lttb":
+                        # the last right anchor still depends on the raw points of the next (incomplete) bucket
+                        key += (lttb_anchor_stop(xdown, x, new_chkp),)
+                    xDown, ysDown = seg_cache.get(key, downsample)
                 
                 # -------------------------------------------- main trace update
-                yDown = np.interp(
-                    g_store.trc_data[trace_nr].xdown[old_chkp+1:new_chkp+1],
-                    g_store.trc_data[trace_nr].x[idx_raw_oldest:idx_raw_newest+1],
-                    g_store.trc_data[trace_nr].y[idx_raw_oldest:idx_raw_newest+1],
-                )
-                plotly_id = g_store.trc_t2id[trace_nr].main
-                PTCH["data"][plotly_id]["x"].extend(list(g_store.trc_data[trace_nr].xdown[old_chkp+1:new_chkp+1]))
-                PTCH["data"][plotly_id]["y"].extend(list(yDown))
+                plotly_id = t2id.main
+                PTCH.extend_array(["data", plotly_id, "x"], xDown)
+                PTCH.extend_array(["data", plotly_id, "y"], ysDown[0])
                 
                 # ----------------------------------------------- endpoint trace 
-                if G_CFG.traces[trace_nr].point is True:
-                    plotly_id = g_store.trc_t2id[trace_nr].point
-                    PTCH["data"][plotly_id]["x"] = [g_store.trc_data[trace_nr].xdown[new_chkp]]*2
+                if (trace_cfg.point is True) and (len(xDown) > 0):
+                    plotly_id = t2id.point
+                    PTCH["data"][plotly_id]["x"] = [float(xDown[-1])]*2
+                    PTCH["data"][plotly_id]["y"] = [float(ysDown[0][-1])]*2
  
                 # -------------------------------------------------- error trace 
-                if G_CFG.traces[trace_nr].errors is True:
-                    yLoDown = np.interp(
-                        g_store.trc_data[trace_nr].xdown[old_chkp+1:new_chkp+1],
-                        g_store.trc_data[trace_nr].x[idx_raw_oldest:idx_raw_newest+1],
-                        g_store.trc_data[trace_nr].ylo[idx_raw_oldest:idx_raw_newest+1],
-                    ) 
-                    plotly_id = g_store.trc_t2id[trace_nr].lo
-                    PTCH["data"][plotly_id]["x"].extend(list(g_store.trc_data[trace_nr].xdown[old_chkp+1:new_chkp+1]))
-                    PTCH["data"][plotly_id]["y"].extend(list(yLoDown))
-                    yHiDown = np.interp(
-                        g_store.trc_data[trace_nr].xdown[old_chkp+1:new_chkp+1],
-                        g_store.trc_data[trace_nr].x[idx_raw_oldest:idx_raw_newest+1],
-                        g_store.trc_data[trace_nr].yhi[idx_raw_oldest:idx_raw_newest+1],
-                    ) 
-                    plotly_id = g_store.trc_t2id[trace_nr].hi
-                    PTCH["data"][plotly_id]["x"].extend(list(g_store.trc_data[trace_nr].xdown[old_chkp+1:new_chkp+1]))
-                    PTCH["data"][plotly_id]["y"].extend(list(yHiDown))
-
-                g_chkp[trace_nr] = new_chkp
+                if trace_cfg.errors is True:
+                    plotly_id = t2id.lo
+                    PTCH.extend_array(["data", plotly_id, "x"], xDown)
+                    PTCH.extend_array(["data", plotly_id, "y"], ysDown[1])
+                    plotly_id = t2id.hi
+                    PTCH.extend_array(["data", plotly_id, "x"], xDown)
+                    PTCH.extend_array(["data", plotly_id, "y"], ysDown[2])
+
+                g_cursors[trace_nr].chkp = new_chkp
          
         # min/max dependent line updated -------------------------------------------------------------------------------
         
-        # already check if min / max has changed and reset flag to avoid missing updates. 
-        hasNewMin = False
-        hasNewMax = False
-        if g_store.trc_data[trace_nr].ynewmin is True:
-            hasNewMin       = True
+        # check if min / max has changed since the last callback (version based, so no update can get lost)
+        hasNewMin, hasNewMax = g_cursors[trace_nr].consume_minmax(snap)
+        if (hasNewMin is True) or (hasNewMax is True):
             anyMinMaxChange = True
-            g_store.trc_data[trace_nr].ynewmin = False
-            
-        if g_store.trc_data[trace_nr].ynewmax is True:
-            hasNewMax       = True
-            anyMinMaxChange = True
-            g_store.trc_data[trace_nr].ynewmax = False
             
         # ------------------------------------------------- update showmin trace
-        if (G_CFG.showmin==f"trace{trace_nr}") and (hasNewMin is True):
-            plotly_id = g_store.trc_t2id[trace_nr].minline
-            newMin = g_store.trc_data[trace_nr].ymin
+        if (t2id.minline is not None) and (hasNewMin is True):
+            plotly_id = t2id.minline
+            newMin = snap.ymin
             PTCH["data"][plotly_id]["y"] = [newMin]*2 # x coords always stay at either ends of the graph ...
             
             # also update the according annotation, make it visible (only as an effect once)
-            plotly_id = g_store.trc_a2id[trace_nr].minline
+            plotly_id = a2id.minline
             PTCH["layout"]["annotations"][plotly_id]["text"] = f"<b> minimum:<br> {newMin:07.4f}</b>"
             PTCH["layout"]["annotations"][plotly_id]["y"] = newMin
             PTCH["layout"]["annotations"][plotly_id]["visible"] = True
             
         
         # ------------------------------------------------- update showmax trace
-        if (G_CFG.showmax==f"trace{trace_nr}") and (hasNewMax is True):    
-            plotly_id = g_store.trc_t2id[trace_nr].maxline
-            newMax = g_store.trc_data[trace_nr].ymax
+        if (t2id.maxline is not None) and (hasNewMax is True):    
+            plotly_id = t2id.maxline
+            newMax = snap.ymax
             PTCH["data"][plotly_id]["y"] = [newMax]*2
             
             # also update the according annotation, make it visible (only as an effect once)
-            plotly_id = g_store.trc_a2id[trace_nr].maxline
+            plotly_id = a2id.maxline
             PTCH["layout"]["annotations"][plotly_id]["text"] = f"<b> maximum:<br> {newMax:07.4f}</b>"
             PTCH["layout"]["annotations"][plotly_id]["y"] = newMax
             PTCH["layout"]["annotations"][plotly_id]["visible"] = True
 
     # min/max dependent autorange updates ------------------------------------------------------------------------------
+    # (only if the range actually changed for this viewer, see RANGE_TOLERANCE. a plain list of cursors always gets it)
+    if anyMinMaxChange is True:
+        extent, yRngs = _autorange(G_CFG, g_store, overlay_range)
+        sent          = g_cursors.yrange_sent if isinstance(g_cursors, GraphCursors) else None
+        if _range_changed(extent, yRngs, sent) is True:
+            _patch_yrange(PTCH, yRngs)
+            if isinstance(g_cursors, GraphCursors):
+                g_cursors.yrange_sent = yRngs
+    
+    return PTCH.result()
+
+def _parse_relayout_xrange(relayout: dict) -> tuple[float, float] | None:
+    """ extracts the new x range from plotly relayoutData. returns (-inf, inf) when the x axis was reset to autorange and
+    None if the event did not change the x range at all (e.g. legend clicks, resizing) """
+    
+    if relayout is None:
+        return None
+    if relayout.get("xaxis.autorange") is True:
+        return (-np.inf, np.inf)
+    if ("xaxis.range[0]" in relayout) and ("xaxis.range[1]" in relayout):
+        return (float(relayout["xaxis.range[0]"]), float(relayout["xaxis.range[1]"]))
+    if "xaxis.range" in relayout:
+        return (float(relayout["xaxis.range"][0]), float(relayout["xaxis.range"][1]))
+    return None
+
+def callback_generate_lod_patch(
+    G_CFG:     GraphConfig, 
+    g_store:   GraphStore, 
+    relayout:  dict, 
+    g_cursors: list[TraceCursor],
+):
+    """ serves the visible x range of a graph at screen resolution from the per-trace pyramids whenever the graph is 
+    zoomed, panned or reset. the part outside of the visible range is served much coarser, so that panning still shows
+    something. all trace data is replaced and the viewer's cursors are moved to the end of what was served, so that the
+    regular update callback just continues appending from there """
+    
+    xrange = _parse_relayout_xrange(relayout)
+    if xrange is None:
+        return no_update
     
-    # normal Figure ------------------------------------------------------------
-    if (anyMinMaxChange is True) and (G_CFG.has_subplots is False):
-        # gather all mins / maxes and take the min / max over all of them (with a ceil / floor of 0)
-        MIN = min([g_store.trc_data[t_nr].ymin for t_nr, _ in enumerate(G_CFG.traces)] + [0])
-        MAX = max([g_store.trc_data[t_nr].ymax for t_nr, _ in enumerate(G_CFG.traces)] + [0])
+    NPIX_FOCUS   = G_CFG.lod
+    NPIX_CONTEXT = max(G_CFG.lod // 4, 1)
+    
+    PTCH = PatchWriter(G_CFG.transport)
+    for trace_nr, trace_cfg in enumerate(G_CFG.traces):
+        trc_data = g_store.trc_data[trace_nr]
+        snap     = trc_data.snapshot()
+        if snap.length == 0:
+            continue
+        
+        # the served data has to end exactly where the regular update callback will continue
+        if G_CFG.nxdown is False:
+            new_chkp = snap.length - 1
+            i_end    = snap.length
+        else:
+            new_chkp = int(np.searchsorted(trc_data.xdown, snap.x[-1], side="right")) - 1
+            if new_chkp < 0:
+                continue
+            i_end = int(np.searchsorted(snap.x, trc_data.xdown[new_chkp], side="right"))
+        
+        # raw index range of the visible part (one extra point on each side, so the lines run out of the view)
+        x = snap.x[:i_end]
+        i_start_focus = max(int(np.searchsorted(x, xrange[0], side="left")) - 1, 0)
+        i_stop_focus  = min(int(np.searchsorted(x, xrange[1], side="right")) + 1, i_end)
+        
+        columns = ["y"] if trace_cfg.errors is False else ["y", "ylo", "yhi"]
+        served  = {}
+        for column in columns:
+            y       = getattr(snap, column)[:i_end]
+            pyramid = trc_data.pyramid(column)
+            parts   = [
+                pyramid.query(x, y, 0,             i_start_focus, NPIX_CONTEXT),
+                pyramid.query(x, y, i_start_focus, i_stop_focus,  NPIX_FOCUS),
+                pyramid.query(x, y, i_stop_focus,  i_end,         NPIX_CONTEXT),
+            ]
+            served[column] = (np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
         
-        # ----------------------------------------------------- update autorange
-        yRng = determine_single_range(MIN, MAX, factor=0.1)
-        PTCH["layout"]["yaxis"]["autorangeoptions"]["minallowed"] = yRng[0]
-        PTCH["layout"]["yaxis"]["autorangeoptions"]["maxallowed"] = yRng[1]
-    
-    # subplot Figure -----------------------------------------------------------        
-    if (anyMinMaxChange is True) and (G_CFG.has_subplots is True):
-        # gather all mins / maxes but separate for primary and secondary plot
-        MIN1 = min(
-            [g_store.trc_data[t_nr].ymin if t_cfg.yaxis=="primary" else 0 for t_nr, t_cfg in enumerate(G_CFG.traces)] 
-            + [0]
-        )
-        MAX1 = max(
-            [g_store.trc_data[t_nr].ymax if t_cfg.yaxis=="primary" else 0 for t_nr, t_cfg in enumerate(G_CFG.traces)] 
-            + [0]
-        )
-        MIN2 = min(
-            [g_store.trc_data[t_nr].ymin if t_cfg.yaxis=="secondary" else 0 for t_nr, t_cfg in enumerate(G_CFG.traces)] 
-            + [0]
-        )
-        MAX2 = max(
-            [g_store.trc_data[t_nr].ymax if t_cfg.yaxis=="secondary" else 0 for t_nr, t_cfg in enumerate(G_CFG.traces)] 
-            + [0]
-        )
+        plotly_id = g_store.trc_t2id[trace_nr].main
+        PTCH.assign_array(["data", plotly_id, "x"], served["y"][0])
+        PTCH.assign_array(["data", plotly_id, "y"], served["y"][1])
+        if trace_cfg.errors is True:
+            plotly_id = g_store.trc_t2id[trace_nr].lo
+            PTCH.assign_array(["data", plotly_id, "x"], served["ylo"][0])
+            PTCH.assign_array(["data", plotly_id, "y"], served["ylo"][1])
+            plotly_id = g_store.trc_t2id[trace_nr].hi
+            PTCH.assign_array(["data", plotly_id, "x"], served["yhi"][0])
+            PTCH.assign_array(["data", plotly_id, "y"], served["yhi"][1])
         
-        # ----------------------------------------------------- update autorange
-        # TODO: route factor out
-        yRng1        = determine_single_range(MIN1, MAX1, factor=0.1)
-        yRng2        = determine_single_range(MIN2, MAX2, factor=0.1)
-        yRng1, yRng2 = determine_mixed_range(yRng1, yRng2)
-        PTCH["layout"]["yaxis"]["autorangeoptions"]["minallowed"]  = yRng1[0]
-        PTCH["layout"]["yaxis"]["autorangeoptions"]["maxallowed"]  = yRng1[1]
-        PTCH["layout"]["yaxis2"]["autorangeoptions"]["minallowed"] = yRng2[0]
-        PTCH["layout"]["yaxis2"]["autorangeoptions"]["maxallowed"] = yRng2[1]
-    
-    return PTCH, g_chkp
+        g_cursors[trace_nr].chkp = new_chkp
+    
+    return PTCH.result()
+
+def callback_generate_comparison_patch(
+    G_CFG:     GraphConfig, 
+    g_name:    str, 
+    g_store:   GraphStore, 
+    n_live:    int, 
+    selected:  list[str], 
+    shown:     dict, 
+    archive:   RunArchive,
+    g_cursors: GraphCursors = None,
+):
+    """ overlays the selected earlier runs on one graph. the overlay traces are appended behind the n_live traces of the
+    live figure (so the plotly ids of the live traces never change), runs that are no longer selected are deleted again.
+    shown is what the viewer currently has overlaid {runs: [[run name, number of traces], ...], yrange: [...]}, it is
+    returned updated together with the patch. the y range is widened to include all overlaid runs (and kept as the range
+    sent to the viewer in its g_cursors, so that the graph patch compares new ranges against what the figure shows) """
+    
+    selected = [] if selected is None else selected
+    shown    = {"runs": [], "yrange": None} if shown is None else shown
+    
+    PTCH = Patch()
+    
+    # remove the runs that are no longer selected, back to front so that the indices of the remaining ones stay valid
+    kept, to_delete, plotly_id = [], [], n_live
+    for run_name, n_traces in shown["runs"]:
+        if run_name in selected:
+            kept.append([run_name, n_traces])
+        else:
+            to_delete.extend(range(plotly_id, plotly_id + n_traces))
+        plotly_id += n_traces
+    for plotly_id in reversed(to_delete):
+        del PTCH["data"][plotly_id]
+    
+    # append the newly selected ones (downsampled once by the archive, shared by all viewers)
+    kept_names = [run_name for run_name, _ in kept]
+    for run_name in selected:
+        if run_name in kept_names:
+            continue
+        overlay = archive.overlay(run_name, g_name, G_CFG)
+        for trace_nr, x, y, _, _ in overlay:
+            PTCH["data"].append(make_overlay_trace(G_CFG, trace_nr, run_name, x, y))
+        kept.append([run_name, len(overlay)])
+    
+    # y range of everything that is overlaid now [min primary, max primary, min secondary, max secondary]
+    yrange = [None] * 4
+    for run_name, _ in kept:
+        for trace_nr, _, _, ymin, ymax in archive.overlay(run_name, g_name, G_CFG):
+            axis = 2 if G_CFG.traces[trace_nr].yaxis == "secondary" else 0
+            yrange[axis]     = ymin if yrange[axis] is None else min(yrange[axis], ymin)
+            yrange[axis + 1] = ymax if yrange[axis + 1] is None else max(yrange[axis + 1], ymax)
+    
+    yRngs = _autorange(G_CFG, g_store, yrange)[1]
+    _patch_yrange(PTCH, yRngs)
+    if g_cursors is not None:
+        g_cursors.yrange_sent = yRngs
+    
+    return PTCH, {"runs": kept, "yrange": yrange}
+
+def _log10_rows(values: np.ndarray) -> list:
+    """ (step, layer) values as log10 rows for the heatmaps, non-finite results (e.g. zero norms, NaN) become gaps """
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.round(np.log10(values.astype(np.float64)), 4)
+    return np.where(np.isfinite(logs), logs, None).tolist()
+
+def callback_generate_layer_patch(l_store: LayerStatsData, seen: int | None):
+    """ appends the steps that were tracked since the viewer's last update (seen: number of steps it got so far) as new
+    columns of the layer heatmaps, so the figure always shows exactly what the ring buffer holds. once columns fall out
+    of the ring, the heatmaps get the whole ring at once instead (one assignment, not one delete per dropped column).
+    returns (patch, new seen) """
+    
+    seen = 0 if seen is None else seen
+    if l_store.count == seen:
+        return no_update, no_update
+    
+    start, steps, values = l_store.read(seen)
+    # the viewer holds at most capacity columns (if it fell behind by more than the ring, the read starts after seen)
+    replace = (start > seen) or (min(seen, l_store.capacity) + len(steps) > l_store.capacity)
+    if replace and (start == seen):
+        start, steps, values = l_store.read(0)
+    new_seen = start + len(steps)
+    PTCH     = Patch()
+    
+    for stat_nr, _ in enumerate(LAYER_STATS):
+        rows = _log10_rows(values[:, stat_nr, :])
+        if replace is True:
+            PTCH["data"][stat_nr]["x"] = steps.tolist()
+            PTCH["data"][stat_nr]["z"] = rows
+        else:
+            PTCH["data"][stat_nr]["x"].extend(steps.tolist())
+            PTCH["data"][stat_nr]["z"].extend(rows)
+    
+    return PTCH, new_seen
 
 def callback_update_proc_speed(store: Store):
     proc_speed = store.procs.speed # as deque, last few speeds
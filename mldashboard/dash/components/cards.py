@@ -2,9 +2,9 @@
 from   dash import Dash, Input, Output, State, Patch, dcc, html, no_update
 import plotly.graph_objects as go
 
-def make_graphcard(title: str, gridbox: str, graphid: str, graphfig: go.Figure):
+def make_graphcard(title: str, graphid: str | dict, graphfig: go.Figure, gridbox: str | None = None):
     card = html.Div(
-        className = "card" + f" main-grid-box{gridbox}",
+        className = "card graph-card" + ("" if gridbox is None else f" main-grid-box{gridbox}"),
         children  = [
             html.Div(title, className="header"),
             html.Div(
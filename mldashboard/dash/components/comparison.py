@@ -0,0 +1,109 @@
+### IMPORTS ############################################################################################################
+import threading
+from   pathlib import Path
+
+import numpy as np
+from   numpy.typing import NDArray
+
+from   mldashboard.utils import adjust_alpha
+from   mldashboard.utils.downsampling import DOWNSAMPLERS
+
+from .sessions import SegmentCache
+from ...containers.setupconfig import Config, GraphConfig
+from ...containers.runlog import load_run_log
+
+### DEFINITIONS ########################################################################################################
+
+# resolution of an overlaid run on graphs without nxdown (graphs with nxdown use their own resolution)
+COMPARISON_NXDOWN     = 1_000
+# number of downsampled run traces that are kept, shared by all graphs and sessions
+COMPARISON_CACHE_SIZE = 512
+# overlaid runs are drawn thinner, dashed and faded out, so that the live run stays in front
+COMPARISON_ALPHA      = 0.45
+
+
+class RunArchive:
+    """ earlier runs (run logs, see DashPlotter(log_path=...)) that can be overlaid on the graphs of the live run. a run
+    is only opened when it is first shown, and then only memory-mapped. every overlaid trace is downsampled once to the
+    resolution of the graph and the result is shared by all sessions, so the startup time does not depend on the number
+    of runs and the memory only on the number of runs that are actually shown. traces are matched by graph and name """
+
+    def __init__(self, paths: list[str], cache_size: int = COMPARISON_CACHE_SIZE):
+        self._paths = {}
+        for path in paths:
+            name = Path(path).stem
+            if name in self._paths:
+                raise ValueError(f"run names (file names without suffix) have to be unique! (got {name} twice)")
+            self._paths[name] = str(path)
+
+        self._opened = {} # run name: (CONFIG, traces) of load_run_log
+        self._lock   = threading.Lock()
+        self._cache  = SegmentCache(maxsize=cache_size)
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._paths.keys())
+
+    @property
+    def n_opened(self) -> int:
+        return len(self._opened)
+
+    def _open(self, name: str) -> tuple[Config, dict]:
+        with self._lock:
+            if name not in self._opened:
+                self._opened[name] = load_run_log(self._paths[name])
+            return self._opened[name]
+
+    def overlay(self, name: str, g_name: str, G_CFG: GraphConfig) -> list[tuple[int, NDArray, NDArray, float, float]]:
+        """ the traces of run `name` that match the traces of the live graph G_CFG, downsampled onto the live graph's
+        x grid: [(live trace number, x, y, ymin, ymax), ...] """
+
+        run_CONFIG, run_traces = self._open(name)
+        run_G_CFG = run_CONFIG.graphs.get(g_name)
+        if run_G_CFG is None:
+            return []
+        run_trace_nrs = {t_cfg.name: t_nr for t_nr, t_cfg in enumerate(run_G_CFG.traces)}
+
+        nxdown  = G_CFG.nxdown if G_CFG.nxdown is not False else COMPARISON_NXDOWN
+        overlay = []
+        for trace_nr, trace_cfg in enumerate(G_CFG.traces):
+            if trace_cfg.name not in run_trace_nrs:
+                continue
+            run_t_nr = run_trace_nrs[trace_cfg.name]
+            cols, ymin, ymax = run_traces[(int(g_name.removeprefix("graph")), run_t_nr)]
+            if len(cols["x"]) == 0:
+                continue
+
+            key = (name, g_name, run_t_nr, G_CFG.totalx, nxdown, G_CFG.downsampling)
+            x, y = self._cache.get(key, lambda: self._downsample(cols["x"], cols["y"], G_CFG, nxdown))
+            overlay.append((trace_nr, x, y, ymin, ymax))
+        return overlay
+
+    @staticmethod
+    def _downsample(x: NDArray, y: NDArray, G_CFG: GraphConfig, nxdown: int) -> tuple[NDArray, NDArray]:
+        xdown    = np.linspace(0, G_CFG.totalx, nxdown)
+        new_chkp = int(np.searchsorted(xdown, x[-1], side="right")) - 1
+        if new_chkp < 0:
+            return np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        xDown, ysDown = DOWNSAMPLERS[G_CFG.downsampling](xdown, x, [y], -1, new_chkp)
+        return np.asarray(xDown, dtype=np.float64), np.asarray(ysDown[0], dtype=np.float64)
+
+
+def make_overlay_trace(G_CFG: GraphConfig, trace_nr: int, run_name: str, x: NDArray, y: NDArray) -> dict:
+    """ plotly trace (as plain dict, for appending with a patch) of one overlaid run trace """
+
+    trace_cfg = G_CFG.traces[trace_nr]
+    trace = dict(
+        type          = "scatter",
+        x             = x.tolist(),
+        y             = y.tolist(),
+        name          = f"{trace_cfg.name} ({run_name})",
+        mode          = "lines",
+        line          = dict(color=adjust_alpha(trace_cfg.color, COMPARISON_ALPHA), width=1.5, dash="dash"),
+        legendgroup   = f"run {run_name}",
+        meta          = f"{trace_cfg.name} ({run_name})",
+        hovertemplate = "%{meta}: %{y:.4f}<extra></extra>",
+    )
+    if (G_CFG.has_subplots is True) and (trace_cfg.yaxis == "secondary"):
+        trace["yaxis"] = "y2"
+    return trace
@@ -2,10 +2,10 @@ import numpy as np
 import plotly.graph_objects as go
 from   plotly.subplots import make_subplots
 
-from   mldashboard.utils import adjust_alpha
+from   mldashboard.utils import adjust_alpha, plotly_color
 
 from ...containers.setupconfig import GraphConfig
-from ...containers.datastore import Store, GraphStore, TraceData, TraceT2Id, TraceA2Id
+from ...containers.datastore import Store, GraphStore, TraceData, TraceT2Id, TraceA2Id, LAYER_STATS
 
 # TODO: move the subfunctions out of this function, so that they don't use "globals" like they do now
 def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
@@ -50,7 +50,7 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
                 name          = trace_cfg.name,
                 mode          = "lines",
                 line          = dict(
-                    color     = trace_cfg.color,
+                    color     = plotly_color(trace_cfg.color),
                     width     = TRACEWIDTH,
                     shape     = trace_cfg.shape, 
                     smoothing = SMOOTHING,
@@ -74,8 +74,9 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
     def _add_traces_min(G_CFG: GraphConfig, g_store: GraphStore, fig: go.Figure):
         
         if G_CFG.showmin is not False:            
-            # if not false, showmin is expected to be the trace number for which the min is shown
-            trace_nr_with_min  = int(G_CFG.showmin[-1]) # e.g. 1, extract from the traceX string
+            # if not false, showmin is the trace for which the min is shown (resolved once, the callbacks only use the
+            # registered minline ids)
+            trace_nr_with_min  = G_CFG.trace_nr(G_CFG.showmin)
             
             # create the trace
             trace = go.Scatter(
@@ -83,7 +84,7 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
                 y          = [None, None], 
                 mode       = "lines+markers",
                 line       = dict(
-                    color = G_CFG.traces[trace_nr_with_min].color,
+                    color = plotly_color(G_CFG.traces[trace_nr_with_min].color),
                     width = TRACEWIDTH,
                     dash  = "dot",
                     shape = "linear",
@@ -119,7 +120,7 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
                 font      = dict(
                     family = "JetBrains Mono", 
                     size = 14, 
-                    color = G_CFG.traces[trace_nr_with_min].color,
+                    color = plotly_color(G_CFG.traces[trace_nr_with_min].color),
                 ),
                 showarrow = False,
                 align     = "left",
@@ -136,7 +137,7 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
     def _add_traces_max(G_CFG: GraphConfig, g_store: GraphStore, fig: go.Figure):
         
         if G_CFG.showmax is not False:
-            trace_nr_with_max  = int(G_CFG.showmax[-1]) # e.g. 1 extract from the traceX string
+            trace_nr_with_max  = G_CFG.trace_nr(G_CFG.showmax)
             
             # create the trace
             trace = go.Scatter(
@@ -144,7 +145,7 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
                 y          = [None, None], 
                 mode       = "lines+markers",
                 line       = dict(
-                    color = G_CFG.traces[trace_nr_with_max].color,
+                    color = plotly_color(G_CFG.traces[trace_nr_with_max].color),
                     width = TRACEWIDTH,
                     dash  = "dot",
                     shape = "linear",
@@ -180,7 +181,7 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
                 font      = dict(
                     family = "JetBrains Mono", 
                     size = 14, 
-                    color = G_CFG.traces[trace_nr_with_max].color,
+                    color = plotly_color(G_CFG.traces[trace_nr_with_max].color),
                 ),
                 showarrow = False,
                 align     = "left",
@@ -206,7 +207,7 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
                 name        = f"{trace_cfg.name}_lo",
                 mode        = "lines",
                 line        = dict(
-                    color     = trace_cfg.color,
+                    color     = plotly_color(trace_cfg.color),
                     width     = 0, 
                     shape     = trace_cfg.shape, 
                     smoothing = SMOOTHING
@@ -221,7 +222,7 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
                 name        = f"{trace_cfg.name}_hi",
                 mode        = "lines",
                 line        = dict(
-                    color     = trace_cfg.color, 
+                    color     = plotly_color(trace_cfg.color), 
                     width     = 0, 
                     shape     = trace_cfg.shape, 
                     smoothing = SMOOTHING,
@@ -258,10 +259,10 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
                 y             = [None, None],
                 mode          = "markers",
                 marker        = dict(
-                    color    = [adjust_alpha(trace_cfg.color, 0), trace_cfg.color], 
+                    color    = [adjust_alpha(trace_cfg.color, 0), plotly_color(trace_cfg.color)], 
                     size     = [12, 5],
                     gradient = dict(
-                        color = [adjust_alpha(trace_cfg.color, 0.5), trace_cfg.color], 
+                        color = [adjust_alpha(trace_cfg.color, 0.5), plotly_color(trace_cfg.color)], 
                         type  = ["radial", "radial"]
                     ),
                     opacity  = [1.0, 1.0],
@@ -533,3 +534,52 @@ def make_flexgraph(G_CFG: GraphConfig, g_store: GraphStore):
             graph = _ud_y_labl_mono(G_CFG, graph)
     
     return graph
+
+def make_layer_heatmap(names: list[str]) -> go.Figure:
+    """ one heatmap per layer statistic (LAYER_STATS) below each other, tracked steps along x and one row per layer.
+    the values are log10, z holds one row per step (transpose=True), so that new steps are just appended to z """
+    
+    GRAY_LIGHT    = "rgb(200, 200, 200)"
+    PLOT_BGCOLOR  = "rgba(0, 0, 0, 0.0)"
+    PAPER_BGCOLOR = "rgba(0, 0, 0, 0.0)"
+    COLORSCALES   = ["Viridis", "Cividis", "Plasma"]
+    FONT          = dict(family="JetBrains Mono", size=10, color=GRAY_LIGHT)
+    
+    n_stats = len(LAYER_STATS)
+    fig     = make_subplots(rows=n_stats, cols=1, shared_xaxes=True, vertical_spacing=0.04, subplot_titles=LAYER_STATS)
+    for stat_nr, (stat, colorscale) in enumerate(zip(LAYER_STATS, COLORSCALES)):
+        fig.add_trace(
+            go.Heatmap(
+                x             = [],
+                y             = names,
+                z             = [],
+                transpose     = True,
+                colorscale    = colorscale,
+                colorbar      = dict(
+                    title    = dict(text="log10", font=FONT),
+                    tickfont = FONT,
+                    len      = 1 / n_stats * 0.9,
+                    y        = 1 - (stat_nr + 0.5) / n_stats,
+                    yanchor  = "middle",
+                ),
+                name          = stat,
+                hovertemplate = f"{stat}<br>step %{{x}}<br>%{{y}}<br>log10: %{{z:.3f}}<extra></extra>",
+            ),
+            row = stat_nr + 1,
+            col = 1,
+        )
+    
+    fig.update_layout(
+        uirevision    = "const",
+        margin        = dict(l=0, r=0, t=20, b=0),
+        margin_pad    = 5,
+        plot_bgcolor  = PLOT_BGCOLOR,
+        paper_bgcolor = PAPER_BGCOLOR,
+        hoverlabel    = dict(bgcolor="black", bordercolor=GRAY_LIGHT, font=dict(family="JetBrains Mono", size=12)),
+        modebar       = {"orientation": "v"},
+    )
+    fig.update_annotations(font=dict(family="JetBrains Mono", size=12, color=GRAY_LIGHT))
+    fig.update_xaxes(tickfont=FONT, showgrid=False)
+    fig.update_yaxes(tickfont=FONT, showgrid=False, showticklabels=(len(names) <= 40))
+    
+    return fig
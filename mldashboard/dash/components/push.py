@@ -0,0 +1,47 @@
+### IMPORTS ############################################################################################################
+import json
+import time
+from   typing import Iterator
+
+from ...containers.updatesignal import UpdateSignal
+
+### DEFINITIONS ########################################################################################################
+
+# route of the server sent events endpoint on the underlying flask server
+PUSH_ROUTE          = "/_mldashboard/updates"
+# all updates published within one frame are coalesced into a single event (seconds)
+PUSH_FRAME_INTERVAL = 0.05
+# comment line sent when nothing happens for a while, keeps proxies / ssh tunnels from closing the connection (seconds)
+PUSH_KEEPALIVE      = 15.0
+# the topics are the graph names and "procs". the changed graphs of one event all go to the "push-graphs" store (one
+# batched update callback for all graphs), procs goes to "push-procs"
+PUSH_STORES         = ["graphs", "procs"]
+
+
+def stream_updates(
+    signal:         UpdateSignal,
+    frame_interval: float = PUSH_FRAME_INTERVAL,
+    keepalive:      float = PUSH_KEEPALIVE,
+) -> Iterator[str]:
+    """ server sent events for one client. blocks (without any cpu load) until new data is published, waits for the
+    rest of the frame to collect everything else that comes in, then sends the new versions of all changed topics as
+    one json event. the client triggers the update callbacks for exactly these topics """
+
+    event = signal.subscribe()
+    sent  = {}
+    try:
+        while True:
+            if not event.wait(keepalive):
+                yield ": keepalive\n\n"
+                continue
+
+            time.sleep(frame_interval)
+            # clear before reading, a publish in between just causes one more (possibly empty) round
+            event.clear()
+            changed = {topic: ver for topic, ver in signal.snapshot().items() if sent.get(topic) != ver}
+            if len(changed) > 0:
+                sent.update(changed)
+                yield f"data: {json.dumps(changed)}\n\n"
+    finally:
+        # runs when the client disconnects (the server closes the generator)
+        signal.unsubscribe(event)
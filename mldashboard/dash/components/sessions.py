@@ -0,0 +1,182 @@
+### IMPORTS ############################################################################################################
+import threading
+import time
+from   collections import OrderedDict
+from   contextlib import contextmanager
+from   dataclasses import dataclass, field
+from   typing import Callable, Iterator
+
+from ...containers.setupconfig import Config
+from ...containers.datastore import GraphCursors
+
+### DEFINITIONS ########################################################################################################
+
+# sessions (browser tabs) that did not call back for this long are dropped (seconds)
+SESSION_TIMEOUT      = 600.0
+# number of computed patch segments that are kept per graph
+SEGMENT_CACHE_SIZE   = 256
+# polls of the browser arrive a bit early or late, a graph is due this much before its update interval passed (seconds)
+CADENCE_JITTER       = 0.05
+# the polling interval doubles after this many polls in a row without new data, up to the maximum (ms)
+BACKOFF_PATIENCE     = 4
+BACKOFF_MAX_INTERVAL = 8_000
+
+
+@dataclass
+class _Session:
+    """ server side state of one browser session """
+
+    last_access: float
+    # graph name: (cursors, lock)
+    graphs:      dict = field(default_factory=dict)
+    # graph name: published version the session has seen
+    seen:        dict = field(default_factory=dict)
+    # graph name: time of the last update that was sent (GraphConfig.update_interval)
+    sent_at:     dict = field(default_factory=dict)
+    # published versions at the last poll, polls in a row without any new data and the polling interval the browser
+    # was told (adaptive cadence)
+    versions:    dict = field(default_factory=dict)
+    idle_polls:  int  = 0
+    interval:    int  = None
+
+
+class SessionCursors:
+    """ server side checkpoints. every browser session (identified by the session-id store of its page) gets one
+    TraceCursor per trace of every graph, so the checkpoints never have to travel through the browser. all callbacks of
+    one session and graph are serialized, so that e.g. a level-of-detail update and a regular update can not both
+    continue from the same checkpoint. also remembers which published version of each graph the session has seen, so
+    that graphs without new data can be skipped without looking at their traces.
+
+    with cadence, every graph is updated at most every GraphConfig.update_interval, and the polling interval of the
+    session backs off (doubles every BACKOFF_PATIENCE polls, up to BACKOFF_MAX_INTERVAL) while no graph gets new data.
+    it is back at the fastest graph's interval as soon as there is new data """
+
+    def __init__(self, CONFIG: Config, timeout: float = SESSION_TIMEOUT, cadence: bool = True):
+        """
+        Args:
+            CONFIG : the full graph and trace configuration
+            timeout: sessions that did not call back for this long are dropped (seconds)
+            cadence: False sends every graph as soon as it changed (push mode, where a graph that is held back would 
+                     only be sent with the next push)
+        """
+
+        self._CONFIG   = CONFIG
+        self._timeout  = timeout
+        self._cadence  = cadence
+        self._sessions: dict[str, _Session] = {}
+        self._lock     = threading.Lock()
+
+        # seconds per graph, and the polling interval of a session with new data (ms)
+        self._update_intervals = {g_name: G_CFG.update_interval / 1e3 for g_name, G_CFG in CONFIG.graphs.items()}
+        self.base_interval     = min(G_CFG.update_interval for G_CFG in CONFIG.graphs.values())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _touch(self, session_id: str) -> _Session:
+        """ state of a session (created on first access), has to be called with the lock held """
+
+        now = time.monotonic()
+        self._prune(now)
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = _Session(last_access=now, interval=self.base_interval)
+            self._sessions[session_id] = session
+        session.last_access = now
+        return session
+
+    @contextmanager
+    def checkout(self, session_id: str, g_name: str) -> Iterator[GraphCursors]:
+        """ the cursors of one session and graph (created on first access), locked while the caller works with them """
+
+        with self._lock:
+            graphs = self._touch(session_id).graphs
+            if g_name not in graphs:
+                n_traces = len(self._CONFIG.graphs[g_name].traces)
+                graphs[g_name] = (GraphCursors(n_traces), threading.Lock())
+            cursors, cursors_lock = graphs[g_name]
+
+        with cursors_lock:
+            yield cursors
+
+    def changed_graphs(self, session_id: str, versions: dict[str, int]) -> set[str]:
+        """ the graphs whose published version (UpdateSignal) differs from the one this session has seen, which are
+        marked as seen right away. versions has to be taken before the data is read, so nothing can be missed. a new
+        session has seen nothing yet, so its first call returns all graphs. with cadence, changed graphs whose update
+        interval did not pass yet are held back (and returned by a later call) """
+
+        with self._lock:
+            session = self._touch(session_id)
+            now     = time.monotonic()
+            changed = {
+                g_name for g_name in self._CONFIG.graphs if versions.get(g_name, 0) != session.seen.get(g_name, -1)
+            }
+            due = changed
+            if self._cadence is True:
+                due = {
+                    g_name for g_name in changed
+                    if now - session.sent_at.get(g_name, float("-inf")) >= self._update_intervals[g_name] - CADENCE_JITTER
+                }
+            for g_name in due:
+                session.seen[g_name]    = versions.get(g_name, 0)
+                session.sent_at[g_name] = now
+            # new data is anything that was published since the last poll (also layer statistics, ...) and held back
+            # graphs, the session keeps polling at full rate for them. the processing speed has its own interval
+            versions = {name: version for name, version in versions.items() if name != "procs"}
+            new_data = (len(changed) > 0) or (versions != session.versions)
+            session.versions   = versions
+            session.idle_polls = 0 if new_data is True else session.idle_polls + 1
+        return due
+
+    def poll_interval(self, session_id: str) -> int | None:
+        """ the polling interval (ms) this session should use after its last changed_graphs call, None if the browser
+        already uses it """
+
+        with self._lock:
+            session  = self._touch(session_id)
+            interval = min(self.base_interval * 2**(session.idle_polls // BACKOFF_PATIENCE), BACKOFF_MAX_INTERVAL)
+            interval = max(interval, self.base_interval) # graphs that are slower than the maximum backoff
+            if interval == session.interval:
+                return None
+            session.interval = interval
+        return interval
+
+    def _prune(self, now: float):
+        expired = [sid for sid, session in self._sessions.items() if now - session.last_access > self._timeout]
+        for sid in expired:
+            del self._sessions[sid]
+
+
+class SegmentCache:
+    """ memoized patch segments of one graph, keyed by (trace number, from checkpoint, to checkpoint, ...). all sessions
+    that are at the same checkpoint share the (downsampling) work. the key has to hold everything the segment depends
+    on: interp and m4 only read the raw points of the covered buckets, which never change (append-only data), lttb also
+    reads the next, incomplete bucket (its raw end is part of the key). least recently used segments are dropped first
+    """
+
+    def __init__(self, maxsize: int = SEGMENT_CACHE_SIZE):
+        self._maxsize  = maxsize
+        self._segments = OrderedDict()
+        self._lock     = threading.Lock()
+        self.hits      = 0
+        self.misses    = 0
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def get(self, key: tuple, compute: Callable):
+        with self._lock:
+            if key in self._segments:
+                self._segments.move_to_end(key)
+                self.hits += 1
+                return self._segments[key]
+            self.misses += 1
+
+        # computed outside of the lock, two sessions missing at the same time just both compute it
+        segment = compute()
+        with self._lock:
+            self._segments[key] = segment
+            self._segments.move_to_end(key)
+            while len(self._segments) > self._maxsize:
+                self._segments.popitem(last=False)
+        return segment
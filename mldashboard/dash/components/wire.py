@@ -0,0 +1,83 @@
+### IMPORTS ############################################################################################################
+import base64
+
+import numpy as np
+from   numpy.typing import NDArray
+from   dash import Patch, no_update
+
+from ...containers.setupconfig import TRANSPORTS
+
+### DEFINITIONS ########################################################################################################
+
+# x is always sent as float64: float32 only holds integers up to 2**24 (~16.7M steps) exactly, after that neighbouring
+# steps collapse onto the same x. the y values (y, ylo, yhi) lose nothing visible in float32
+X_DTYPE = "f8"
+
+
+def encode_typed_array(values: NDArray, dtype: str) -> dict:
+    """ encodes a numeric array as a plotly.js style typed array spec (little endian, base64 buffer) """
+
+    return {
+        "dtype": dtype,
+        "bdata": base64.b64encode(np.ascontiguousarray(values, dtype=f"<{dtype}").data).decode("ascii"),
+    }
+
+
+class PatchWriter:
+    """ collects all the changes to one figure during a callback. small changes (annotations, ranges, markers) are
+    written through the regular dash Patch proxy (writer["layout"]...), bulk numeric trace data goes through
+    extend_array / assign_array. with the "json" transport, everything ends up in a plain dash Patch (float lists).
+    with a binary transport, the bulk arrays are sent as base64 typed array buffers in a payload for a dcc.Store, which
+    the clientside decoder (assets/wire.js) turns back into a Patch for the figure. x arrays are float64 in any case
+    (X_DTYPE), binary32 only narrows the y arrays """
+
+    def __init__(self, transport: str = "json"):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"transport has to be one of {list(TRANSPORTS)}! (got {transport})")
+
+        self._dtype     = TRANSPORTS[transport]
+        self._patch     = Patch()
+        self._bulk_ops  = [] # only used with a binary transport
+
+    def __getitem__(self, key):
+        return self._patch[key]
+
+    def extend_array(self, location: list, values: NDArray):
+        if self._dtype is None:
+            self._get_proxy(location).extend(values.tolist())
+        else:
+            self._bulk_ops.append(self._bulk_op("Extend", location, values))
+
+    def assign_array(self, location: list, values: NDArray):
+        if self._dtype is None:
+            self._set_proxy(location, values.tolist())
+        else:
+            self._bulk_ops.append(self._bulk_op("Assign", location, values))
+
+    def result(self):
+        """ the dash Patch (json transport) or the wire payload (binary transport), no_update if nothing changed in the
+        binary case (saves the clientside round) """
+
+        if self._dtype is None:
+            return self._patch
+
+        operations = self._bulk_ops + self._patch.to_plotly_json()["operations"]
+        if len(operations) == 0:
+            return no_update
+        return {"operations": operations}
+
+    def _bulk_op(self, operation: str, location: list, values: NDArray) -> dict:
+        return {
+            "operation": operation,
+            "location":  list(location),
+            "params":    {"value": encode_typed_array(values, X_DTYPE if location[-1] == "x" else self._dtype)},
+        }
+
+    def _get_proxy(self, location: list):
+        proxy = self._patch
+        for key in location:
+            proxy = proxy[key]
+        return proxy
+
+    def _set_proxy(self, location: list, value):
+        self._get_proxy(location[:-1])[location[-1]] = value
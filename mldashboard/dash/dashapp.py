@@ -1,133 +1,292 @@
 ### IMPORTS ############################################################################################################
 import numpy as np
-from   dash import Dash, Input, Output, State, Patch, dcc, html, no_update
+from   dash import Dash, Input, Output, State, Patch, dcc, html, no_update, ctx, ClientsideFunction, ALL, MATCH
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
-from   dataclasses import fields
+import uuid
+import flask
 
 from .components.callbacks import callback_update_proc_speed
 from .components.callbacks import callback_generate_flexgraph_patch
-from .components.graphs import make_flexgraph
+from .components.callbacks import callback_generate_lod_patch
+from .components.callbacks import callback_generate_comparison_patch
+from .components.callbacks import callback_generate_layer_patch
+from .components.push import stream_updates, PUSH_ROUTE, PUSH_STORES
+from .components.sessions import SessionCursors, SegmentCache
+from .components.comparison import RunArchive
+from .components.graphs import make_flexgraph, make_layer_heatmap
 from .components.cards import make_graphcard
 from ..containers.setupconfig import Config, GraphConfig, TraceConfig
 from ..containers.datastore import Store, GraphStore, TraceData, TraceT2Id, TraceA2Id, ProcsData
 
+# milliseconds between two updates of the processing speed (polling, the graphs have GraphConfig.update_interval)
+PROCS_INTERVAL = 500
 
-def make_plotter_app(CONFIG: Config, store: Store):
-    
-    # declare variable and handles -------------------------------------------------------------------------------------
-    app = Dash(
-        __name__,
-        external_stylesheets = [],
-        assets_folder        = "./assets" # specify assets folder because project structure is different from default
-    )
+
+def _graph_id(kind: str, g_name: str) -> dict:
+    """ pattern matching id of the per-graph components (kind is one of card, wire, compare), so that one callback can
+    serve any number of graphs """
     
-    graph1 = make_flexgraph(CONFIG.graph1, store.graph1)
-    graph2 = make_flexgraph(CONFIG.graph2, store.graph2)
-    graph3 = make_flexgraph(CONFIG.graph3, store.graph3)
+    return {"type": f"graph-{kind}", "index": g_name}
+
+def _update_triggers(push: bool, graphs_interval: int) -> list:
+    """ components that trigger the regular update callbacks. either two intervals (polling, one for all graphs, which
+    is adapted by the graph updates, and one for the processing speed) or one store per push store, which is set by 
+    the clientside event stream (assets/push.js) only when there is new data """
     
-    # app layout -------------------------------------------------------------------------------------------------------
-    app.layout = html.Div(
-        className = "main-grid",
-        children = [
-            make_graphcard(
-                title = CONFIG.graph1.title, 
-                gridbox = "A", 
-                graphid = "graph-card-1", 
-                graphfig = graph1
-            ),
-            make_graphcard(
-                title = CONFIG.graph2.title, 
-                gridbox = "B", 
-                graphid = "graph-card-2", 
-                graphfig = graph2
-            ),
-            make_graphcard(
-                title = CONFIG.graph3.title, 
-                gridbox = "C", 
-                graphid = "graph-card-3", 
-                graphfig = graph3
-            ),
-            html.Div(
-                className = "card main-grid-boxD",
-                children  = [
-                    html.Div(className = "header", children = ["Processing Speed"]),
-                    html.Div(
-                        className = "body proc-speed",
-                        id        = "proc-speed-text",
-                        children  = [f"---'---.-- samples/sec"],
-                    ),
-                ],
-            ),
-            html.Div(
-                className = "card main-grid-boxE",
-                children  = [
-                    html.Div(className = "header", children = ["Model Summary"]),
-                    html.Div(className = "body model-info", children = [store.msummary]),
-                ],
-            ),
-            
-            dcc.Interval(
-                id          = "ud-interval-1",
-                interval    = 500, #TODO rout to config file
-                n_intervals = 0,
-            ),
+    if push is False:
+        return [
             dcc.Interval(
-                id          = "ud-interval-2",
-                interval    = 500,
+                id          = "ud-interval-graphs",
+                interval    = graphs_interval,
                 n_intervals = 0,
             ),
             dcc.Interval(
-                id          = "ud-interval-3",
-                interval    = 500,
+                id          = "ud-interval-procs",
+                interval    = PROCS_INTERVAL,
                 n_intervals = 0,
             ),
-            dcc.Interval(
-                id          = "ud-interval-4",
-                interval    = 500,
-                n_intervals = 0,
-            ),
-            
-            # checkpoints are in stores so that they are "race condition" safe, or rather multithreading-safe?
-            # initialize the checkpoint for each trace to -1
-            dcc.Store(id="g1-chkp-traces", data=[-1]*len(CONFIG.graph1.traces)),
-            dcc.Store(id="g2-chkp-traces", data=[-1]*len(CONFIG.graph2.traces)),
-            dcc.Store(id="g3-chkp-traces", data=[-1]*len(CONFIG.graph3.traces)),
         ]
+    
+    return [dcc.Store(id=f"push-{name}") for name in PUSH_STORES] + [
+        dcc.Store(id="push-route", data=PUSH_ROUTE),
+        dcc.Store(id="push-connected"),
+    ]
+
+def _update_input(push: bool, name: str) -> Input:
+    if push is False:
+        return Input(f"ud-interval-{name}", "n_intervals")
+    return Input(f"push-{name}", "data")
+
+def _layer_card(store: Store) -> list:
+    """ heatmaps of the per-layer statistics at the end of the graph column, only with layer tracking """
+    
+    if store.layers is None:
+        return []
+    return [
+        make_graphcard(
+            title    = "Layer Statistics",
+            graphid  = "layer-heatmap",
+            graphfig = make_layer_heatmap(store.layers.names),
+        )
+    ]
+
+def _comparison_card(archive: RunArchive | None) -> list:
+    """ run selection for overlaying earlier runs, only there if there is an archive to choose from """
+    
+    if archive is None:
+        return []
+    return [
+        html.Div(className = "header", children = ["Compare Runs"]),
+        dcc.Dropdown(
+            id          = "compare-runs",
+            className   = "compare-runs",
+            options     = archive.names,
+            value       = [],
+            multi       = True,
+            placeholder = "overlay earlier runs ...",
+        ),
+    ]
+
+def make_plotter_app(CONFIG: Config, store: Store, push: bool = False, archive: RunArchive = None):
+    
+    # declare variable and handles -------------------------------------------------------------------------------------
+    app = Dash(
+        __name__,
+        external_stylesheets = [],
+        assets_folder        = "./assets" # specify assets folder because project structure is different from default
     )
     
+    figures = {g_name: make_flexgraph(G_CFG, store.graphs[g_name]) for g_name, G_CFG in CONFIG.graphs.items()}
+    
+    # server side state of all the sessions ----------------------------------------------------------------------------
+    # (in push mode, the graphs are only sent when they are pushed, there is no cadence to keep)
+    sessions   = SessionCursors(CONFIG, cadence=not push)
+    seg_caches = {g_name: SegmentCache() for g_name in CONFIG.graphs}
+    
+    # app layout -------------------------------------------------------------------------------------------------------
+    
+    # served as a function, so that every page load gets its own session id
+    def serve_layout():
+        return html.Div(
+            className = "main-grid",
+            children = [
+                # all graphs stacked in one column, which scrolls when there are more than fit into the window
+                html.Div(
+                    className = "main-grid-boxG graph-column",
+                    children  = [
+                        make_graphcard(
+                            title    = G_CFG.title,
+                            graphid  = _graph_id("card", g_name),
+                            graphfig = figures[g_name],
+                        )
+                        for g_name, G_CFG in CONFIG.graphs.items()
+                    ] + _layer_card(store),
+                ),
+                html.Div(
+                    className = "card main-grid-boxD",
+                    children  = [
+                        html.Div(className = "header", children = ["Processing Speed"]),
+                        html.Div(
+                            className = "body proc-speed",
+                            id        = "proc-speed-text",
+                            children  = [f"---'---.-- samples/sec"],
+                        ),
+                    ],
+                ),
+                html.Div(
+                    className = "card main-grid-boxE",
+                    children  = [
+                        *_comparison_card(archive),
+                        html.Div(className = "header", children = ["Model Summary"]),
+                        html.Div(className = "body model-info", children = [store.msummary]),
+                    ],
+                ),
+                
+                *_update_triggers(push, sessions.base_interval),
+                
+                # fresh id on every page load, the checkpoints of the session are kept on the server (SessionCursors)
+                dcc.Store(id="session-id", data=uuid.uuid4().hex),
+                
+                # binary encoded patches on their way to the clientside decoder (only used with a binary transport)
+                *[dcc.Store(id=_graph_id("wire", g_name)) for g_name in CONFIG.graphs],
+                
+                # the earlier runs that are overlaid on each graph (and their y range), see RunArchive
+                *[dcc.Store(id=_graph_id("compare", g_name)) for g_name in CONFIG.graphs],
+                
+                # number of tracked steps in this session's layer heatmaps
+                *([dcc.Store(id="layer-seen", data=0)] if store.layers is not None else []),
+            ]
+        )
+    
+    app.layout = serve_layout
+    
     # callbacks --------------------------------------------------------------------------------------------------------
     
-    # temp uncomment
-    @app.callback(
-        [Output("graph-card-1", "figure"), Output("g1-chkp-traces", "data")],
-        [Input("ud-interval-1", "n_intervals")],
-        [State("g1-chkp-traces", "data")]
-    )
-    def update_graph_1(n, g1_chkp):
-        return callback_generate_flexgraph_patch(CONFIG.graph1, store.graph1, g1_chkp)
+    def _route_patch(G_CFG: GraphConfig, patch: Patch) -> tuple:
+        """ (figure, wire) outputs of one graph. json patches go directly to the figure, binary ones go to the graph's
+        wire store, from where the clientside decoder (assets/wire.js) applies them to the figure """
+        
+        if G_CFG.transport == "json":
+            return patch, no_update
+        return no_update, patch
     
+    # one update for all graphs, only the graphs that got new data since the session last saw them (and are due, see
+    # GraphConfig.update_interval) are looked at and sent (the outputs are in layout order, which is the order of 
+    # CONFIG.graphs). when polling, it also adapts the polling interval of the session
     @app.callback(
-        [Output("graph-card-2", "figure"), Output("g2-chkp-traces", "data")],
-        [Input("ud-interval-2", "n_intervals")],
-        [State("g2-chkp-traces", "data")]
+        [
+            Output(_graph_id("card", ALL), "figure"),
+            Output(_graph_id("wire", ALL), "data"),
+            *([Output("ud-interval-graphs", "interval")] if push is False else []),
+        ],
+        [_update_input(push, "graphs")],
+        [State("session-id", "data"), State(_graph_id("compare", ALL), "data")]
     )
-    def update_graph_2(n, g2_chkp):
-        return callback_generate_flexgraph_patch(CONFIG.graph2, store.graph2, g2_chkp)
+    def update_graphs(n, session_id, compares):
+        versions = store.signal.snapshot()
+        changed  = sessions.changed_graphs(session_id, versions)
+        
+        figs  = [no_update] * len(CONFIG.graphs)
+        wires = [no_update] * len(CONFIG.graphs)
+        for i, (g_name, G_CFG) in enumerate(CONFIG.graphs.items()):
+            if g_name not in changed:
+                continue
+            with sessions.checkout(session_id, g_name) as cursors:
+                patch = callback_generate_flexgraph_patch(
+                    G_CFG, store.graphs[g_name], cursors, seg_caches[g_name],
+                    overlay_range = None if compares[i] is None else compares[i]["yrange"],
+                )
+            figs[i], wires[i] = _route_patch(G_CFG, patch)
+        
+        if push is True:
+            return figs, wires
+        interval = sessions.poll_interval(session_id)
+        return figs, wires, (no_update if interval is None else interval)
     
-    @app.callback(
-        [Output("graph-card-3", "figure"), Output("g3-chkp-traces", "data")],
-        [Input("ud-interval-3", "n_intervals")],
-        [State("g3-chkp-traces", "data")]
-    )
-    def update_graph_3(n, g3_chkp):
-        return callback_generate_flexgraph_patch(CONFIG.graph3, store.graph3, g3_chkp)
+    # zoom-aware level of detail, only for the graphs that have it enabled
+    if any(G_CFG.lod is not False for G_CFG in CONFIG.graphs.values()):
+        @app.callback(
+            [
+                Output(_graph_id("card", MATCH), "figure", allow_duplicate=True),
+                Output(_graph_id("wire", MATCH), "data", allow_duplicate=True),
+            ],
+            [Input(_graph_id("card", MATCH), "relayoutData")],
+            [State("session-id", "data")],
+            prevent_initial_call = True,
+        )
+        def update_lod(relayout, session_id):
+            g_name = ctx.triggered_id["index"]
+            G_CFG  = CONFIG.graphs[g_name]
+            if G_CFG.lod is False:
+                return no_update, no_update
+            with sessions.checkout(session_id, g_name) as cursors:
+                return _route_patch(G_CFG, callback_generate_lod_patch(G_CFG, store.graphs[g_name], relayout, cursors))
+    
+    # decode the binary patches in the browser, only needed if some graph uses a binary transport
+    if any(G_CFG.transport != "json" for G_CFG in CONFIG.graphs.values()):
+        app.clientside_callback(
+            ClientsideFunction(namespace="wire", function_name="apply_patch"),
+            Output(_graph_id("card", MATCH), "figure", allow_duplicate=True),
+            Input(_graph_id("wire", MATCH), "data"),
+            prevent_initial_call = True,
+        )
+    
+    # overlay of earlier runs, appended behind the traces of the live figure
+    if archive is not None:
+        n_lives = {g_name: len(fig.data) for g_name, fig in figures.items()}
+        
+        @app.callback(
+            [
+                Output(_graph_id("card", ALL), "figure", allow_duplicate=True),
+                Output(_graph_id("compare", ALL), "data"),
+            ],
+            [Input("compare-runs", "value")],
+            [State("session-id", "data"), State(_graph_id("compare", ALL), "data")],
+            prevent_initial_call = True,
+        )
+        def update_comparison(selected, session_id, shown):
+            patches = []
+            for i, (g_name, G_CFG) in enumerate(CONFIG.graphs.items()):
+                # the y range it sends becomes the one the session's graph patches compare against
+                with sessions.checkout(session_id, g_name) as g_cursors:
+                    patches.append(callback_generate_comparison_patch(
+                        G_CFG, g_name, store.graphs[g_name], n_lives[g_name], selected, shown[i], archive, g_cursors
+                    ))
+            return [patch for patch, _ in patches], [compare for _, compare in patches]
+    
+    # per-layer statistics, new steps are appended as heatmap columns (published as "layers", so in push mode they come
+    # with the graphs)
+    if store.layers is not None:
+        @app.callback(
+            [Output("layer-heatmap", "figure"), Output("layer-seen", "data")],
+            [_update_input(push, "graphs")],
+            [State("layer-seen", "data")]
+        )
+        def update_layers(n, seen):
+            return callback_generate_layer_patch(store.layers, seen)
+    
+    # push mode: server sent events endpoint on the flask server, the browser connects to it once the layout is there
+    if push is True:
+        @app.server.route(PUSH_ROUTE)
+        def push_updates():
+            return flask.Response(
+                stream_updates(store.signal),
+                mimetype = "text/event-stream",
+                headers  = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        
+        app.clientside_callback(
+            ClientsideFunction(namespace="push", function_name="connect"),
+            Output("push-connected", "data"),
+            Input("push-route", "data"),
+        )
     
     @app.callback(
         [Output("proc-speed-text", "children")],
-        [Input("ud-interval-4", "n_intervals")]
+        [_update_input(push, "procs")]
     )
     def update_proc_speed(n):
         return callback_update_proc_speed(store)
 
-    return app
\ No newline at end of file
+    return app
@@ -0,0 +1,106 @@
+### IMPORTS ############################################################################################################
+import threading
+
+import numpy as np
+from   numpy.typing import NDArray
+
+from ..containers.setupconfig import Config
+from ..containers.sharedring import SharedRingBuffer
+from ..containers.datastore import LayerStatsData, LAYER_STATS
+
+### DEFINITIONS ########################################################################################################
+
+# seconds between two reads of the ring buffer in the dashboard process
+DRAIN_INTERVAL = 0.02
+
+
+def fold_ring_records(plotter, records: NDArray):
+    """ puts records from the ring buffer into the store of the dashboard side plotter, one vectorized batch per trace
+    (keeping the order within each trace). graph number 0 carries processing speed values, graph number -1 the layer
+    statistics (layer as trace number, step as x, the statistics as y, ylo, yhi) """
+
+    if len(records) == 0:
+        return
+
+    speed = records[records[:, 0] == 0]
+    if len(speed) > 0:
+        plotter._store.procs.speed.extend(speed[:, 3].tolist())
+        plotter._store.signal.publish("procs")
+
+    layers = records[records[:, 0] == -1]
+    if (len(layers) > 0) and (plotter._store.layers is not None):
+        # grouped by step, layers of a step that were dropped by the ring stay NaN
+        steps, step_idx = np.unique(layers[:, 2], return_inverse=True)
+        values = np.full((len(steps), len(LAYER_STATS), len(plotter._store.layers.names)), np.nan, dtype=np.float32)
+        values[step_idx, :, layers[:, 1].astype(np.int64)] = layers[:, 3:6]
+        plotter._store.layers.extend(steps.astype(np.int64), values)
+        plotter._store.signal.publish("layers")
+
+    records = records[records[:, 0] > 0]
+    keys    = np.unique(records[:, :2], axis=0)
+    for g_nr, t_nr in keys:
+        trace = records[(records[:, 0] == g_nr) & (records[:, 1] == t_nr)]
+        x, y, ylo, yhi = trace[:, 2], trace[:, 3], trace[:, 4], trace[:, 5]
+        # records without errors carry NaN, they get a zero-width band (same as add_data without errors)
+        ylo = np.where(np.isnan(ylo), y, ylo)
+        yhi = np.where(np.isnan(yhi), y, yhi)
+
+        g_name = f"graph{int(g_nr)}"
+        plotter._store.graphs[g_name].trc_data[int(t_nr)].extend(x, y, ylo, yhi)
+        plotter._store.signal.publish(g_name)
+
+def run_dashboard_process(
+    CONFIG:       Config,
+    ring_name:    str,
+    msummary:     str,
+    push_updates: bool,
+    compare_runs: list[str],
+    layer_names:  list[str] | None,
+    host:         str,
+    port:         int,
+):
+    """ entry point of the dashboard child process (out_of_process=True). builds its own store and dash app, drains the
+    training process' ring buffer into it on a background thread and serves the app in the main thread """
+
+    # imported here, the plotter module imports this one
+    from ..plotter import DashPlotter
+
+    plotter = DashPlotter(CONFIG, push_updates=push_updates, compare_runs=compare_runs)
+    plotter._store.msummary = msummary
+    if layer_names is not None:
+        # before the app is built, it only gets the layer heatmaps if the store has layer statistics
+        plotter._store.layers = LayerStatsData(layer_names)
+    serve_from_ring(plotter, SharedRingBuffer(name=ring_name), host, port)
+
+def drain_ring(plotter, ring: SharedRingBuffer, interval: float = DRAIN_INTERVAL) -> threading.Event:
+    """ reads the ring buffer into the store of the plotter every `interval` seconds on a background thread. set the
+    returned event to stop draining """
+
+    stop = threading.Event()
+
+    def _drain():
+        last_error = None
+        while not stop.wait(interval):
+            try:
+                fold_ring_records(plotter, ring.read())
+                last_error = None
+            except Exception as err:
+                # a bad batch must not end the thread (the dashboard would silently freeze), it is reported and the
+                # next read goes on. the same error is only reported once
+                if repr(err) != last_error:
+                    print(f"warning: could not read the ring buffer, going on ({type(err).__name__}: {err})")
+                last_error = repr(err)
+
+    threading.Thread(target=_drain, daemon=True).start()
+    return stop
+
+def serve_from_ring(plotter, ring: SharedRingBuffer, host: str, port: int):
+    """ drains the ring buffer into the store of the plotter on a background thread and serves its app (blocking) """
+
+    drain_ring(plotter, ring)
+    plotter._app.run(
+        host         = host,
+        port         = port,
+        debug        = True,
+        use_reloader = False,
+    )
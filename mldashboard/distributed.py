@@ -0,0 +1,194 @@
+### IMPORTS ############################################################################################################
+import dataclasses
+import time
+from   typing import Any
+
+import numpy as np
+from   numpy.typing import NDArray
+import torch
+import torch.distributed as dist
+
+from .plotter import DashPlotter, _to_host_arrays
+from .containers.setupconfig import TraceConfig
+from .utils import adjust_alpha
+
+### DEFINITIONS ########################################################################################################
+
+# ways of showing the values of all ranks {ranks: one trace per rank, spread: mean with a min / max errorband}
+AGGREGATION_MODES = ["ranks", "spread"]
+
+
+def per_rank_traces(trace_cfg: TraceConfig, world_size: int) -> list[TraceConfig]:
+    """ expands one logical trace into one trace per rank (for RankCollector with mode="ranks"). the rank traces keep
+    the color of the logical trace and fade out with the rank number """
+
+    return [
+        dataclasses.replace(
+            trace_cfg,
+            name  = f"{trace_cfg.name} r{rank}",
+            color = adjust_alpha(trace_cfg.color, 1.0 - 0.6 * rank / max(world_size - 1, 1)),
+        )
+        for rank in range(world_size)
+    ]
+
+class RankCollector:
+    """ collects the logged values of every rank of a torch.distributed run and gathers them to the dashboard on rank 0
+    every `every` steps (one gloo gather, so it also works next to an nccl training group). all ranks use the collector
+    like a DashPlotter (add_data, batchtimer) and call step() once per training step.
+
+    mode "ranks": logical trace t_nr of a graph shows up as trace t_nr * world_size + rank, build the graph config with
+    per_rank_traces. mode "spread": the graph shows the mean over the ranks (per x), with the min / max of the ranks as
+    errorband (needs errors=True on the trace). an x is only shown once every rank that logs the trace has reported it
+    (or a later x), the rest waits for the next gather, so that ranks that are not in step never split one x into
+    several points. (values for an x that was already shown, e.g. from a rank that starts logging the trace late, are
+    left out.) the processing speed is the sum of the speeds of all ranks """
+
+    def __init__(self, plotter: DashPlotter = None, every: int = 50, mode: str = "ranks", group: Any = None):
+        """
+        Args:
+            plotter: the dashboard, only needed (and only used) on rank 0
+            every  : gather every n calls to step(). flush() can be called any time (collective, on all ranks)
+            mode   : see AGGREGATION_MODES
+            group  : process group for the gather. default is the default group if it uses gloo, else a new gloo group
+        """
+
+        if mode not in AGGREGATION_MODES:
+            raise ValueError(f"mode has to be one of {AGGREGATION_MODES}! (got {mode})")
+
+        self._rank       = dist.get_rank()
+        self._world_size = dist.get_world_size()
+        if (self._rank == 0) and (plotter is None):
+            raise ValueError("rank 0 needs the plotter to collect the data of all ranks!")
+
+        self._plotter = plotter
+        self._every   = every
+        self._mode    = mode
+        # the gather always runs on cpu tensors, so it needs a gloo group (new_group is collective, all ranks get here)
+        if group is None and dist.get_backend() != "gloo":
+            group = dist.new_group(backend="gloo")
+        self._group   = group
+
+        self._pending = [] # (g_nr, t_nr, x, y), y can still be a tensor. speed values are stored as graph 0
+        self._n_steps = 0
+        self._t0      = None
+
+        # spread mode, per (g_nr, t_nr): largest x reported by each rank (NaN for ranks that do not log the trace), the
+        # (x, y) values that wait for the other ranks and the last x that was shown
+        self._reported = {}
+        self._held     = {}
+        self._shown    = {}
+
+    def add_data(self, g_nr: int, t_nr: int, x: float, y: Any):
+        """ only records the value (one value per call), tensors are moved to host all at once with the next gather """
+
+        size = y.numel() if isinstance(y, torch.Tensor) else np.size(y)
+        if size != 1:
+            raise ValueError(f"y has to be a single value, one point per add_data call! (got {size} values)")
+        self._pending.append((g_nr, t_nr, x, y.detach() if isinstance(y, torch.Tensor) else y))
+
+    def batchtimer(self, action: str, batch_size: int = None):
+        if action not in ["start", "stop"]:
+            raise ValueError(f"only 'start' and 'stop' allowed as action! (got {action})")
+
+        if action == "start":
+            self._t0 = time.perf_counter()
+
+        if action == "stop":
+            if self._t0 is None:
+                raise ValueError("start time for batchtimer was not set!")
+            if batch_size is None:
+                raise ValueError(f"please specify a batch size when stopping the timer!")
+            self._pending.append((0, 0, 0.0, batch_size / (time.perf_counter() - self._t0)))
+            self._t0 = None
+
+    def step(self):
+        self._n_steps += 1
+        if self._n_steps % self._every == 0:
+            self.flush()
+
+    def flush(self, final: bool = False):
+        """ gathers everything that was recorded on all ranks to rank 0 and puts it into the plotter (collective). final
+        also shows the values that still wait for other ranks (spread mode), e.g. at the end of the training """
+
+        local = self._pack()
+
+        # gloo gather needs equally sized tensors, so the sizes go first and everything is padded to the largest
+        counts = [torch.zeros(1, dtype=torch.int64) for _ in range(self._world_size)]
+        dist.all_gather(counts, torch.tensor([len(local)], dtype=torch.int64), group=self._group)
+        n_max  = max(int(c) for c in counts)
+        if n_max == 0:
+            if (self._rank == 0) and (final is True):
+                self._fold([np.empty((0, 4))] * self._world_size, final)
+            return
+
+        padded = torch.full((n_max, 4), float("nan"), dtype=torch.float64)
+        padded[:len(local)] = torch.from_numpy(local)
+        gathered = [torch.empty_like(padded) for _ in range(self._world_size)] if self._rank == 0 else None
+        dist.gather(padded, gathered, dst=0, group=self._group)
+
+        if self._rank == 0:
+            per_rank = [gathered[r][:int(counts[r])].numpy() for r in range(self._world_size)]
+            self._fold(per_rank, final)
+
+    def _pack(self) -> NDArray:
+        """ pending records as a (n, 4) float64 array, with one device to host transfer per device """
+
+        pending, self._pending = self._pending, []
+        if len(pending) == 0:
+            return np.empty((0, 4), dtype=np.float64)
+
+        ys = _to_host_arrays([y for _, _, _, y in pending])
+        return np.column_stack([
+            np.array([p[0] for p in pending], dtype=np.float64),
+            np.array([p[1] for p in pending], dtype=np.float64),
+            np.array([p[2] for p in pending], dtype=np.float64),
+            np.concatenate(ys),
+        ])
+
+    def _fold(self, per_rank: list[NDArray], final: bool):
+        # processing speed: the ranks work in parallel, so the total speed is the sum of their (average) speeds
+        speeds = [records[records[:, 0] == 0, 3] for records in per_rank]
+        if any(len(s) > 0 for s in speeds):
+            self._plotter.add_speed(sum(float(s.mean()) for s in speeds if len(s) > 0))
+
+        if self._mode == "ranks":
+            for rank, records in enumerate(per_rank):
+                records = records[records[:, 0] != 0]
+                for g_nr, t_nr in np.unique(records[:, :2], axis=0):
+                    trace = records[(records[:, 0] == g_nr) & (records[:, 1] == t_nr)]
+                    t_rank = int(t_nr) * self._world_size + rank
+                    self._plotter.add_batch(int(g_nr), t_rank, trace[:, 2], trace[:, 3])
+
+        if self._mode == "spread":
+            new = {} # (g_nr, t_nr): [(n, 2) x, y of each rank]
+            for rank, records in enumerate(per_rank):
+                records = records[records[:, 0] != 0]
+                for g_nr, t_nr in np.unique(records[:, :2], axis=0):
+                    trace    = records[(records[:, 0] == g_nr) & (records[:, 1] == t_nr)]
+                    key      = (int(g_nr), int(t_nr))
+                    reported = self._reported.setdefault(key, np.full(self._world_size, np.nan))
+                    reported[rank] = np.fmax(reported[rank], trace[:, 2].max())
+                    new.setdefault(key, []).append(trace[:, 2:4])
+            for key in set(new) | set(self._held):
+                self._fold_spread(key, new.get(key, []), final)
+
+    def _fold_spread(self, key: tuple[int, int], parts: list[NDArray], final: bool):
+        trace = np.concatenate([self._held.pop(key, np.empty((0, 2)))] + parts)
+        trace = trace[trace[:, 0] > self._shown.get(key, -np.inf)]
+
+        # complete: every rank that logs the trace has reported this x or a later one
+        ready = trace[:, 0] <= (np.inf if final is True else np.nanmin(self._reported[key]))
+        if not np.all(ready):
+            self._held[key] = trace[~ready]
+        trace = trace[ready]
+        if len(trace) == 0:
+            return
+
+        xs, inv = np.unique(trace[:, 0], return_inverse=True)
+        mean = np.bincount(inv, weights=trace[:, 1]) / np.bincount(inv)
+        ymin = np.full(len(xs),  np.inf)
+        ymax = np.full(len(xs), -np.inf)
+        np.minimum.at(ymin, inv, trace[:, 1])
+        np.maximum.at(ymax, inv, trace[:, 1])
+        self._shown[key] = xs[-1]
+        self._plotter.add_batch(key[0], key[1], xs, mean, mean - ymin, ymax - mean)
@@ -1,77 +1,220 @@
 ### IMPORTS ############################################################################################################
 # standard library imports
-import os
 import sys
 import threading
 import time
-from   collections import deque
+import multiprocessing
+import weakref
 from   typing import Any
-import copy
-from dataclasses import fields
+from   contextlib import contextmanager
+import json
 
-# third-party library imports
+# third-party library imports (only numpy here, so that scripts that only log data start fast. dash, plotly, torch, 
+# torchinfo and h5py are imported where they are first needed)
 import numpy as np
-import torch
-from   dash import Dash, Input, Output, State, Patch, dcc, html, no_update
-import dash_bootstrap_components as dbc
-import plotly.graph_objects as go
-from   plotly.subplots import make_subplots
-import plotly.io as pio
-from   torchinfo import summary
+from   numpy.typing import NDArray
 import webbrowser
 
 # local library imports
-from mldashboard.containers.datastore import Store, GraphStore, TraceData
-from mldashboard.containers.setupconfig import Config, GraphConfig, TraceConfig
+from mldashboard.containers.datastore import Store, GraphStore, TraceData, LayerStatsData
+from mldashboard.containers.setupconfig import Config, GraphConfig, TraceConfig, TRANSPORTS, config_to_dict
 
-from .dash.dashapp import make_plotter_app
-from .containers.datastore import Store, GraphStore
+from .containers.sharedring import SharedRingBuffer
+from .dash.dashprocess import run_dashboard_process
+from .utils.downsampling import DOWNSAMPLERS
+from .utils.utils import parse_color
+from .utils.streamstats import derive_traces, WindowAggregator
 
 ### DEFINITIONS ########################################################################################################
 
-# TODO big, trace number starts at 0 right now, but graph is 1-3, probably change graphs to 0-2 !!
+# seconds between two flushes of the background thread with defer_transfer=True
+DEFER_INTERVAL = 0.25
+
+def _is_tensor(value: Any) -> bool:
+    """ isinstance check for torch tensors that never imports torch. if torch was not imported yet, value can not be a
+    tensor anyways """
+    
+    torch = sys.modules.get("torch")
+    return (torch is not None) and isinstance(value, torch.Tensor)
+
+def _to_host_arrays(values: list) -> list[NDArray | None]:
+    """ converts a list of scalars, sequences, numpy arrays or torch tensors to flat float64 numpy arrays (None stays
+    None). all tensors that live on the same device are concatenated and moved to host in one transfer, so there is
+    only one device sync per device instead of one per value """
+    
+    host_values = [None] * len(values)
+    tensor_idxs = {} # device: [indices of the values that are tensors on this device]
+    
+    for idx, value in enumerate(values):
+        if value is None:
+            continue
+        if _is_tensor(value):
+            tensor_idxs.setdefault(value.device, []).append(idx)
+        else:
+            host_values[idx] = np.asarray(value, dtype=np.float64).reshape(-1)
+    
+    for device, idxs in tensor_idxs.items():
+        torch        = sys.modules["torch"]
+        flat_tensors = [values[idx].detach().reshape(-1) for idx in idxs]
+        # cat promotes to a common dtype on the device, the cast to float64 only happens on host (not all devices can)
+        host_flat    = torch.cat(flat_tensors).cpu().to(torch.float64).numpy()
+        split_at     = np.cumsum([tensor.numel() for tensor in flat_tensors])[:-1]
+        for idx, host_arr in zip(idxs, np.split(host_flat, split_at)):
+            host_values[idx] = host_arr
+    
+    return host_values
 
 class DashPlotter:
     
-    def __init__(self, CONFIG: Config, model: torch.nn = None, input_data: Any = None) -> None:
+    def __init__(
+        self, 
+        CONFIG:         Config, 
+        model:          "torch.nn.Module" = None, 
+        input_data:     Any               = None, 
+        defer_transfer: bool | int        = False,
+        push_updates:   bool              = False,
+        out_of_process: bool              = False,
+        log_path:       str               = None,
+        compare_runs:   list[str]         = None,
+        layer_stats:    bool | int        = False,
+        headless:       bool              = False,
+    ) -> None:
+        """
+        Args:
+            CONFIG        : the full graph and trace configuration
+            model         : optional, model for the model summary card (needs input_data too)
+            input_data    : optional, example input for the model summary
+            defer_transfer: False transfers tensors to host on every add_data call. N only queues them and moves 
+                            everything to host in one transfer every N add_data calls, True does this on a background 
+                            thread every DEFER_INTERVAL seconds. call flush() to force pending data into the store
+            push_updates  : False polls for new data with fixed intervals. True pushes a notification to the browser 
+                            (server sent events) only when new data was published, coalesced per frame
+            out_of_process: True runs the dashboard in a separate (spawned) process, so that serving it does not compete
+                            with the training loop for the GIL. the logged values go through a shared memory ring 
+                            buffer. (the training script needs an if __name__ == "__main__" guard for this)
+            log_path      : optional, file for an on-disk log of all the traces (HDF5), written by a background thread.
+                            replay it later on with DashPlotter.from_log(log_path)
+            compare_runs  : optional, run logs of earlier runs that can be overlaid on the graphs from the dashboard. 
+                            they are only loaded when selected, matching traces by graph and trace name
+            layer_stats   : False or every how many steps (True is 10) the per-layer gradient norm, weight norm and 
+                            update / weight ratio of the model are tracked and shown as heatmaps. needs model, wrap the
+                            optimizer step with track_layers(step)
+            headless      : True never builds the dashboard and skips the model summary (no forward pass), it only 
+                            records into the store, the run log (log_path) or, with out_of_process, the shared memory 
+                            ring buffer (without starting the dashboard process). view it with the mldashboard-view 
+                            command, from the run log or attached to the ring buffer (see ring_name)
+        """
 
-        # stores all the initial configuration parameters
-        self._CONFIG = CONFIG
+        # stores all the initial configuration parameters. the streaming statistics of the traces become derived traces
+        # behind the configured ones, with one statistic instance per derived trace
+        self._CONFIG, stats_plan = derive_traces(CONFIG)
         self._CONFIG.sanitize()
+        self._stats = {
+            trace_key: [(t_derived, make_stat()) for t_derived, make_stat in derived]
+            for trace_key, derived in stats_plan.items()
+        }
+        # traces that are aggregated on ingest (TraceConfig window / xbucket)
+        self._aggregators = {}
+        for g_nr, G_CFG in enumerate(self._CONFIG.graphs.values(), start=1):
+            for t_nr, trace_cfg in enumerate(G_CFG.traces):
+                if (trace_cfg.window is False) and (trace_cfg.xbucket is False):
+                    continue
+                self._aggregators[(g_nr, t_nr)] = WindowAggregator(
+                    window  = trace_cfg.window if trace_cfg.window is not False else None,
+                    xbucket = trace_cfg.xbucket if trace_cfg.xbucket is not False else None,
+                    band    = trace_cfg.band,
+                )
         
         # stores all the raw data from the training loop (losses, etc...)
         self._store = self._make_store()
         
-        # add a model summarry if available TODO: check if this still works, better alternatives? rework in general
-        if (model is not None) and (input_data is not None):
-            model_summary = summary(
-                model, 
-                input_data = input_data,
-                col_names  = ["num_params"],
-                col_width  = 12, # TODO: make more adjustable from CONFIG
-                verbose    = False,
-            )
-            self._store.msummary = str(model_summary) # otherwise it's the default field string value
+        # optional per-layer statistics of the model, every few steps
+        self._layer_tracker = None
+        if layer_stats is not False:
+            if model is None:
+                raise ValueError("layer_stats needs the model!")
+            from .utils.training_metrics import LayerStatsTracker
+            self._layer_tracker = LayerStatsTracker(model, every=10 if layer_stats is True else layer_stats)
+            self._store.layers  = LayerStatsData(self._layer_tracker.names)
+        
+        # optional queue for deferred device-to-host transfers, folds the data into the store through _add_host_batch
+        self._transfer_queue = None
+        if defer_transfer is not False:
+            from .containers.transferqueue import TransferQueue
+        if defer_transfer is True:
+            self._transfer_queue = TransferQueue(self._add_host_batch, flush_interval=DEFER_INTERVAL)
+        elif defer_transfer is not False:
+            self._transfer_queue = TransferQueue(self._add_host_batch, flush_every=defer_transfer)
         
-        # this is the container for the actual plotter app
-        self._app = make_plotter_app(self._CONFIG, self._store)
+        # optional persistent run log, gets the same (host) values as the store
+        self._log = None
+        if log_path is not None:
+            from .containers.runlog import RunLogWriter
+            self._log = RunLogWriter(log_path, self._CONFIG)
+            weakref.finalize(self, self._log.close)
+        
+        # add a model summary if available, cached on disk by architecture (see model_summary)
+        if (model is not None) and (input_data is not None) and (headless is False):
+            from .utils.modelsummary import model_summary
+            self._store.msummary = model_summary(model, input_data) # otherwise it's the default field string value
+        
+        # this is the container for the actual plotter app, only built on first use (see _app). out of process, the
+        # dashboard process builds its own app and store, this process only writes the logged values to the shared ring
+        # (which also carries the config, for viewers that attach by name)
+        self._push_updates = push_updates
+        self._compare_runs = compare_runs
+        self._headless     = headless
+        self._ring         = None
+        self._dash_app     = None
+        if out_of_process is True:
+            meta = {
+                "config": config_to_dict(self._CONFIG), 
+                "layers": None if self._store.layers is None else self._store.layers.names,
+            }
+            self._ring = SharedRingBuffer(meta=json.dumps(meta).encode())
+            weakref.finalize(self, self._ring.close)
+            if headless is True:
+                print(f"headless plotter, view it with: mldashboard-view --attach {self._ring.name}")
+    
+    @property
+    def _app(self):
+        """ the dash app, built (and dash and plotly imported) when it is first needed, so that only logging data never
+        pays for it. None out of process and headless """
+        
+        if (self._dash_app is None) and (self._ring is None) and (self._headless is False):
+            from .dash.dashapp import make_plotter_app
+            from .dash.components.comparison import RunArchive
+            archive        = RunArchive(self._compare_runs) if self._compare_runs is not None else None
+            self._dash_app = make_plotter_app(self._CONFIG, self._store, push=self._push_updates, archive=archive)
+        return self._dash_app
+    
+    @property
+    def ring_name(self) -> str | None:
+        """ name of the shared memory ring buffer (out_of_process), for mldashboard-view --attach """
+        
+        return None if self._ring is None else self._ring.name
 
     def _make_store(self) -> Store:
         
         # initialize with just the default fields, mostly sufficient
         store = Store()
         
-        # need to fill the graph1-3 fields with a variable amount of trace-level containers 
-        for fd in fields(Config):
-            if fd.type is not GraphConfig:
-                continue
-            # need handles to the actual, graph-level container objects, not just the field name
-            G_CFG: GraphConfig  = getattr(self._CONFIG, fd.name)
-            g_store: GraphStore = getattr(store, fd.name)
+        # one graph-level container per graph of the config, each with a variable amount of trace-level containers 
+        for g_name, G_CFG in self._CONFIG.graphs.items():
+            g_store = GraphStore()
+            store.graphs[g_name] = g_store
+            
+            if (G_CFG.nxdown is not False) and (G_CFG.downsampling not in DOWNSAMPLERS):
+                raise ValueError(f"downsampling has to be one of {list(DOWNSAMPLERS)}! (got {G_CFG.downsampling})")
+            if G_CFG.transport not in TRANSPORTS:
+                raise ValueError(f"transport has to be one of {list(TRANSPORTS)}! (got {G_CFG.transport})")
+            if (not isinstance(G_CFG.update_interval, int)) or (G_CFG.update_interval <= 0):
+                raise ValueError(f"update_interval has to be a positive number of ms! (got {G_CFG.update_interval})")
     
             # iterate through all the traces that were configured for this graph and add elements for each
             for trace_cfg in G_CFG.traces:
                 
+                parse_color(trace_cfg.color) # a color the dashboard can not draw is an error right away, not in the browser
                 new_trace_data = TraceData()
                 # if one traces graph's data is downsampled, all it's trace need the downsampled-x vector
                 if G_CFG.nxdown is not False:
@@ -81,7 +224,7 @@ class DashPlotter:
                     new_trace_data.add_errorband()
                 
                 # finally, FOR EACH trace in config, add a data-, t2id- and a2id-container, all on the same index! 
-                g_store.add_trc_data(new_trace_data)
+                g_store.add_trc_data(new_trace_data, yaxis=trace_cfg.yaxis)
                 g_store.add_trc_t2id() 
                 g_store.add_trc_a2id()            
   
@@ -89,36 +232,202 @@ class DashPlotter:
 
     def add_data(self, g_nr: int, t_nr: int, x: float, y: float, yerrLo: float = None, yerrHi: float = None):
         # TODO do robust sanitizing of input data! (like detach, cpu, remove Nans, etc...)
+        
+        # in deferred mode, everything goes through the queue (also non-tensors, to keep the order within each trace)
+        if self._transfer_queue is not None:
+            self._transfer_queue.put(g_nr, t_nr, x, y, yerrLo, yerrHi)
+            return
 
-        if isinstance(y, torch.Tensor):
+        if _is_tensor(y):
             y = y.detach().cpu().numpy()
-        if isinstance(yerrLo, torch.Tensor):
+        if _is_tensor(yerrLo):
             yerrLo = yerrLo.detach().cpu().numpy()
-        if isinstance(yerrHi, torch.Tensor):
+        if _is_tensor(yerrHi):
             yerrHi = yerrHi.detach().cpu().numpy()
         
-        g_store: GraphStore = getattr(self._store, f"graph{g_nr}")
+        # error band data is stored as absolute values
+        x, y = float(x), float(y)
+        ylo  = float(y-yerrLo) if (yerrLo is not None) and (yerrHi is not None) else None
+        yhi  = float(y+yerrHi) if (yerrLo is not None) and (yerrHi is not None) else None
+        
+        # aggregated traces only get a point (mean and errorband of the window) when a window is complete
+        if (g_nr, t_nr) in self._aggregators:
+            closed = self._aggregators[(g_nr, t_nr)].push(x, y)
+            if closed is None:
+                return
+            x, y, ylo, yhi = closed
+        
+        self._put_point(g_nr, t_nr, x, y, ylo, yhi)
+        
+        # streaming statistics of this trace, each one goes to its own derived trace
+        for t_derived, stat in self._stats.get((g_nr, t_nr), []):
+            self._put_point(g_nr, t_derived, x, *stat.push(y))
+    
+    def _put_point(self, g_nr: int, t_nr: int, x: float, y: float, ylo: float | None, yhi: float | None):
+        """ one host point (absolute errorband values or None) into the run log and the ring buffer or the store """
+        
+        if self._log is not None:
+            self._log.put(g_nr, t_nr, x, y, ylo, yhi)
+        
+        if self._ring is not None:
+            ylo, yhi = (np.nan, np.nan) if ylo is None else (ylo, yhi)
+            self._ring.append(g_nr, t_nr, x, y, ylo, yhi)
+            return
 
-        # add the standard raw data   
-        g_store.trc_data[t_nr].x.append(float(x))
-        g_store.trc_data[t_nr].y.append(float(y)) 
+        # add the raw data to the columnar trace buffers (also tracks the running min / max)
+        g_name = f"graph{g_nr}"
+        self._store.graphs[g_name].trc_data[t_nr].append(x, y, ylo, yhi)
+        self._store.signal.publish(g_name)
+
+    def add_batch(self, g_nr: int, t_nr: int, x: Any, y: Any, yerrLo: Any = None, yerrHi: Any = None):
+        """ adds a whole batch of points to one trace in one vectorized operation. all inputs can be scalars, sequences,
+        numpy arrays or torch tensors (any shape, are flattened) and are broadcast against each other. tensors are moved
+        to host with one transfer per device for the whole call """
+        
+        if self._transfer_queue is not None:
+            self._transfer_queue.put(g_nr, t_nr, x, y, yerrLo, yerrHi)
+            return
+        
+        x, y, yerrLo, yerrHi = _to_host_arrays([x, y, yerrLo, yerrHi])
+        self._add_host_batch(g_nr, t_nr, x, y, yerrLo, yerrHi)
+    
+    def add_many(self, data: dict[tuple[int, int], tuple]):
+        """ adds batches to several traces (of possibly several graphs) at once. data maps (g_nr, t_nr) to a tuple of 
+        (x, y) or (x, y, yerrLo, yerrHi), same input types as add_batch. all tensors of the whole call are moved to host
+        together, so logging a whole set of metrics costs only one device sync """
+        
+        flat_values = []
+        for (g_nr, t_nr), values in data.items():
+            if len(values) not in [2, 4]:
+                raise ValueError(f"expected (x, y) or (x, y, yerrLo, yerrHi) for graph {g_nr} trace {t_nr}!")
+            flat_values.extend(values if len(values) == 4 else (*values, None, None))
+        
+        if self._transfer_queue is not None:
+            for n, (g_nr, t_nr) in enumerate(data.keys()):
+                self._transfer_queue.put(g_nr, t_nr, *flat_values[4*n : 4*n+4])
+            return
+        
+        host_values = _to_host_arrays(flat_values)
+        for n, (g_nr, t_nr) in enumerate(data.keys()):
+            self._add_host_batch(g_nr, t_nr, *host_values[4*n : 4*n+4])
+    
+    def _add_host_batch(self, g_nr: int, t_nr: int, x: NDArray, y: NDArray, yerrLo: NDArray, yerrHi: NDArray):
+        """ common path of add_batch and add_many, everything is already a float64 numpy array at this point """
+        
+        x, y = np.broadcast_arrays(x, y)
+        
+        # error band data is stored as absolute values
+        ylo = y - yerrLo if (yerrLo is not None) and (yerrHi is not None) else None
+        yhi = y + yerrHi if (yerrLo is not None) and (yerrHi is not None) else None
         
-        # add error band data if neccessary
-        if (yerrLo is not None) and ( yerrHi is not None):
-            g_store.trc_data[t_nr].ylo.append(float(y-yerrLo))
-            g_store.trc_data[t_nr].yhi.append(float(y+yerrHi)) 
+        if (g_nr, t_nr) in self._aggregators:
+            x, y, ylo, yhi = self._aggregators[(g_nr, t_nr)].extend(x, y)
+            if len(x) == 0:
+                return
         
-        # track the running max / min to avoid taking min / max over all data
-        if y < g_store.trc_data[t_nr].ymin:
-            g_store.trc_data[t_nr].ymin    = float(y)
-            g_store.trc_data[t_nr].ynewmin = True
-        if y > g_store.trc_data[t_nr].ymax:
-            g_store.trc_data[t_nr].ymax    = float(y)
-            g_store.trc_data[t_nr].ynewmax = True
+        self._put_batch(g_nr, t_nr, x, y, ylo, yhi)
+        
+        # streaming statistics of this trace, each one goes to its own derived trace
+        for t_derived, stat in self._stats.get((g_nr, t_nr), []):
+            self._put_batch(g_nr, t_derived, x, *stat.extend(y))
+    
+    def _put_batch(self, g_nr: int, t_nr: int, x: NDArray, y: NDArray, ylo: NDArray | None, yhi: NDArray | None):
+        """ batch version of _put_point """
+        
+        if self._log is not None:
+            # copies, the caller might reuse its arrays before the log writer gets to them
+            self._log.put(g_nr, t_nr, x.copy(), y.copy(), ylo, yhi)
+        
+        if self._ring is not None:
+            self._ring.extend(g_nr, t_nr, x, y, ylo, yhi)
+            return
+        
+        # add the raw data to the columnar trace buffers (also tracks the running min / max)
+        g_name = f"graph{g_nr}"
+        self._store.graphs[g_name].trc_data[t_nr].extend(x, y, ylo, yhi)
+        self._store.signal.publish(g_name)
 
-    def batchtimer(self, action: str, batch_size: int = None):
-        # TODO: change to new containers!
+    def flush(self):
+        """ in deferred transfer mode: moves everything that is still queued to host and into the store (blocking). also
+        writes everything that is queued for the run log """
+        
+        if self._transfer_queue is not None:
+            self._transfer_queue.flush(wait=True)
+        if self._log is not None:
+            self._log.flush()
+    
+    @classmethod
+    def from_log(cls, path: str, **kwargs) -> "DashPlotter":
+        """ replays the run log of an earlier run (log_path) with the same graphs. the columns of a finished log are 
+        memory-mapped from the file, so only the parts that are actually shown are ever read from disk (see 
+        load_run_log). kwargs are passed on to __init__ """
+        
+        from .containers.runlog import load_run_log
+        CONFIG, traces = load_run_log(path)
+        plotter = cls(CONFIG, **kwargs)
+        plotter._attach_log(traces)
+        return plotter
+    
+    def _attach_log(self, traces: dict):
+        """ attaches the columns of load_run_log to the store (memory maps are not copied) """
+        
+        for (g_nr, t_nr), (cols, ymin, ymax) in traces.items():
+            trace = self._store.graphs[f"graph{g_nr}"].trc_data[t_nr]
+            trace.attach_columns(**cols, ymin=ymin, ymax=ymax)
+            self._store.signal.publish(f"graph{g_nr}")
+    
+    def _log_lengths(self) -> dict:
+        """ number of values per trace, for load_run_log(since=...) """
+        
+        return {
+            (int(g_name.removeprefix("graph")), t_nr): trace.length
+            for g_name, g_store in self._store.graphs.items() for t_nr, trace in enumerate(g_store.trc_data)
+        }
+    
+    def _extend_from_log(self, traces: dict):
+        """ appends the new values of a log that is followed (load_run_log with since=_log_lengths()) """
+        
+        for (g_nr, t_nr), (cols, _, _) in traces.items():
+            if len(cols["x"]) == 0:
+                continue
+            self._store.graphs[f"graph{g_nr}"].trc_data[t_nr].extend(**cols)
+            self._store.signal.publish(f"graph{g_nr}")
+
+    @contextmanager
+    def track_layers(self, step: int):
+        """ wrap the optimizer step with this (after backward, before the gradients are zeroed) for the per-layer 
+        statistics of layer_stats. only every few steps, the other steps cost nothing """
         
+        if self._layer_tracker is None:
+            raise ValueError("track_layers needs layer_stats!")
+        
+        self._layer_tracker.before(step)
+        yield
+        values = self._layer_tracker.after()
+        if values is not None:
+            self._put_layers(step, values)
+    
+    def _put_layers(self, step: int, values: NDArray):
+        """ the (stat, layer) values of one tracked step into the ring buffer (one record per layer, graph number -1) or
+        the store """
+        
+        if self._ring is not None:
+            n_layers = values.shape[1]
+            self._ring.extend(-1, np.arange(n_layers), np.full(n_layers, float(step)), *values.astype(np.float64))
+            return
+        
+        self._store.layers.extend(np.array([step]), values[None])
+        self._store.signal.publish("layers")
+    
+    def add_speed(self, samples_per_sec: float):
+        """ adds one processing speed value directly (batchtimer does this on "stop") """
+        
+        self._store.procs.speed.append(samples_per_sec)
+        self._store.signal.publish("procs")
+        if self._ring is not None:
+            self._ring.append(0, 0, 0.0, samples_per_sec)
+    
+    def batchtimer(self, action: str, batch_size: int = None):
         if action not in ["start", "stop", "read"]: # TODO: Enum
             raise ValueError(f"only 'start', 'stop' and 'read' allowed as action! (got {action})")
         
@@ -135,7 +444,7 @@ class DashPlotter:
             if batch_size is None:
                 raise ValueError(f"please specify a batch size when stopping the timer!")
             
-            self._store.procs.speed.append(batch_size / (self._store.procs.t1 - self._store.procs.t0))
+            self.add_speed(batch_size / (self._store.procs.t1 - self._store.procs.t0))
             self._store.procs.t0 = None
             self._store.procs.t1 = None
         
@@ -149,6 +458,11 @@ class DashPlotter:
     def run_jupyter(self, host: str = "127.0.0.1", port: int = 8050):
         """For running the plotter in a Jupyter notebook. Handles all the threading and keeping alive automatically."""
         
+        if self._headless is True:
+            raise ValueError("a headless plotter has no dashboard, view it with mldashboard-view!")
+        if self._ring is not None:
+            raise ValueError("run_jupyter is not available with out_of_process=True, use run_script instead!")
+        
         self._app.run(
             host         = host, 
             jupyter_mode = "tab", # also has "inline" ... 
@@ -160,19 +474,43 @@ class DashPlotter:
     def run_script(self, host: str = "127.0.0.1", port: int = 8050):
         """For running the plotter in a script. Uses a daemon thread to avoid the app from blocking the script. Use run_script_spin a the end of the script to keep the app thread alive and be able to interact with data."""
         
+        if self._headless is True:
+            raise ValueError("a headless plotter has no dashboard, view it with mldashboard-view!")
+        self._start_server(host, port)
+        webbrowser.open_new_tab(f"http://{host}:{port}/")
+        
+    def _start_server(self, host: str, port: int):
+        """ starts serving the app in the background, in a daemon thread or (out_of_process) a daemon child process """
+        
+        if self._ring is not None:
+            # spawn, forking a process that already has (cuda) threads running is not safe
+            process = multiprocessing.get_context("spawn").Process(
+                target = run_dashboard_process,
+                args   = (
+                    self._CONFIG, self._ring.name, self._store.msummary, self._push_updates, self._compare_runs, 
+                    None if self._store.layers is None else self._store.layers.names, host, port,
+                ),
+                daemon = True,
+            )
+            process.start()
+            return process
+        
+        app = self._app # built here, not in the server thread
         def _run():   
-            self._app.run(
+            app.run(
                 host         = host,
                 port         = port,     
                 debug        = True,    
                 use_reloader = False # this is necessary, because hot reload is not possible in daemon thread 
             )
         threading.Thread(target = _run, daemon = True).start()
-        webbrowser.open_new_tab(f"http://{host}:{port}/")
         
     def run_script_spin(self):
         """For running the plotter in a script. Run this at the very end of the script. Keeps the app thread alive until the script is interrupted with ctrl+C to be able to view the data and interact with it."""
         
+        # make sure that the last deferred values also show up
+        self.flush()
+        
         print("Plotter dash app continues to run in the background. Press ctrl+C to stop.")
         try:
             while True:
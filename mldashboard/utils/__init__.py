@@ -1,9 +1,22 @@
 from .utils import adjust_alpha
+from .utils import parse_color
+from .utils import plotly_color
 from .utils import determine_single_range
 from .utils import determine_mixed_range
 from .utils import idx_next_smaller
-from .training_metrics import calc_net_nparams
-from .training_metrics import calc_net_weightnorm
-from .training_metrics import calc_net_gradnorm
-from .training_metrics import calc_adam_rates
+from .downsampling import downsample_interp
+from .downsampling import downsample_m4
+from .downsampling import downsample_lttb
+from .downsampling import DOWNSAMPLERS
 
+# the training metrics need torch, they are only imported on first access (mldashboard.utils.calc_net_stats, ...)
+_TRAINING_METRICS = [
+    "calc_net_nparams", "calc_net_weightnorm", "calc_net_gradnorm", "calc_adam_rates", "calc_net_stats", 
+    "LayerStatsTracker",
+]
+
+def __getattr__(name: str):
+    if name in _TRAINING_METRICS:
+        from . import training_metrics
+        return getattr(training_metrics, name)
+    raise AttributeError(f"module {__name__} has no attribute {name}")
@@ -0,0 +1,112 @@
+import numpy as np
+from   numpy.typing import NDArray
+from   typing import Callable
+
+
+# all downsamplers share the same incremental interface, based on the downsampled x "grid" (xdown) of a trace:
+#   downsampler(xdown, x, ys, old_chkp, new_chkp) -> (x_out, ys_out)
+# x and ys (main y and optionally the errorband columns) are the full raw columns of the trace. the downsampler only
+# produces the output for the grid points old_chkp+1 ... new_chkp, which are fully covered by raw data. for the
+# bucket based strategies, grid point j closes the bucket of raw points with xdown[j-1] < x <= xdown[j], so the cost
+# per call only depends on the amount of new raw data, not on the total history. the same raw indices are selected
+# for all columns in ys.
+
+
+def _bucket_edges(xdown: NDArray, x: NDArray, old_chkp: int, new_chkp: int) -> NDArray:
+    """ raw index boundaries of the buckets old_chkp+1 ... new_chkp (bucket k spans edges[k] to edges[k+1]) """
+
+    edges = np.searchsorted(x, xdown[max(old_chkp, 0):new_chkp+1], side="right")
+    # the very first bucket is open to the left (includes everything up to xdown[0])
+    return np.concatenate([[0], edges]) if old_chkp < 0 else edges
+
+def downsample_interp(xdown: NDArray, x: NDArray, ys: list[NDArray], old_chkp: int, new_chkp: int):
+    """ linear interpolation of the raw data onto the grid points. cheap and smooth, but hides spikes between two grid
+    points """
+
+    x_out = xdown[old_chkp+1:new_chkp+1]
+
+    # lower end of the raw data that actually needs to be sampled. (just needs to fully cover the x downsampled interval from old_chkp to new_chkp, anything else is redundant)
+    idx_raw_oldest = max(int(np.searchsorted(x, x_out[0], side="right")) - 1, 0)
+
+    ys_out = [np.interp(x_out, x[idx_raw_oldest:], y[idx_raw_oldest:]) for y in ys]
+    return x_out, ys_out
+
+def downsample_m4(xdown: NDArray, x: NDArray, ys: list[NDArray], old_chkp: int, new_chkp: int):
+    """ keeps the first, min, max and last raw point of every bucket (M4 aggregation). preserves the visual envelope
+    of the data, so spikes survive. if a bucket contains NaNs, the first one is kept as well to show the blowup """
+
+    edges = _bucket_edges(xdown, x, old_chkp, new_chkp)
+    y     = ys[0]
+
+    selected = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        if stop <= start:
+            continue
+
+        y_bucket = y[start:stop]
+        is_nan   = np.isnan(y_bucket)
+        bucket   = [0, stop - start - 1]
+        if not is_nan.all():
+            bucket += [np.nanargmin(y_bucket), np.nanargmax(y_bucket)]
+        if is_nan.any():
+            bucket.append(np.argmax(is_nan))
+        selected.append(start + np.unique(bucket))
+
+    idx = np.concatenate(selected) if len(selected) > 0 else np.empty(0, dtype=np.intp)
+    return x[idx], [col[idx] for col in ys]
+
+def lttb_anchor_stop(xdown: NDArray, x: NDArray, new_chkp: int) -> int:
+    """ raw end of the (possibly still incomplete) bucket after new_chkp, the last right anchor of downsample_lttb
+    averages the raw points up to there. the result of downsample_lttb only stays the same while this does """
+
+    return int(np.searchsorted(x, xdown[new_chkp+1], side="right")) if new_chkp+1 < len(xdown) else len(x)
+
+def downsample_lttb(xdown: NDArray, x: NDArray, ys: list[NDArray], old_chkp: int, new_chkp: int):
+    """ largest triangle three buckets: keeps the one raw point per bucket that spans the largest triangle with the
+    previously kept point and the average of the next bucket. incremental variant: the first bucket of each call uses
+    the raw point right before it as left anchor, the last one uses whatever raw data of the next bucket is already
+    there (or its own last point) as right anchor """
+
+    edges = _bucket_edges(xdown, x, old_chkp, new_chkp)
+    y     = ys[0]
+    # raw end of the (possibly still incomplete) bucket after the last complete one, for the last right anchor
+    next_stop = lttb_anchor_stop(xdown, x, new_chkp)
+
+    # left anchor, starts with the raw point right before the first bucket (if there is one)
+    ax, ay = (x[edges[0]-1], y[edges[0]-1]) if edges[0] > 0 else (None, None)
+
+    selected = []
+    for k, (start, stop) in enumerate(zip(edges[:-1], edges[1:])):
+        if stop <= start:
+            continue
+
+        # right anchor: average of the next bucket
+        right_stop = edges[k+2] if k+2 < len(edges) else next_stop
+        y_next = y[stop:right_stop]
+        y_next = y_next[~np.isnan(y_next)]
+        if len(y_next) > 0:
+            cx, cy = np.mean(x[stop:right_stop]), np.mean(y_next)
+        else:
+            cx, cy = x[stop-1], y[stop-1]
+
+        if ax is None:
+            idx_bucket = 0
+        else:
+            # (doubled) triangle areas between the left anchor, each candidate and the right anchor
+            area = np.abs((ax - cx) * (y[start:stop] - ay) - (ax - x[start:stop]) * (cy - ay))
+            idx_bucket = np.argmax(np.isnan(y[start:stop])) if np.isnan(area).all() else np.nanargmax(area)
+
+        idx = start + idx_bucket
+        selected.append(idx)
+        ax, ay = x[idx], y[idx]
+
+    idx = np.array(selected, dtype=np.intp)
+    return x[idx], [col[idx] for col in ys]
+
+
+# registry of all the available strategies, selected per graph with GraphConfig.downsampling
+DOWNSAMPLERS: dict[str, Callable] = {
+    "interp": downsample_interp,
+    "m4":     downsample_m4,
+    "lttb":   downsample_lttb,
+}
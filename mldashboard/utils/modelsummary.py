@@ -0,0 +1,102 @@
+import copy
+import hashlib
+import os
+from   pathlib import Path
+from   typing import Any, Callable
+
+import torch
+import torch.nn as nn
+import torchinfo
+
+
+# columns and column width of the summary (part of the cache key)
+SUMMARY_COLUMNS = ["num_params"]
+SUMMARY_WIDTH   = 12 # TODO: make more adjustable from CONFIG
+
+
+def summary_cache_dir() -> Path:
+    """where the summaries are cached ($XDG_CACHE_HOME/mldashboard/summaries, ~/.cache/... without it)"""
+
+    return Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "mldashboard" / "summaries"
+
+def _map_tensors(data: Any, fn: Callable) -> Any:
+    """applies fn to all the tensors in (nested) lists, tuples and dicts, like the input_data of torchinfo"""
+
+    if isinstance(data, torch.Tensor):
+        return fn(data)
+    if isinstance(data, (list, tuple)):
+        return type(data)(_map_tensors(d, fn) for d in data)
+    if isinstance(data, dict):
+        return {key: _map_tensors(d, fn) for key, d in data.items()}
+    return data
+
+def architecture_key(net: nn.Module, input_data: Any) -> str:
+    """hash of everything the summary depends on: the module tree with its hyperparameters (repr), the names, shapes and
+    dtypes of all parameters and buffers and the shapes and dtypes of the inputs. the values do not matter"""
+
+    tensors  = [(name, tuple(p.shape), str(p.dtype), p.requires_grad) for name, p in net.named_parameters()]
+    tensors += [(name, tuple(b.shape), str(b.dtype)) for name, b in net.named_buffers()]
+    inputs   = []
+    _map_tensors(input_data, lambda t: inputs.append((tuple(t.shape), str(t.dtype))))
+
+    key = repr((repr(net), tensors, inputs, SUMMARY_COLUMNS, SUMMARY_WIDTH, torchinfo.__version__))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def _meta_copy(net: nn.Module) -> nn.Module:
+    """copy of the module tree with all parameters and buffers on the meta device (shapes only, no memory)"""
+
+    memo = {}
+    for p in net.parameters():
+        memo[id(p)] = nn.Parameter(torch.empty_like(p, device="meta"), requires_grad=p.requires_grad)
+    for b in net.buffers():
+        memo[id(b)] = torch.empty_like(b, device="meta")
+    return copy.deepcopy(net, memo)
+
+def _summarize(net: nn.Module, input_data: Any) -> str:
+    return str(torchinfo.summary(
+        net,
+        input_data = input_data,
+        col_names  = SUMMARY_COLUMNS,
+        col_width  = SUMMARY_WIDTH,
+        verbose    = False,
+    ))
+
+
+def _write_atomic(path: Path, text: str):
+    # written to a temporary file first, so that a launch that reads the cache never sees half a file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(text)
+    os.replace(tmp_path, path)
+
+
+def model_summary(net: nn.Module, input_data: Any, cache_dir: str = None) -> str:
+    """torchinfo summary of a model, cached on disk by architecture_key, so that the next launch of the same architecture
+    gets it right away. the forward pass runs on a copy of the model on the meta device, which does no arithmetic, costs
+    no memory and keeps the hooks of torchinfo away from the live model. models that can not be hashed, copied or run
+    on the meta device (e.g. lazy modules, weight_norm, data dependent control flow) get the summary of the live model,
+    like before the cache. if that fails too, the error text is returned instead of the summary"""
+
+    try:
+        path = Path(cache_dir or summary_cache_dir()) / f"{architecture_key(net, input_data)}.txt"
+    except Exception:
+        path = None # (e.g. uninitialized lazy parameters) not cached
+    if (path is not None) and path.is_file():
+        return path.read_text()
+
+    try:
+        meta_input = _map_tensors(input_data, lambda t: torch.empty_like(t, device="meta"))
+        text       = _summarize(_meta_copy(net), meta_input)
+    except Exception:
+        try:
+            text = _summarize(net, input_data)
+        except Exception as err:
+            # not cached, the next launch tries again
+            return f"no model summary available ({type(err).__name__}: {err})"
+
+    if path is not None:
+        try:
+            _write_atomic(path, text)
+        except OSError:
+            pass # still shown, only not cached
+    return text
@@ -5,6 +5,4 @@
 # only one highest / lowest annotation per plot
 # no highest / lowest annotations for subplots (looks bad anyways)
 
-# only nine traces per plot!! (because I alway take keyT[-1])
-
 # safeguard add data against adding not strictly monotonically increasing x!
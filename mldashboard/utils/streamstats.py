@@ -0,0 +1,354 @@
+import dataclasses
+import math
+from   collections import deque
+
+import numpy as np
+from   numpy.typing import NDArray
+
+from .utils import adjust_alpha
+
+
+# all streaming statistics share the same interface, with O(1) work and memory (rolling: O(window)) per point:
+#   stat.push(y)    -> (y_out, ylo_out, yhi_out)   one new raw value, ylo / yhi are None for statistics without a band
+#   stat.extend(ys) -> (y_out, ylo_out, yhi_out)   the same for a whole batch, as arrays
+# non-finite raw values (NaN losses, ...) are skipped, the statistic just repeats its last value for them.
+
+
+class EMA:
+    """ exponential moving average with the smoothing weight of tensorboard (0.9: 90% old value). debiased like adam, so
+    the first points are not pulled towards zero """
+
+    has_band = False
+
+    def __init__(self, weight: float):
+        if not 0.0 <= weight < 1.0:
+            raise ValueError(f"ema weight has to be in [0, 1)! (got {weight})")
+        self._weight  = weight
+        self._biased  = 0.0
+        self._w_pow   = 1.0 # weight ** (number of values so far), for the debiasing
+        self._last    = math.nan
+
+    def push(self, y: float) -> tuple[float, None, None]:
+        if math.isfinite(y):
+            self._biased = self._weight * self._biased + (1.0 - self._weight) * y
+            self._w_pow *= self._weight
+            self._last   = self._biased / (1.0 - self._w_pow)
+        return self._last, None, None
+
+    def extend(self, ys: NDArray) -> tuple[NDArray, None, None]:
+        return np.array([self.push(y)[0] for y in ys.tolist()], dtype=np.float64), None, None
+
+class RollingMeanStd:
+    """ mean over the last `window` values with a +- one standard deviation band. the mean and the sum of squared
+    deviations are updated for the value that enters and the one that leaves the window (welford), no re-summing """
+
+    has_band = True
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError(f"rolling window has to be at least 1! (got {window})")
+        self._window = window
+        self._values = deque()
+        self._mean   = 0.0
+        self._m2     = 0.0
+        self._last   = (math.nan, math.nan, math.nan)
+
+    def push(self, y: float) -> tuple[float, float, float]:
+        if math.isfinite(y):
+            self._values.append(y)
+            n      = len(self._values)
+            delta  = y - self._mean
+            self._mean += delta / n
+            self._m2   += delta * (y - self._mean)
+
+            if n > self._window:
+                y_old  = self._values.popleft()
+                n     -= 1
+                delta  = y_old - self._mean
+                self._mean -= delta / n
+                self._m2   -= delta * (y_old - self._mean)
+
+            std        = math.sqrt(max(self._m2, 0.0) / (n - 1)) if n > 1 else 0.0
+            self._last = (self._mean, self._mean - std, self._mean + std)
+        return self._last
+
+    def extend(self, ys: NDArray) -> tuple[NDArray, NDArray, NDArray]:
+        out = np.array([self.push(y) for y in ys.tolist()], dtype=np.float64).reshape(-1, 3)
+        return out[:, 0], out[:, 1], out[:, 2]
+
+class P2Quantile:
+    """ streaming estimate of the p-quantile of all values so far with the P² algorithm (jain & chlamtac, 1985): five
+    markers whose heights are adjusted with a piecewise parabolic fit as the values come in, no values are stored """
+
+    def __init__(self, p: float):
+        if not 0.0 < p < 1.0:
+            raise ValueError(f"quantile has to be in (0, 1)! (got {p})")
+        self._p       = p
+        self._heights = []
+        self._pos     = [0.0, 1.0, 2.0, 3.0, 4.0]
+        self._desired = [0.0, 2*p, 4*p, 2 + 2*p, 4.0]
+        self._incr    = [0.0, p/2, p, (1 + p)/2, 1.0]
+
+    def push(self, y: float) -> float:
+        q = self._heights
+
+        # the first five values are the initial markers
+        if len(q) < 5:
+            q.append(y)
+            q.sort()
+            return q[round(self._p * (len(q) - 1))]
+
+        # cell of the new value (extending the outer markers if needed)
+        if y < q[0]:
+            q[0], k = y, 0
+        elif y >= q[4]:
+            q[4], k = y, 3
+        else:
+            k = next(i for i in range(4) if q[i] <= y < q[i+1])
+
+        n = self._pos
+        for i in range(k+1, 5):
+            n[i] += 1.0
+        for i in range(5):
+            self._desired[i] += self._incr[i]
+
+        # move the inner markers towards their desired positions, by at most one position per value
+        for i in range(1, 4):
+            d = self._desired[i] - n[i]
+            if (d >= 1.0 and n[i+1] - n[i] > 1.0) or (d <= -1.0 and n[i-1] - n[i] < -1.0):
+                d  = 1.0 if d > 0 else -1.0
+                qp = q[i] + d / (n[i+1] - n[i-1]) * (
+                    (n[i] - n[i-1] + d) * (q[i+1] - q[i]) / (n[i+1] - n[i])
+                    + (n[i+1] - n[i] - d) * (q[i] - q[i-1]) / (n[i] - n[i-1])
+                )
+                if not q[i-1] < qp < q[i+1]:
+                    j  = i + int(d)
+                    qp = q[i] + d * (q[j] - q[i]) / (n[j] - n[i])
+                q[i]  = qp
+                n[i] += d
+        return q[2]
+
+class QuantileBand:
+    """ middle quantile as line with a band between the outer two, e.g. (0.1, 0.5, 0.9): median with the 10% / 90%
+    quantiles. P² estimates over all values so far """
+
+    has_band = True
+
+    def __init__(self, quantiles: tuple[float, float, float]):
+        if (len(quantiles) != 3) or (sorted(quantiles) != list(quantiles)):
+            raise ValueError(f"quantiles have to be three increasing values (lo, mid, hi)! (got {quantiles})")
+        self._lo, self._mid, self._hi = [P2Quantile(p) for p in quantiles]
+        self._last = (math.nan, math.nan, math.nan)
+
+    def push(self, y: float) -> tuple[float, float, float]:
+        if math.isfinite(y):
+            self._last = (self._mid.push(y), self._lo.push(y), self._hi.push(y))
+        return self._last
+
+    def extend(self, ys: NDArray) -> tuple[NDArray, NDArray, NDArray]:
+        out = np.array([self.push(y) for y in ys.tolist()], dtype=np.float64).reshape(-1, 3)
+        return out[:, 0], out[:, 1], out[:, 2]
+
+
+# statistic per TraceConfig field, with the parameter that is used for True
+STREAM_STATS = {
+    "ema":       (EMA,            0.9),
+    "rolling":   (RollingMeanStd, 100),
+    "quantiles": (QuantileBand,   (0.1, 0.5, 0.9)),
+}
+# raw traces that have derived statistics are faded out by this alpha factor, the statistics are drawn on top
+RAW_ALPHA = 0.35
+
+
+def _derived_name(name: str, kind: str, param) -> str:
+    if kind == "ema":
+        return f"{name} ema"
+    if kind == "rolling":
+        return f"{name} mean{param}"
+    return f"{name} p{100*param[1]:g}"
+
+def derive_traces(CONFIG):
+    """ expands the streaming statistics of the trace configs (ema, rolling, quantiles) into derived traces, appended
+    behind the configured traces of each graph (so the configured trace numbers stay the same). aggregated traces get
+    errors=True. returns the expanded config, in which no trace has statistics anymore (expanding it again changes
+    nothing), and the plan {(g_nr, t_nr): [(derived t_nr, statistic factory), ...]}. statistics of aggregated traces
+    are computed from the aggregated points """
+
+    graphs, plan = {}, {}
+    for g_nr, (g_name, G_CFG) in enumerate(CONFIG.graphs.items(), start=1):
+        traces = []
+        extra  = []
+        for t_nr, trace_cfg in enumerate(G_CFG.traces):
+            stats = {kind: getattr(trace_cfg, kind) for kind in STREAM_STATS if getattr(trace_cfg, kind) is not False}
+            bare  = dataclasses.replace(trace_cfg, **{kind: False for kind in STREAM_STATS})
+            # aggregated traces always show the errorband of their windows
+            if (trace_cfg.window is not False) or (trace_cfg.xbucket is not False):
+                bare = dataclasses.replace(bare, errors=True)
+            if len(stats) == 0:
+                traces.append(bare)
+                continue
+
+            traces.append(dataclasses.replace(bare, color=adjust_alpha(trace_cfg.color, RAW_ALPHA), point=False))
+            for kind, param in stats.items():
+                factory, default = STREAM_STATS[kind]
+                param = default if param is True else param
+                extra.append(dataclasses.replace(
+                    bare,
+                    name   = _derived_name(trace_cfg.name, kind, param),
+                    errors  = factory.has_band,
+                    shape   = "linear",
+                    window  = False, # already gets the aggregated values
+                    xbucket = False,
+                ))
+                plan.setdefault((g_nr, t_nr), []).append(
+                    (len(G_CFG.traces) + len(extra) - 1, lambda factory=factory, param=param: factory(param))
+                )
+        graphs[g_name] = dataclasses.replace(G_CFG, traces=traces + extra)
+
+    return type(CONFIG)(**graphs), plan
+
+
+# errorbands of aggregated traces, from the raw values of one window {std: mean +- std, minmax, quantiles: 10% / 90%}
+AGGREGATION_BANDS = ["std", "minmax", "quantiles"]
+
+
+class WindowAggregator:
+    """ reduces the raw values of a trace on ingest to one point per window: the mean, with an errorband (see
+    AGGREGATION_BANDS) from the values of the window. windows are either `window` raw values or x-buckets of width
+    `xbucket`. the point is placed at the last x of its window and is only produced once the window is complete. the
+    mean / std are merged online (welford for single values, chan et al. for whole batches), only the quantile band
+    keeps the values of the open window """
+
+    def __init__(self, window: int = None, xbucket: float = None, band: str = "std"):
+        if (window is None) == (xbucket is None):
+            raise ValueError("an aggregation needs either a window (number of points) or an xbucket (width in x)!")
+        if band not in AGGREGATION_BANDS:
+            raise ValueError(f"band has to be one of {AGGREGATION_BANDS}! (got {band})")
+        self._window  = window
+        self._xbucket = xbucket
+        self._band    = band
+        self._n_seen  = 0 # finite values so far, for the point windows
+        self._reset(None)
+
+    def _reset(self, window_id):
+        self._wid    = window_id
+        self._n      = 0
+        self._mean   = 0.0
+        self._m2     = 0.0
+        self._ymin   = math.inf
+        self._ymax   = -math.inf
+        self._values = []
+        self._x_last = math.nan
+
+    def _window_id(self, x: float) -> int:
+        return self._n_seen // self._window if self._window is not None else math.floor(x / self._xbucket)
+
+    def _close(self) -> tuple[float, float, float, float]:
+        if self._band == "std":
+            std    = math.sqrt(self._m2 / (self._n - 1)) if self._n > 1 else 0.0
+            lo, hi = self._mean - std, self._mean + std
+        elif self._band == "minmax":
+            lo, hi = self._ymin, self._ymax
+        else:
+            lo, hi = np.quantile(np.concatenate(self._values), [0.1, 0.9]).tolist()
+        return self._x_last, self._mean, lo, hi
+
+    def push(self, x: float, y: float) -> tuple[float, float, float, float] | None:
+        """ one raw value, returns the (x, mean, lo, hi) of the window it completes or None """
+
+        if not math.isfinite(y):
+            return None
+
+        closed = None
+        wid    = self._window_id(x)
+        if (self._n > 0) and (wid != self._wid):
+            closed = self._close()
+            self._reset(wid)
+        self._wid = wid
+
+        self._n    += 1
+        delta       = y - self._mean
+        self._mean += delta / self._n
+        self._m2   += delta * (y - self._mean)
+        self._ymin  = min(self._ymin, y)
+        self._ymax  = max(self._ymax, y)
+        if self._band == "quantiles":
+            self._values.append(np.array([y]))
+        self._x_last  = x
+        self._n_seen += 1
+
+        if (self._window is not None) and (self._n == self._window):
+            closed = self._close()
+            self._reset(None)
+        return closed
+
+    def extend(self, x: NDArray, y: NDArray) -> tuple[NDArray, NDArray, NDArray, NDArray]:
+        """ a batch of raw values, returns (x, mean, lo, hi) of all the windows that it completes (vectorized) """
+
+        finite = np.isfinite(y)
+        x, y   = x[finite], y[finite]
+        if len(y) == 0:
+            return tuple(np.empty(0) for _ in range(4))
+
+        if self._window is not None:
+            wids = (self._n_seen + np.arange(len(y))) // self._window
+        else:
+            wids = np.floor(x / self._xbucket).astype(np.int64)
+        self._n_seen += len(y)
+
+        # segments of consecutive values in the same window, per segment statistics in one go
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(wids)) + 1])
+        bounds = np.append(starts, len(y))
+        counts = np.diff(bounds)
+        means  = np.add.reduceat(y, starts) / counts
+        m2s    = np.add.reduceat((y - np.repeat(means, counts))**2, starts)
+        ymins  = np.minimum.reduceat(y, starts)
+        ymaxs  = np.maximum.reduceat(y, starts)
+        x_last = x[bounds[1:] - 1]
+        values = [y[bounds[k]:bounds[k+1]] for k in range(len(starts))] if self._band == "quantiles" else None
+
+        # the first segment either continues the open window or the open window is complete now
+        previous = None
+        if (self._n > 0) and (wids[0] == self._wid):
+            n_ab      = self._n + counts[0]
+            delta     = means[0] - self._mean
+            means[0]  = self._mean + delta * counts[0] / n_ab
+            m2s[0]    = self._m2 + m2s[0] + delta**2 * self._n * counts[0] / n_ab
+            ymins[0]  = min(self._ymin, ymins[0])
+            ymaxs[0]  = max(self._ymax, ymaxs[0])
+            counts[0] = n_ab
+            if values is not None:
+                values[0] = np.concatenate(self._values + [values[0]])
+        elif self._n > 0:
+            previous = self._close()
+
+        # all segments but the last one are complete, the last one too if it fills a whole point window
+        n_closed = len(starts) - 1
+        if (self._window is not None) and (counts[-1] == self._window):
+            n_closed += 1
+
+        if self._band == "std":
+            std    = np.sqrt(m2s[:n_closed] / np.maximum(counts[:n_closed] - 1, 1))
+            lo, hi = means[:n_closed] - std, means[:n_closed] + std
+        elif self._band == "minmax":
+            lo, hi = ymins[:n_closed], ymaxs[:n_closed]
+        else:
+            qs     = np.array([np.quantile(v, [0.1, 0.9]) for v in values[:n_closed]]).reshape(-1, 2)
+            lo, hi = qs[:, 0], qs[:, 1]
+        out = [x_last[:n_closed], means[:n_closed], lo, hi]
+        if previous is not None:
+            out = [np.concatenate([[v], o]) for v, o in zip(previous, out)]
+
+        # the last segment stays open
+        if n_closed < len(starts):
+            self._wid    = int(wids[-1])
+            self._n      = int(counts[-1])
+            self._mean   = float(means[-1])
+            self._m2     = float(m2s[-1])
+            self._ymin   = float(ymins[-1])
+            self._ymax   = float(ymaxs[-1])
+            self._values = [values[-1]] if values is not None else []
+            self._x_last = float(x_last[-1])
+        else:
+            self._reset(None)
+        return tuple(np.asarray(o, dtype=np.float64) for o in out)
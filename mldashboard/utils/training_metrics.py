@@ -1,5 +1,6 @@
 import torch
 import torch.nn as nn
+import numpy as np
 
 
 # TODO: rework and check and possibly add!
@@ -15,26 +16,38 @@ def calc_net_nparams(net: nn.Module, only_trainable: bool = False) -> int:
     else:
         return sum(torch.numel(p) for p in net.parameters())
 
-def calc_net_weightnorm(net: nn.Module, only_trainable: bool = False) -> float:
-    """just calculates the parameter weight norm of a network"""
+def calc_net_weightnorm(net: nn.Module, only_trainable: bool = False, as_tensor: bool = False) -> float | torch.Tensor:
+    """just calculates the parameter weight norm of a network. with as_tensor=True, the result stays a 0-dim tensor on
+    the device (no sync), e.g. to pass it to a DashPlotter with defer_transfer"""
     
     if not isinstance(net, nn.Module):
         raise TypeError(f"net must be an instance of nn.Module, got {type(net).__name__} instead.")
     
     with torch.no_grad():
         if only_trainable is True:
-            return (sum(torch.sum(p**2) for p in net.parameters() if p.requires_grad is True)**0.5).item()
+            weight_norm = sum(torch.sum(p**2) for p in net.parameters() if p.requires_grad is True)**0.5
         else:
-            return (sum(torch.sum(p**2) for p in net.parameters())**0.5).item()
+            weight_norm = sum(torch.sum(p**2) for p in net.parameters())**0.5
+    
+    return weight_norm if as_tensor is True else weight_norm.item()
         
-def calc_net_gradnorm(net: nn.Module) -> torch.Tensor:
-    """just calculates the gradient norm of a network. Call before gradients have been zeroed!"""
+def calc_net_gradnorm(net: nn.Module, as_tensor: bool = False) -> float | torch.Tensor:
+    """just calculates the gradient norm of a network. Call before gradients have been zeroed! with as_tensor=True, the
+    result stays a 0-dim tensor on the device (no sync). the check for all-zero gradients needs a sync, so it is only
+    done without as_tensor, a missing backward() is detected in both cases"""
     
     if not isinstance(net, nn.Module):
         raise TypeError(f"net must be an instance of nn.Module, got {type(net).__name__} instead.")
     
+    grads = [p.grad for p in net.parameters() if p.grad is not None]
+    if len(grads) == 0:
+        raise ValueError("No gradients found in the network. Ensure backward() is called before this function.")
+    
     with torch.no_grad():
-        grad_norm = sum(torch.sum(p.grad**2) for p in net.parameters() if p.grad is not None)**0.5
+        grad_norm = sum(torch.sum(g**2) for g in grads)**0.5
+    
+    if as_tensor is True:
+        return grad_norm
     
     if grad_norm == 0:
         raise ValueError("No gradients found in the network. Ensure backward() is called before this function.")
@@ -84,7 +97,148 @@ def calc_adam_rates(net: nn.Module, opt: torch.optim.Optimizer) -> tuple[float,
     
     return (eff_lr_norm**0.5).item(), (eff_udr_norm**0.5).item()
 
+def calc_net_stats(
+    net:            nn.Module, 
+    opt:            torch.optim.Optimizer = None, 
+    only_trainable: bool                  = False, 
+    as_tensor:      bool                  = False,
+) -> dict[str, float | torch.Tensor | None]:
+    """fused version of calc_net_weightnorm, calc_net_gradnorm and calc_adam_rates. computes everything with batched
+    foreach kernels in one sweep over the parameters, reads the adam state directly (no state_dict copies) and moves all
+    results to host in one transfer. returns a dict with "weightnorm", "gradnorm", "adam_lr" and "adam_udr". entries
+    that can't be computed yet (no gradients, no optimizer state) are None instead of raising. with as_tensor=True, the
+    values stay 0-dim tensors on the device (no sync). assumes that all parameters live on one device"""
+    
+    if not isinstance(net, nn.Module):
+        raise TypeError(f"net must be an instance of nn.Module, got {type(net).__name__} instead.")
+    if (opt is not None) and (not isinstance(opt, torch.optim.Adam)):
+        raise TypeError("The optimizer must be an instance of torch.optim.Adam")
+    
+    params = [p for p in net.parameters() if (only_trainable is False) or (p.requires_grad is True)]
+    grads  = [p.grad for p in net.parameters() if p.grad is not None]
+    
+    results = {"weightnorm": None, "gradnorm": None, "adam_lr": None, "adam_udr": None}
+    
+    with torch.no_grad():
+        # norm of all norms is the norm over everything
+        if len(params) > 0:
+            results["weightnorm"] = torch.linalg.vector_norm(torch.stack(torch._foreach_norm(params)))
+        if len(grads) > 0:
+            results["gradnorm"] = torch.linalg.vector_norm(torch.stack(torch._foreach_norm(grads)))
+        
+        if opt is not None:
+            adam_lr, adam_udr = _calc_adam_rates_foreach(opt)
+            results["adam_lr"], results["adam_udr"] = adam_lr, adam_udr
+    
+    if as_tensor is True:
+        return results
+    
+    # one single host transfer for all the values that could be computed
+    keys = [key for key, value in results.items() if value is not None]
+    if len(keys) > 0:
+        host_values = torch.stack([results[key] for key in keys]).cpu().tolist()
+        results.update(zip(keys, host_values))
+    return results
 
+def _calc_adam_rates_foreach(opt: torch.optim.Adam) -> tuple[torch.Tensor | None, torch.Tensor | None]:
+    """ effective learning rate norm and effective update rate norm (same as calc_adam_rates) with foreach kernels, 
+    parameter group aware. returns (None, None) if there is no optimizer state yet """
+    
+    m1s, m2s, grads      = [], [], []
+    m1_scales, m2_scales = [], []
+    eps_list             = []
+    
+    for group in opt.param_groups:
+        BETA1, BETA2 = group["betas"]
+        LR           = group["lr"]
+        EPSILON      = group.get("eps", 10**-8)
+        
+        for p in group["params"]:
+            state = opt.state.get(p)
+            if (p.grad is None) or (state is None) or ("exp_avg" not in state):
+                continue
+            
+            # step is a cpu tensor by default (no device sync), only capturable / fused optimizers keep it on device
+            step = float(state["step"])
+            m1s.append(state["exp_avg"])
+            m2s.append(state["exp_avg_sq"])
+            grads.append(p.grad)
+            # bias corrections folded into scalars: lr * m1/(1-b1^t) / (sqrt(m2)/sqrt(1-b2^t) + eps)
+            m1_scales.append(LR / (1 - BETA1**step))
+            m2_scales.append(1 / (1 - BETA2**step)**0.5)
+            eps_list.append(EPSILON)
+    
+    if len(m1s) == 0:
+        return None, None
+    
+    denom   = torch._foreach_sqrt(m2s)
+    torch._foreach_mul_(denom, m2_scales)
+    torch._foreach_add_(denom, eps_list)
+    eff_lr  = torch._foreach_mul(m1s, m1_scales)
+    torch._foreach_div_(eff_lr, denom)
+    eff_udr = torch._foreach_mul(eff_lr, grads)
+    
+    eff_lr_norm  = torch.linalg.vector_norm(torch.stack(torch._foreach_norm(eff_lr)))
+    eff_udr_norm = torch.linalg.vector_norm(torch.stack(torch._foreach_norm(eff_udr)))
+    return eff_lr_norm, eff_udr_norm
 
-
-
+class LayerStatsTracker:
+    """per-layer (per parameter tensor) gradient norm, weight norm and update / weight ratio, every `every` steps. call
+    before() between backward() and the optimizer step and after() right after it, the update is the actual change of
+    the weights by the optimizer. everything is computed with batched foreach kernels, and all values of one step are
+    moved to host in one transfer. the copy of the weights before the update only exists from before() to after() of a
+    tracked step, it does not double the weight memory for the rest of the run"""
+    
+    def __init__(self, net: nn.Module, every: int = 10, only_trainable: bool = True):
+        if not isinstance(net, nn.Module):
+            raise TypeError(f"net must be an instance of nn.Module, got {type(net).__name__} instead.")
+        if every < 1:
+            raise ValueError(f"every has to be at least 1! (got {every})")
+        
+        named        = [(name, p) for name, p in net.named_parameters() if (only_trainable is False) or p.requires_grad]
+        self.names   = [name for name, _ in named]
+        self.every   = every
+        self._params = [p for _, p in named]
+        self._before = None # weights before the update, only during a tracked step
+        self._due    = False
+        self._stats  = None
+    
+    def before(self, step: int) -> bool:
+        """gradient and weight norms and a copy of the weights, only every `every` steps. returns whether this step is
+        tracked"""
+        
+        self._due = (step % self.every == 0) and (len(self._params) > 0)
+        if self._due is False:
+            return False
+        
+        with torch.no_grad():
+            self._before = [torch.empty_like(p) for p in self._params]
+            torch._foreach_copy_(self._before, self._params)
+            
+            # parameters without a gradient (e.g. unused in this step) get NaN
+            grad_norms = torch.full((len(self._params),), float("nan"), device=self._params[0].device)
+            with_grad  = [i for i, p in enumerate(self._params) if p.grad is not None]
+            if len(with_grad) > 0:
+                norms = torch._foreach_norm([self._params[i].grad for i in with_grad])
+                grad_norms[with_grad] = torch.stack(norms).to(grad_norms.dtype)
+            
+            weight_norms = torch.stack(torch._foreach_norm(self._params)).to(grad_norms.dtype)
+        self._stats = (grad_norms, weight_norms)
+        return True
+    
+    def after(self) -> np.ndarray | None:
+        """(stat, layer) float32 values of the tracked step (in the order of datastore.LAYER_STATS), None if before()
+        did not track this step"""
+        
+        if self._due is False:
+            return None
+        self._due = False
+        
+        grad_norms, weight_norms = self._stats
+        before, self._before     = self._before, None # released with this step
+        with torch.no_grad():
+            torch._foreach_sub_(before, self._params) # in place, no second copy for the difference
+            update_norms = torch.stack(torch._foreach_norm(before))
+            ratios       = update_norms.to(weight_norms.dtype) / weight_norms
+            values       = torch.stack([grad_norms, weight_norms, ratios])
+        return values.cpu().to(torch.float32).numpy()
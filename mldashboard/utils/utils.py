@@ -1,21 +1,43 @@
 import numpy as np
-import matplotlib.colors as mcolors
 import bisect
 
-  
-def adjust_alpha(color: str, adjust_a: float):
-    """Takes a css "color name", "rgb(r, g, b)", or "rgba(r, g, b, a)" string and outputs the color in "rgba" format
-    with adjust_a times the original alpha value."""
-    
-    if color.startswith("rgb"):
-        components = color[color.index("(")+1:color.index(")")].split(",")
+from .csscolors import CSS_COLORS, TABLEAU_COLORS
+
+
+def _is_palette_color(name: str) -> bool:
+    return (name in TABLEAU_COLORS) or ((len(name) == 2) and (name[0] == "c") and name[1].isdigit())
+
+def parse_color(color: str) -> tuple[int, int, int, float]:
+    """ (r, g, b, a) of a css color name, "#rgb", "#rgba", "#rrggbb", "#rrggbbaa", "rgb(r, g, b)", "rgba(r, g, b, a)" or
+    a tableau palette color ("tab:blue", ... or "C0" ... "C9", like matplotlib) """
+
+    name = color.strip().lower()
+    if name.startswith("rgb"):
+        components = name[name.index("(")+1:name.index(")")].split(",")
         r, g, b    = map(int, components[:3])  # Extract RGB components
         a          = float(components[3]) if len(components) == 4 else 1.0  # a assumed to be 1.0 if not provided
-    else:
-        # Assume it's a CSS color name
-        r, g, b = [int(c * 255) for c in mcolors.to_rgb(color)]
-        a = 1.0
+        return r, g, b, a
+    if name.startswith("#") and (len(name) in (4, 5, 7, 9)):
+        digits = name[1:] if len(name) > 5 else "".join(2 * d for d in name[1:]) # short form: every digit twice
+        values = [int(digits[i:i+2], 16) for i in range(0, len(digits), 2)]
+        return values[0], values[1], values[2], (values[3] / 255 if len(values) == 4 else 1.0)
+    if _is_palette_color(name):
+        name = name if name in TABLEAU_COLORS else list(TABLEAU_COLORS)[int(name[1])]
+        return (*TABLEAU_COLORS[name], 1.0)
+    if name in CSS_COLORS:
+        return (*CSS_COLORS[name], 1.0)
+    raise ValueError(f"color has to be a css color name, #rgb(a), #rrggbb(aa), rgb(...), rgba(...), tab:<name> or C0 ... C9! (got {color})")
 
+def plotly_color(color: str) -> str:
+    """ the color in a form plotly understands: css names, hex and rgb(a) as they are, the tableau palette as rgb """
+
+    r, g, b, _ = parse_color(color) # (also checks the color)
+    return f"rgb({r}, {g}, {b})" if _is_palette_color(color.strip().lower()) else color
+
+def adjust_alpha(color: str, adjust_a: float):
+    """Takes a color (see parse_color) and outputs it in "rgba" format with adjust_a times the original alpha value."""
+    
+    r, g, b, a = parse_color(color)
     a *= adjust_a
     a = max(0, min(a, 1)) # Ensure alpha stays in range [0, 1]
     return f"rgba({r}, {g}, {b}, {a:.3f})"
@@ -33,6 +55,9 @@ def determine_single_range(MIN: float, MAX: float, factor: float):
 def determine_mixed_range(RNG1: list, RNG2: list, ε: float = 1e-6):
     """ determines the best range for a subplot mixed y axis range so that both ranges have the same ratio of above zeroline and below zeroline spans. assumes max is > 0 and min is < 0!"""
 
+    # the inputs stay as they are
+    RNG1, RNG2 = list(RNG1), list(RNG2)
+    
     # use a geometric mean of both ratios to find a sensible ratio that works the best for both
     R1_ORIG = (RNG1[1] + ε) / (-RNG1[0] + ε)
     R2_ORIG = (RNG2[1] + ε) / (-RNG2[0] + ε)
@@ -0,0 +1,81 @@
+### IMPORTS ############################################################################################################
+import argparse
+import json
+import threading
+import webbrowser
+
+from .plotter import DashPlotter
+from .containers.datastore import LayerStatsData
+from .containers.runlog import LOG_FLUSH_INTERVAL, load_run_log
+from .containers.setupconfig import config_from_dict
+from .containers.sharedring import SharedRingBuffer
+from .dash.dashprocess import serve_from_ring
+
+### DEFINITIONS ########################################################################################################
+
+
+def follow_run_log(plotter: DashPlotter, path: str, interval: float = LOG_FLUSH_INTERVAL) -> threading.Event:
+    """ reads the values that were added to the run log every `interval` seconds on a background thread, so that a log
+    that is still being written shows up live. set the returned event to stop following """
+
+    stop = threading.Event()
+
+    def _follow():
+        last_error = None
+        while not stop.wait(interval):
+            try:
+                plotter._extend_from_log(load_run_log(path, since=plotter._log_lengths())[1])
+                last_error = None
+            except Exception as err:
+                # whatever went wrong (mostly the writer in the middle of a flush), the follower keeps going and tries
+                # again next time. the same error is only reported once
+                if repr(err) != last_error:
+                    print(f"warning: could not read {path}, trying again ({type(err).__name__}: {err})")
+                last_error = repr(err)
+
+    threading.Thread(target=_follow, daemon=True).start()
+    return stop
+
+def attach_ring(ring_name: str, **kwargs) -> tuple[DashPlotter, SharedRingBuffer]:
+    """ a plotter for the shared memory ring buffer of a running out_of_process plotter (DashPlotter.ring_name), with
+    the config the ring carries. kwargs are passed on to DashPlotter.__init__ """
+
+    ring    = SharedRingBuffer(name=ring_name, track=False)
+    meta    = json.loads(ring.meta.decode())
+    plotter = DashPlotter(config_from_dict(meta["config"]), **kwargs)
+    if meta["layers"] is not None:
+        # before the app is built, it only gets the layer heatmaps if the store has layer statistics
+        plotter._store.layers = LayerStatsData(meta["layers"])
+    return plotter, ring
+
+def main(argv: list[str] = None):
+    """ entry point of the mldashboard-view command: serves the dashboard of a run log (also while it is still being
+    written) or of a running (headless) out_of_process plotter """
+
+    parser = argparse.ArgumentParser(
+        prog        = "mldashboard-view",
+        description = "serves the dashboard of a run log or of a running (headless) out_of_process plotter",
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("log_path", nargs="?", help="run log (log_path of the DashPlotter)")
+    source.add_argument("--attach", metavar="RING_NAME", help="shared memory ring buffer (DashPlotter.ring_name)")
+    parser.add_argument("--compare", nargs="*", default=None, metavar="LOG_PATH", help="run logs to overlay")
+    parser.add_argument("--push", action="store_true", help="push updates to the browser instead of polling")
+    parser.add_argument("--no-follow", action="store_true", help="show the run log as it is now")
+    parser.add_argument("--no-browser", action="store_true", help="do not open a browser tab")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", default=8050, type=int)
+    args = parser.parse_args(argv)
+
+    if args.no_browser is False:
+        webbrowser.open_new_tab(f"http://{args.host}:{args.port}/")
+
+    if args.attach is not None:
+        plotter, ring = attach_ring(args.attach, push_updates=args.push, compare_runs=args.compare)
+        serve_from_ring(plotter, ring, args.host, args.port)
+        return
+
+    plotter = DashPlotter.from_log(args.log_path, push_updates=args.push, compare_runs=args.compare)
+    if args.no_follow is False:
+        follow_run_log(plotter, args.log_path)
+    plotter._app.run(host=args.host, port=args.port, debug=True, use_reloader=False)
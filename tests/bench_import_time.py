@@ -0,0 +1,39 @@
+import os
+import sys
+from   pathlib import Path
+import subprocess
+
+
+# modules whose import time is measured (in a fresh interpreter each), and how many of the slowest imports are listed
+MODULES   = ["mldashboard.plotter", "mldashboard.dash.dashapp", "mldashboard.utils.training_metrics"]
+N_SLOWEST = 10
+
+def measure_import(module: str) -> list[tuple[int, int, str]]:
+    """ python -X importtime of one module in a fresh interpreter: [(self us, cumulative us, name), ...] """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output = True,
+        text           = True,
+        check          = True,
+        cwd            = Path(__file__).resolve().parents[1],
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name == "nt" else "clear") # start with an empty terminal
+    print(f"\033[1m\033[38;2;51;153;102mrunning script {__file__}... \033[0m")
+
+    for module in MODULES:
+        rows  = measure_import(module)
+        total = [cumulative for _, cumulative, name in rows if name == module][0]
+        print(f"\n{module}: {total/1e3:.1f} ms")
+        for _, cumulative, name in sorted(rows, key=lambda row: row[1], reverse=True)[1:N_SLOWEST+1]:
+            print(f"    {cumulative/1e3:>8.1f} ms  {name}")
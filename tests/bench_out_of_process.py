@@ -0,0 +1,154 @@
+import os
+import sys
+from   pathlib import Path
+import json
+import multiprocessing
+import socket
+import time
+import urllib.request
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[1]))
+from mldashboard.plotter import DashPlotter
+from mldashboard.containers.setupconfig import Config, GraphConfig, TraceConfig
+
+
+# seconds of training per mode and seconds between two polls of the simulated browser (for all graphs)
+RUN_SECONDS   = 8.0
+POLL_INTERVAL = 0.1
+
+def make_config() -> Config:
+    return Config(
+        graph1 = GraphConfig(
+            title  = "loss",
+            totalx = 100_000,
+            traces = [TraceConfig("train", "red", errors=True), TraceConfig("valid", "green")],
+        ),
+        graph2 = GraphConfig(
+            title  = "norms",
+            totalx = 100_000,
+            traces = [TraceConfig("weights", "red"), TraceConfig("grads", "green", yaxis="secondary")],
+        ),
+        graph3 = GraphConfig(
+            title  = "lr",
+            totalx = 100_000,
+            traces = [TraceConfig("lr", "red")],
+        ),
+    )
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _dash_id(id: dict) -> str:
+    return json.dumps(id, sort_keys=True, separators=(",", ":"))
+
+def update_graphs_body(session_id: str, g_names: list[str], n: int) -> dict:
+    """ request of the batched graph update callback, like the browser sends it when polling """
+
+    ids = lambda kind: [{"type": f"graph-{kind}", "index": g_name} for g_name in g_names]
+    return {
+        "output":         f"..{_dash_id({'index': ['ALL'], 'type': 'graph-card'})}.figure"
+                          f"...{_dash_id({'index': ['ALL'], 'type': 'graph-wire'})}.data"
+                          f"...ud-interval-graphs.interval..",
+        "outputs":        [
+            [{"id": id, "property": "figure"} for id in ids("card")],
+            [{"id": id, "property": "data"} for id in ids("wire")],
+            {"id": "ud-interval-graphs", "property": "interval"},
+        ],
+        "inputs":         [{"id": "ud-interval-graphs", "property": "n_intervals", "value": n}],
+        "state":          [
+            {"id": "session-id", "property": "data", "value": session_id},
+            [{"id": id, "property": "data", "value": None} for id in ids("compare")],
+        ],
+        "changedPropIds": ["ud-interval-graphs.n_intervals"],
+    }
+
+def simulate_browser(port: int, stop):
+    """ runs in its own process: polls the graph callback like an open dashboard tab does """
+
+    while True:
+        try:
+            layout = json.loads(urllib.request.urlopen(f"http://127.0.0.1:{port}/_dash-layout").read())
+            break
+        except OSError:
+            time.sleep(0.1)
+    session_id = [c for c in layout["props"]["children"] if c["props"].get("id") == "session-id"][0]["props"]["data"]
+
+    n = 0
+    while not stop.is_set():
+        n += 1
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/_dash-update-component",
+            data    = json.dumps(update_graphs_body(session_id, ["graph1", "graph2", "graph3"], n)).encode(),
+            headers = {"Content-Type": "application/json"},
+        )
+        urllib.request.urlopen(request).read()
+        time.sleep(POLL_INTERVAL)
+
+def run_training(mode: str) -> np.ndarray:
+    """ small cpu training loop that logs 6 values per step, returns the step times in seconds """
+
+    torch.manual_seed(0)
+    net = nn.Sequential(nn.Linear(64, 256), nn.ReLU(), nn.Linear(256, 256), nn.ReLU(), nn.Linear(256, 1))
+    opt = torch.optim.Adam(net.parameters(), lr=1e-3)
+    X, Y = torch.randn(256, 64), torch.randn(256, 1)
+
+    plotter = DashPlotter(make_config(), out_of_process=(mode == "out-of-process"))
+    ctx     = multiprocessing.get_context("spawn")
+    stop    = None
+    browser = None
+    if mode != "no dashboard":
+        stop = ctx.Event()
+        port = free_port()
+        plotter._start_server("127.0.0.1", port)
+        browser = ctx.Process(target=simulate_browser, args=(port, stop), daemon=True)
+        browser.start()
+        time.sleep(5.0) # let the dashboard (and the first poll) come up
+
+    step_times = []
+    t_end = time.perf_counter() + RUN_SECONDS
+    step  = 0
+    while time.perf_counter() < t_end:
+        t0 = time.perf_counter()
+        plotter.batchtimer("start")
+        loss = nn.functional.mse_loss(net(X), Y)
+        opt.zero_grad()
+        loss.backward()
+        opt.step()
+        plotter.add_data(1, 0, step, loss.detach(), 0.1, 0.1)
+        plotter.add_data(1, 1, step, loss.detach() * 1.1)
+        plotter.add_data(2, 0, step, 1.0)
+        plotter.add_data(2, 1, step, 0.5)
+        plotter.add_data(3, 0, step, 1e-3)
+        plotter.batchtimer("stop", batch_size=256)
+        step_times.append(time.perf_counter() - t0)
+        step += 1
+
+    if browser is not None:
+        stop.set()
+        browser.join()
+    return np.array(step_times)
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name == "nt" else "clear") # start with an empty terminal
+    print(f"\033[1m\033[38;2;51;153;102mrunning script {__file__}... \033[0m")
+
+    # out of process only pays off if the dashboard process gets its own core
+    torch.set_num_threads(1)
+    print(f"cpu cores: {os.cpu_count()}")
+    print(f"{'mode':>16} | {'steps':>7} | {'mean [ms]':>10} | {'p50 [ms]':>9} | {'p99 [ms]':>9} | {'overhead':>9}")
+    baseline = None
+    for mode in ["no dashboard", "in-thread", "out-of-process"]:
+        times = run_training(mode)
+        mean  = times.mean()
+        baseline = mean if baseline is None else baseline
+        print(
+            f"{mode:>16} | {len(times):>7} | {1e3*mean:>10.3f} | {1e3*np.median(times):>9.3f} | "
+            f"{1e3*np.percentile(times, 99):>9.3f} | {100*(mean/baseline - 1):>8.1f}%"
+        )
@@ -0,0 +1,52 @@
+import os
+import sys
+from   pathlib import Path
+import threading
+import time
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[1]))
+from mldashboard.containers.datastore import TraceData
+
+
+def run_writer(n_readers: int, duration: float) -> tuple[float, int]:
+    """ one writer thread appending as fast as possible against n_readers snapshot readers (one snapshot per ms each).
+    returns the points per second of the writer and the number of snapshots taken """
+
+    trace   = TraceData()
+    trace.add_errorband()
+    stop    = threading.Event()
+    n_snaps = [0] * n_readers
+
+    def _writer():
+        i = 0
+        while not stop.is_set():
+            y = i if i % 2 else -i # new min or max on every point
+            trace.append(i, y, y - 1, y + 1)
+            i += 1
+
+    def _reader(r_nr: int):
+        while not stop.is_set():
+            trace.snapshot()
+            n_snaps[r_nr] += 1
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=_reader, args=(r,)) for r in range(n_readers)]
+    threads.append(threading.Thread(target=_writer))
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    return trace.length / duration, sum(n_snaps)
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name == "nt" else "clear") # start with an empty terminal
+    print(f"\033[1m\033[38;2;51;153;102mrunning script {__file__}... \033[0m")
+
+    # the writer should sustain more than 100k points/s next to the readers
+    print(f"{'n readers':>10} | {'points/s':>12} | {'snapshots':>10}")
+    for n_readers in [0, 1, 4, 16]:
+        rate, n_snaps = run_writer(n_readers, duration=2.0)
+        print(f"{n_readers:>10} | {rate:>12,.0f} | {n_snaps:>10}")
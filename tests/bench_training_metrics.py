@@ -0,0 +1,61 @@
+import os
+import sys
+from   pathlib import Path
+import time
+
+import torch
+import torch.nn as nn
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[1]))
+from mldashboard.utils.training_metrics import calc_net_weightnorm
+from mldashboard.utils.training_metrics import calc_net_gradnorm
+from mldashboard.utils.training_metrics import calc_adam_rates
+from mldashboard.utils.training_metrics import calc_net_stats
+
+
+class ManyTensorNet(nn.Module):
+    """ dummy network that only consists of n_tensors small parameter tensors """
+    
+    def __init__(self, n_tensors: int, tensor_size: int = 16):
+        super().__init__()
+        self.params = nn.ParameterList([nn.Parameter(torch.randn(tensor_size)) for _ in range(n_tensors)])
+
+def make_setup(n_tensors: int, device: str) -> tuple[nn.Module, torch.optim.Adam]:
+    """ network with gradients and one adam step already done (so that the optimizer state exists) """
+    
+    net = ManyTensorNet(n_tensors).to(device)
+    opt = torch.optim.Adam(net.parameters(), lr=10**-3)
+    for p in net.parameters():
+        p.grad = torch.randn_like(p)
+    opt.step()
+    return net, opt
+
+def run_single(net: nn.Module, opt: torch.optim.Adam):
+    return calc_net_weightnorm(net), calc_net_gradnorm(net), calc_adam_rates(net, opt)
+
+def run_fused(net: nn.Module, opt: torch.optim.Adam):
+    return calc_net_stats(net, opt)
+
+def time_fn(fn, *args, n_reps: int) -> float:
+    """ average seconds per call (after one warmup call) """
+    
+    fn(*args)
+    t0 = time.perf_counter()
+    for _ in range(n_reps):
+        fn(*args)
+    return (time.perf_counter() - t0) / n_reps
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name == "nt" else "clear") # start with an empty terminal
+    print(f"\033[1m\033[38;2;51;153;102mrunning script {__file__}... \033[0m")
+    
+    DEVICE = "cuda:0" if torch.cuda.is_available() else "cpu"
+    print(f"device: {DEVICE}")
+    
+    print(f"{'n tensors':>10} | {'single fns [ms]':>16} | {'fused [ms]':>11} | {'speedup':>8}")
+    for n_tensors, n_reps in [(10, 200), (1_000, 20), (100_000, 2)]:
+        net, opt = make_setup(n_tensors, DEVICE)
+        t_single = time_fn(run_single, net, opt, n_reps=n_reps)
+        t_fused  = time_fn(run_fused,  net, opt, n_reps=n_reps)
+        print(f"{n_tensors:>10} | {1e3*t_single:>16.3f} | {1e3*t_fused:>11.3f} | {t_single/t_fused:>7.1f}x")
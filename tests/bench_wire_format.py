@@ -0,0 +1,50 @@
+import os
+import sys
+from   pathlib import Path
+import time
+
+import numpy as np
+from   plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[1]))
+from mldashboard.dash.components.wire import PatchWriter
+
+
+def encode_update(transport: str, x: np.ndarray, y: np.ndarray) -> str:
+    """ one graph update with n new points on one trace (x and y), serialized the same way dash sends callback output """
+
+    writer = PatchWriter(transport)
+    writer.extend_array(["data", 0, "x"], x)
+    writer.extend_array(["data", 0, "y"], y)
+    writer["data"][1]["x"] = [float(x[-1])]*2 # endpoint marker, as in the real update
+    writer["data"][1]["y"] = [float(y[-1])]*2
+    return to_json_plotly(writer.result())
+
+def time_fn(fn, *args, n_reps: int) -> float:
+    """ average seconds per call (after one warmup call) """
+
+    fn(*args)
+    t0 = time.perf_counter()
+    for _ in range(n_reps):
+        fn(*args)
+    return (time.perf_counter() - t0) / n_reps
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name == "nt" else "clear") # start with an empty terminal
+    print(f"\033[1m\033[38;2;51;153;102mrunning script {__file__}... \033[0m")
+
+    rng = np.random.default_rng(0)
+
+    print(f"{'n points':>10} | {'transport':>9} | {'bytes / update':>15} | {'bytes / point':>14} | {'encode [ms]':>12}")
+    for n_points, n_reps in [(10_000, 50), (1_000_000, 3)]:
+        # typical training data: integer steps and a noisy loss
+        x = np.arange(n_points, dtype=np.float64)
+        y = np.exp(-x / n_points) + 0.05 * rng.normal(size=n_points)
+
+        for transport in ["json", "binary64", "binary32"]:
+            n_bytes  = len(encode_update(transport, x, y).encode())
+            t_encode = time_fn(encode_update, transport, x, y, n_reps=n_reps)
+            print(
+                f"{n_points:>10} | {transport:>9} | {n_bytes:>15,} | {n_bytes/n_points:>14.1f} | {1e3*t_encode:>12.2f}"
+            )
@@ -18,7 +18,6 @@ class PlotterCallback:
     def __init__(self, plotter):
         self.p = plotter
         self.sample_counter = 0
-        self.grad_norm = []
 
     def on_train_batch_start(self, batch):
         self.p.batchtimer("start")
@@ -36,16 +35,12 @@ class PlotterCallback:
         self.p.add_data(2, 0, self.sample_counter, self.p.batchtimer("read"))
 
     def on_after_backward(self, model):
-        self.grad_norm.append(calc_net_gradnorm(model))
+        # per step raw value, the grad norm trace is aggregated by the plotter (e.g. TraceConfig(..., xbucket=1000))
+        self.p.add_data(3, 0, self.sample_counter, calc_net_gradnorm(model))
 
     def on_validation_end(self, val_loss, model):
         self.p.add_data(1, 1, self.sample_counter, val_loss)
         self.p.add_data(3, 1, self.sample_counter, calc_net_weightnorm(model))
-
-        gn_avg, gn_std_hi, gn_std_lo = do_gradnorm(self.grad_norm)
-        self.p.add_data(3, 0, self.sample_counter, gn_avg, gn_std_lo, gn_std_hi)
-
-        self.grad_norm = []
  
  
         
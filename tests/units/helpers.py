@@ -0,0 +1,113 @@
+import os
+import sys
+import dataclasses
+import json
+from   pathlib import Path
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.containers.setupconfig import Config
+from mldashboard.containers.setupconfig import GraphConfig
+from mldashboard.containers.setupconfig import TraceConfig
+
+
+### configs ###
+
+def make_test_config() -> Config:
+    return Config(
+        graph1=GraphConfig(
+            title  = "graph 1 title",
+            totalx = 10_000,
+            traces = [
+                TraceConfig("g1 t1", "red", errors=True),
+                TraceConfig("g1 t2", "green", yaxis="secondary"),
+            ]
+        ),
+        graph2=GraphConfig(
+            title  = "graph 2 title",
+            totalx = 10_000,
+            nxdown = 100,
+            traces = [
+                TraceConfig("g2 t1", "red"),
+                TraceConfig("g2 t2", "green"),
+            ]
+        ),
+        graph3=GraphConfig(
+            title  = "graph 3 title",
+            totalx = 10_000,
+            traces = [
+                TraceConfig("g3 t1", "red"),
+            ]
+        ),
+    )
+
+def make_stats_config() -> Config:
+    """ test config with the streaming statistics (ema, rolling, quantiles) on the first trace of graph 1 """
+
+    CONFIG = make_test_config()
+    G_CFG  = dataclasses.replace(CONFIG.graph1, traces=[
+        TraceConfig("loss", "red", ema=0.8, rolling=20, quantiles=True),
+        TraceConfig("valid", "green", yaxis="secondary"),
+    ])
+    return Config(**{**CONFIG.graphs, "graph1": G_CFG})
+
+def make_many_graphs_config(n_graphs: int) -> Config:
+    return Config(*[
+        GraphConfig(title=f"layer {g_nr}", totalx=1_000, traces=[TraceConfig(f"g{g_nr} t0", "red")])
+        for g_nr in range(1, n_graphs + 1)
+    ])
+
+def make_ddp_config(world_size: int, n_steps: int) -> Config:
+    """ graph 1 with one trace per rank (two logical traces), graph 2 with the spread of one trace """
+
+    # imported here, so that only the distributed tests import torch.distributed
+    from mldashboard.distributed import per_rank_traces
+
+    return Config(
+        graph1 = GraphConfig(
+            title  = "per rank",
+            totalx = n_steps,
+            traces = per_rank_traces(TraceConfig("loss", "red"), world_size)
+                     + per_rank_traces(TraceConfig("acc", "blue"), world_size),
+        ),
+        graph2 = GraphConfig(
+            title  = "spread",
+            totalx = n_steps,
+            traces = [TraceConfig("loss", "red", errors=True)],
+        ),
+        graph3 = GraphConfig(
+            title  = "unused",
+            totalx = n_steps,
+            traces = [TraceConfig("unused", "red")],
+        ),
+    )
+
+### dash requests and patches ###
+
+def operations(patch) -> list[dict]:
+    """ the operations of a dash Patch, as they are sent to the browser """
+
+    return patch.to_plotly_json()["operations"]
+
+def dash_id(id: dict) -> str:
+    return json.dumps(id, sort_keys=True, separators=(",", ":"))
+
+def update_graphs_body(session_id: str, g_names: list[str], n: int) -> dict:
+    """ request of the batched graph update callback, like the browser sends it when polling """
+
+    ids = lambda kind: [{"type": f"graph-{kind}", "index": g_name} for g_name in g_names]
+    return {
+        "output":         f"..{dash_id({'index': ['ALL'], 'type': 'graph-card'})}.figure"
+                          f"...{dash_id({'index': ['ALL'], 'type': 'graph-wire'})}.data"
+                          f"...ud-interval-graphs.interval..",
+        "outputs":        [
+            [{"id": id, "property": "figure"} for id in ids("card")],
+            [{"id": id, "property": "data"} for id in ids("wire")],
+            {"id": "ud-interval-graphs", "property": "interval"},
+        ],
+        "inputs":         [{"id": "ud-interval-graphs", "property": "n_intervals", "value": n}],
+        "state":          [
+            {"id": "session-id", "property": "data", "value": session_id},
+            [{"id": id, "property": "data", "value": None} for id in ids("compare")],
+        ],
+        "changedPropIds": ["ud-interval-graphs.n_intervals"],
+    }
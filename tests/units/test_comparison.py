@@ -0,0 +1,78 @@
+import os
+import sys
+from   pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.containers.runlog import RunLogWriter
+from mldashboard.containers.datastore import GraphCursors
+from mldashboard.dash.components.comparison import RunArchive
+from mldashboard.dash.components.callbacks import callback_generate_comparison_patch
+from mldashboard.plotter import DashPlotter
+
+from helpers import make_test_config, operations
+
+
+def _write_runs(directory: Path, n_runs: int) -> list[str]:
+    paths = []
+    for run in range(n_runs):
+        path   = str(directory / f"run{run}.h5")
+        writer = RunLogWriter(path, make_test_config(), flush_interval=60.0)
+        writer.put(1, 0, np.arange(5_000.0), np.full(5_000, float(run)))
+        writer.put(2, 1, np.arange(5_000.0), -np.arange(5_000.0))
+        writer.close()
+        paths.append(path)
+    return paths
+
+def test_archive_loads_lazily(tmp_path):
+    archive = RunArchive(_write_runs(tmp_path, 20))
+    assert archive.n_opened == 0 and len(archive.names) == 20
+
+    G_CFG   = make_test_config().graph2
+    overlay = archive.overlay("run3", "graph2", G_CFG)
+    assert archive.n_opened == 1
+    # only the trace that has data, downsampled to the resolution of the graph
+    assert [trace_nr for trace_nr, *_ in overlay] == [1]
+    assert len(overlay[0][1]) == G_CFG.nxdown // 2
+    assert overlay[0][3:] == (-4_999.0, 0.0)
+
+    # the second viewer gets the shared downsampled trace
+    archive.overlay("run3", "graph2", G_CFG)
+    assert archive._cache.hits == 1 and archive._cache.misses == 1
+
+def test_comparison_patch(tmp_path):
+    archive = RunArchive(_write_runs(tmp_path, 3))
+    plotter = DashPlotter(make_test_config(), compare_runs=archive.names)
+    G_CFG   = plotter._CONFIG.graph1
+    n_live  = len(plotter._app.layout().children[0].children[0].children[1].children.figure.data)
+    plotter.add_batch(1, 0, np.arange(10), np.ones(10))
+    g_cursors = GraphCursors(len(G_CFG.traces))
+
+    patch, shown = callback_generate_comparison_patch(
+        G_CFG, "graph1", plotter._store.graph1, n_live, ["run1", "run2"], None, archive, g_cursors
+    )
+    appended = [op for op in operations(patch) if op["operation"] == "Append"]
+    assert [op["params"]["value"]["name"] for op in appended] == ["g1 t1 (run1)", "g1 t1 (run2)"]
+    assert shown == {"runs": [["run1", 1], ["run2", 1]], "yrange": [1.0, 2.0, None, None]}
+    maxallowed = [op for op in operations(patch) if op["location"][-1] == "maxallowed"][0]["params"]["value"]
+    assert maxallowed > 2.0
+    # the range the viewer's figure shows now, for the next graph patch of the session
+    assert g_cursors.yrange_sent[0, 1] == maxallowed
+
+    # deselecting only removes that run, behind the live traces
+    patch, shown = callback_generate_comparison_patch(
+        G_CFG, "graph1", plotter._store.graph1, n_live, ["run2"], shown, archive
+    )
+    deleted = [op["location"] for op in operations(patch) if op["operation"] == "Delete"]
+    assert deleted == [["data", n_live]]
+    assert shown["runs"] == [["run2", 1]]
+    assert archive.n_opened == 2
+
+
+if __name__ == "__main__":
+    import tempfile
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_archive_loads_lazily(Path(tempfile.mkdtemp()))
+    test_comparison_patch(Path(tempfile.mkdtemp()))
@@ -6,11 +6,156 @@ sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
 from mldashboard.containers.datastore import Store
 from mldashboard.containers.datastore import GraphStore
 from mldashboard.containers.datastore import TraceData
+from mldashboard.containers.datastore import TRACE_INIT_CAPACITY
+
+import threading
+import time
+
+import numpy as np
+
+
+def test_tracedata_growth_and_views():
+    trace = TraceData()
+    trace.add_errorband()
+    
+    n = 3*TRACE_INIT_CAPACITY + 7
+    for i in range(n):
+        trace.append(i, -i, -i-1, -i+1 if i % 2 else None)
+        
+    assert trace.length == n
+    assert trace.capacity >= n
+    assert trace.x.dtype == np.float64
+    assert np.array_equal(trace.x, np.arange(n))
+    assert np.array_equal(trace.y, -np.arange(n))
+    assert np.array_equal(trace.ylo, -np.arange(n)-1)
+    assert trace.yhi[0] == trace.y[0] # zero-width band if no value given
+    assert (trace.ymin, trace.ymax) == (-(n-1), 0)
+    
+    # views are zero-copy and cut at the frozen length
+    x, y, ylo, yhi = trace.views(10)
+    assert len(x) == len(y) == len(ylo) == len(yhi) == 10
+    assert np.shares_memory(x, trace._x)
+
+def test_tracedata_old_views_survive_growth():
+    trace = TraceData()
+    for i in range(TRACE_INIT_CAPACITY):
+        trace.append(i, i)
+    
+    x_before = trace.x
+    trace.append(-1, -1) # triggers reallocation
+    assert np.array_equal(x_before, np.arange(TRACE_INIT_CAPACITY))
+    assert trace.x[-1] == -1
+    assert trace.ylo is None
+
+def test_tracedata_extend():
+    trace = TraceData()
+    trace.add_errorband()
+    trace.append(0, 0.5)
+    
+    n = 2*TRACE_INIT_CAPACITY
+    y = np.sin(np.arange(n))
+    y[3] = np.nan
+    trace.extend(np.arange(1, n+1, dtype=np.float64), y, y-1, None)
+    
+    assert trace.length == n + 1
+    assert np.array_equal(trace.x, np.arange(n+1))
+    assert np.array_equal(trace.ylo[1:], y-1, equal_nan=True)
+    assert np.array_equal(trace.yhi[1:], y, equal_nan=True)
+    assert trace.ymin == np.nanmin(y) and trace.ymax == np.nanmax(y) # NaNs don't poison the running min / max
+    assert (trace.yminver, trace.ymaxver) == (2, 2)
+    
+    trace.extend(np.array([]), np.array([]))
+    assert trace.length == n + 1
+
+def test_tracedata_snapshot_stress():
+    """ one writer thread appending as fast as possible against several snapshot readers. every snapshot has to be
+    internally consistent (the writer's throughput is measured in tests/bench_tracedata.py) """
+    
+    N_READERS = 4
+    DURATION  = 1.0
+    
+    trace  = TraceData()
+    trace.add_errorband()
+    stop   = threading.Event()
+    errors = []
+    n_snaps = [0] * N_READERS
+    
+    def _writer():
+        i = 0
+        while not stop.is_set():
+            # y alternates in sign and grows in magnitude, so there is a new min or max on every point
+            y = i if i % 2 else -i
+            trace.append(i, y, y - 1, y + 1)
+            i += 1
+    
+    def _reader(r_nr: int):
+        last_len = 0
+        while not stop.is_set():
+            snap = trace.snapshot()
+            try:
+                assert len(snap.x) == len(snap.y) == len(snap.ylo) == len(snap.yhi) == snap.length
+                assert snap.length >= last_len
+                if snap.length > 0:
+                    n = snap.length - 1
+                    assert snap.x[n] == n
+                    assert np.array_equal(snap.ylo, snap.y - 1) and np.array_equal(snap.yhi, snap.y + 1)
+                    # min / max have to belong to exactly this length
+                    assert snap.ymin == np.min(snap.y) and snap.ymax == np.max(snap.y)
+                    assert snap.yminver + snap.ymaxver == snap.length + 1 # first point is both
+            except AssertionError as e:
+                errors.append(e)
+                return
+            last_len = snap.length
+            n_snaps[r_nr] += 1
+            time.sleep(0.001)
+    
+    threads = [threading.Thread(target=_reader, args=(r,)) for r in range(N_READERS)]
+    threads.append(threading.Thread(target=_writer))
+    for t in threads:
+        t.start()
+    time.sleep(DURATION)
+    stop.set()
+    for t in threads:
+        t.join()
+    
+    assert errors == []
+    assert all(n > 0 for n in n_snaps) and trace.length > 0
+
+def test_tracedata_consume_minmax():
+    trace = TraceData()
+    trace.append(0, 1.0)
+    assert trace.consume_minmax(trace.snapshot()) == (True, True)
+    assert trace.consume_minmax(trace.snapshot()) == (False, False)
+    
+    # an update that arrives after a snapshot was taken is not lost when the older snapshot is consumed
+    old_snap = trace.snapshot()
+    trace.append(1, 0.5)
+    assert trace.consume_minmax(old_snap) == (False, False)
+    assert trace.consume_minmax(trace.snapshot()) == (True, False)
+
+def test_graphstore_axis_minmax():
+    g_store = GraphStore()
+    g_store.add_trc_data(TraceData())
+    g_store.add_trc_data(TraceData(), yaxis="secondary")
+    g_store.add_trc_data(TraceData())
+    
+    g_store.trc_data[0].extend(np.arange(3.0), np.array([2.0, -1.0, 3.0]))
+    g_store.trc_data[1].append(0.0, 100.0)
+    g_store.trc_data[2].append(0.0, 5.0)
+    g_store.trc_data[2].append(1.0, np.nan)
+    assert np.array_equal(g_store.axis_ymin, [-1.0, 100.0]) and np.array_equal(g_store.axis_ymax, [5.0, 100.0])
 
 
 if __name__ == "__main__":
     os.system("cls" if os.name=="nt" else "clear")
     
+    test_tracedata_growth_and_views()
+    test_tracedata_old_views_survive_growth()
+    test_tracedata_extend()
+    test_tracedata_snapshot_stress()
+    test_tracedata_consume_minmax()
+    test_graphstore_axis_minmax()
+    
     # store = DataStore(
     #     graph1=GraphStore(
     #         traces=[
@@ -0,0 +1,91 @@
+import os
+import sys
+import socket
+from   pathlib import Path
+
+import numpy as np
+import pytest
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.distributed import RankCollector, per_rank_traces
+from mldashboard.plotter import DashPlotter
+from mldashboard.containers.setupconfig import TraceConfig
+
+from helpers import make_ddp_config
+
+
+WORLD_SIZE = 3
+N_STEPS    = 10
+
+def _run_rank(rank: int, world_size: int, port: int, mode: str):
+    dist.init_process_group("gloo", init_method=f"tcp://127.0.0.1:{port}", rank=rank, world_size=world_size)
+    try:
+        plotter   = DashPlotter(make_ddp_config(world_size, N_STEPS)) if rank == 0 else None
+        collector = RankCollector(plotter, every=4, mode=mode)
+
+        for step in range(N_STEPS):
+            collector.batchtimer("start")
+            if mode == "ranks":
+                collector.add_data(1, 0, step, 10*rank + step)
+                # ranks do not need to log the same things
+                if rank == 1:
+                    collector.add_data(1, 1, step, -step)
+            if mode == "spread":
+                # the last rank lags one step behind, its values come with a later gather than the ones of the others
+                if rank < world_size - 1:
+                    collector.add_data(2, 0, step, float(rank))
+                elif step > 0:
+                    collector.add_data(2, 0, step - 1, float(rank))
+            collector.batchtimer("stop", batch_size=32)
+            collector.step()
+        if (mode == "spread") and (rank == world_size - 1):
+            collector.add_data(2, 0, N_STEPS - 1, float(rank))
+        collector.flush(final=True)
+
+        # one point per call
+        with pytest.raises(ValueError):
+            collector.add_data(1, 0, N_STEPS, np.ones(3))
+
+        if rank != 0:
+            return
+        assert len(plotter._store.procs.speed) == 3 # steps 4, 8 and the final flush
+        if mode == "ranks":
+            for r in range(world_size):
+                trace = plotter._store.graph1.trc_data[r]
+                assert np.array_equal(trace.y, 10*r + np.arange(N_STEPS))
+            assert np.array_equal(plotter._store.graph1.trc_data[world_size + 1].y, -np.arange(N_STEPS))
+            assert plotter._store.graph1.trc_data[world_size].length == 0
+        if mode == "spread":
+            trace = plotter._store.graph2.trc_data[0]
+            assert np.array_equal(trace.x, np.arange(N_STEPS))
+            assert np.allclose(trace.y, (world_size - 1) / 2)
+            assert np.allclose(trace.ylo, 0) and np.allclose(trace.yhi, world_size - 1)
+    finally:
+        dist.destroy_process_group()
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_collector_ranks():
+    mp.spawn(_run_rank, args=(WORLD_SIZE, _free_port(), "ranks"), nprocs=WORLD_SIZE, join=True)
+
+def test_collector_spread():
+    mp.spawn(_run_rank, args=(WORLD_SIZE, _free_port(), "spread"), nprocs=WORLD_SIZE, join=True)
+
+def test_per_rank_traces():
+    traces = per_rank_traces(TraceConfig("loss", "rgb(255, 0, 0)", errors=True), 3)
+    assert [t.name for t in traces] == ["loss r0", "loss r1", "loss r2"]
+    assert [t.color for t in traces] == ["rgba(255, 0, 0, 1.000)", "rgba(255, 0, 0, 0.700)", "rgba(255, 0, 0, 0.400)"]
+    assert all(t.errors is True for t in traces)
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_collector_ranks()
+    test_collector_spread()
+    test_per_rank_traces()
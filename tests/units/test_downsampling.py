@@ -0,0 +1,74 @@
+import os
+import sys
+from   pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.utils.downsampling import DOWNSAMPLERS
+from mldashboard.utils.downsampling import downsample_m4
+from mldashboard.utils.downsampling import downsample_lttb
+
+
+def _run_incremental(name: str, xdown: np.ndarray, x: np.ndarray, ys: list, chunk: int):
+    """ feeds the raw data chunk by chunk, like the patch callback sees it, and collects all the output """
+    
+    chkp  = -1
+    x_out = []
+    y_out = [[] for _ in ys]
+    for n_raw in range(chunk, len(x) + chunk, chunk):
+        n_raw    = min(n_raw, len(x))
+        new_chkp = int(np.searchsorted(xdown, x[n_raw-1], side="right")) - 1
+        if new_chkp > chkp:
+            xd, yds = DOWNSAMPLERS[name](xdown, x[:n_raw], [y[:n_raw] for y in ys], chkp, new_chkp)
+            x_out.extend(xd)
+            for col, yd in zip(y_out, yds):
+                col.extend(yd)
+            chkp = new_chkp
+    return np.array(x_out), [np.array(col) for col in y_out]
+
+def test_incremental_matches_oneshot():
+    rng   = np.random.default_rng(0)
+    x     = np.sort(rng.uniform(0, 100, 5_000))
+    y     = np.cumsum(rng.normal(size=5_000))
+    xdown = np.linspace(0, 100, 200)
+    
+    for name in ["interp", "m4"]:
+        x_inc, ys_inc = _run_incremental(name, xdown, x, [y, y-1], chunk=37)
+        x_one, ys_one = _run_incremental(name, xdown, x, [y, y-1], chunk=len(x))
+        assert np.array_equal(x_inc, x_one)
+        assert np.allclose(ys_inc[0], ys_one[0]) and np.allclose(ys_inc[1], ys_one[1])
+        assert np.all(np.diff(x_inc) > 0)
+    
+    # lttb anchors depend on the chunking, but it always keeps exactly one point per non-empty bucket
+    x_inc, _ = _run_incremental("lttb", xdown, x, [y], chunk=37)
+    last_chkp = int(np.searchsorted(xdown, x[-1], side="right")) - 1 # the last bucket is still open
+    n_buckets = len(np.unique(np.searchsorted(xdown, x[x <= xdown[last_chkp]], side="left")))
+    assert len(x_inc) == n_buckets
+    assert np.all(np.diff(x_inc) > 0)
+
+def test_spikes_and_nans_survive():
+    x     = np.arange(1_000, dtype=np.float64)
+    y     = np.zeros(1_000)
+    y[123] = 50.0
+    y[456] = -50.0
+    y[789] = np.nan
+    xdown = np.linspace(0, 999, 20)
+    
+    x_m4, (y_m4,) = downsample_m4(xdown, x, [y], -1, len(xdown)-1)
+    assert 50.0 in y_m4 and -50.0 in y_m4
+    assert np.isnan(y_m4).any()
+    
+    x_lttb, (y_lttb,) = downsample_lttb(xdown, x, [y], -1, len(xdown)-1)
+    assert 50.0 in y_lttb and -50.0 in y_lttb
+    
+    # plain interpolation on the grid misses the spikes
+    _, (y_interp,) = DOWNSAMPLERS["interp"](xdown, x, [y], -1, len(xdown)-1)
+    assert np.nanmax(y_interp) < 50.0
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+    
+    test_incremental_matches_oneshot()
+    test_spikes_and_nans_survive()
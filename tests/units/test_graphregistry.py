@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import time
+from   pathlib import Path
+
+import numpy as np
+import pytest
+from   dash import no_update
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.dash.components.sessions import SessionCursors
+from mldashboard.dash.components.callbacks import callback_generate_flexgraph_patch
+from mldashboard.plotter import DashPlotter
+from mldashboard.containers.setupconfig import Config, GraphConfig, TraceConfig
+
+from helpers import make_many_graphs_config, update_graphs_body
+
+
+def test_config_registry():
+    CONFIG = make_many_graphs_config(12)
+    assert len(CONFIG) == 12 and list(CONFIG.graphs)[-1] == "graph12"
+    assert CONFIG.graph12.title == "layer 12"
+    assert Config(**CONFIG.graphs) == CONFIG
+
+    with pytest.raises(ValueError):
+        Config(graph1=CONFIG.graph1, graph3=CONFIG.graph3)
+    with pytest.raises(ValueError):
+        Config(CONFIG.graph1, graph2=CONFIG.graph2)
+    with pytest.raises(AttributeError):
+        CONFIG.graph13
+
+def test_only_changed_graphs_are_sent():
+    CONFIG  = make_many_graphs_config(12)
+    plotter = DashPlotter(CONFIG)
+    layout  = plotter._app.layout()
+    assert len(layout.children[0].children) == 12
+    session_id = [c for c in layout.children if getattr(c, "id", None) == "session-id"][0].data
+
+    client = plotter._app.server.test_client()
+    def poll(n: int) -> dict:
+        response = client.post("/_dash-update-component", json=update_graphs_body(session_id, list(CONFIG.graphs), n))
+        return response.get_json()["response"] if response.status_code == 200 else {}
+
+    card_id = lambda g_name: json.dumps({"index": g_name, "type": "graph-card"}, separators=(",", ":"))
+    
+    # a new session gets everything that is there, afterwards only the graphs with new data
+    plotter.add_batch(3, 0, np.arange(100), np.arange(100))
+    assert list(poll(1)) == [card_id("graph3")]
+    assert poll(2) == {}
+    plotter.add_batch(12, 0, np.arange(100), np.arange(100))
+    time.sleep(CONFIG.graph12.update_interval / 1e3) # graph12 was sent with the first poll
+    assert list(poll(3)) == [card_id("graph12")]
+
+def test_changed_graphs_per_session():
+    sessions = SessionCursors(make_many_graphs_config(3), cadence=False)
+    assert sessions.changed_graphs("tab a", {"graph2": 1}) == {"graph1", "graph2", "graph3"}
+    assert sessions.changed_graphs("tab a", {"graph2": 1}) == set()
+    assert sessions.changed_graphs("tab a", {"graph2": 2, "graph3": 1}) == {"graph2", "graph3"}
+    # other sessions have their own view
+    assert sessions.changed_graphs("tab b", {"graph2": 2, "graph3": 1}) == {"graph1", "graph2", "graph3"}
+
+def test_hundreds_of_traces():
+    traces  = [TraceConfig(f"layer {t_nr}", "red") for t_nr in range(300)]
+    G_CFG   = GraphConfig(title="grad norms", totalx=1_000, traces=traces, showmin="trace250", showmax="layer 12")
+    CONFIG  = Config(G_CFG)
+    plotter = DashPlotter(CONFIG)
+    assert G_CFG.trace_nr("trace250") == 250 and G_CFG.trace_nr("layer 12") == 12
+    with pytest.raises(ValueError):
+        G_CFG.trace_nr("trace300")
+
+    sessions = SessionCursors(CONFIG)
+    plotter.add_batch(1, 250, np.arange(10), -np.arange(10.0))
+    with sessions.checkout("tab", "graph1") as cursors:
+        patch = callback_generate_flexgraph_patch(G_CFG, plotter._store.graph1, cursors)
+    # only the written trace (with its endpoint and min line) is touched
+    t2id    = plotter._store.graph1.trc_t2id[250]
+    touched = {op["location"][1] for op in patch.to_plotly_json()["operations"] if op["location"][0] == "data"}
+    assert touched == {t2id.main, t2id.point, t2id.minline}
+
+    # without new data nothing is looked at, afterwards only the trace with new data
+    with sessions.checkout("tab", "graph1") as cursors:
+        assert callback_generate_flexgraph_patch(G_CFG, plotter._store.graph1, cursors) is no_update
+        assert cursors.take_pending(plotter._store.graph1) == []
+        plotter.add_data(1, 12, 0, 5.0)
+        assert cursors.take_pending(plotter._store.graph1) == [12]
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_config_registry()
+    test_only_changed_graphs_are_sent()
+    test_changed_graphs_per_session()
+    test_hundreds_of_traces()
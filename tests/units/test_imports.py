@@ -0,0 +1,51 @@
+import os
+import sys
+from   pathlib import Path
+import subprocess
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+
+
+# import time budget of mldashboard.plotter (microseconds, python -X importtime). everything heavy is imported lazily,
+# so this is mostly numpy. the eager imports (torch, dash, plotly, ...) took several seconds
+IMPORT_BUDGET_US = 750_000
+# must not be imported by logging data alone
+HEAVY_MODULES    = ["torch", "dash", "plotly", "torchinfo", "matplotlib", "h5py", "dash_bootstrap_components"]
+
+INGEST_SCRIPT = """
+import sys
+import mldashboard.plotter
+from mldashboard.containers.setupconfig import Config, GraphConfig, TraceConfig
+plotter = mldashboard.plotter.DashPlotter(Config(
+    GraphConfig(title="g1", totalx=100, traces=[TraceConfig("t0", "red", errors=True)]),
+    GraphConfig(title="g2", totalx=100, nxdown=10, traces=[TraceConfig("t0", "steelblue", ema=True)]),
+))
+plotter.batchtimer("start")
+plotter.add_data(1, 0, 0, 1.0, 0.1, 0.1)
+plotter.add_batch(2, 0, [0, 1, 2], [1.0, 2.0, 3.0])
+plotter.batchtimer("stop", batch_size=32)
+print(",".join(sorted({name.split(".")[0] for name in sys.modules})))
+"""
+
+def test_import_budget():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", INGEST_SCRIPT],
+        capture_output = True,
+        text           = True,
+        check          = True,
+        cwd            = Path(__file__).resolve().parents[2],
+    )
+    loaded = set(result.stdout.strip().split(","))
+    assert loaded.isdisjoint(HEAVY_MODULES), loaded & set(HEAVY_MODULES)
+
+    total = [
+        int(line.split("|")[1]) for line in result.stderr.splitlines()
+        if line.startswith("import time:") and line.split("|")[2].strip() == "mldashboard.plotter"
+    ][0]
+    assert total < IMPORT_BUDGET_US, f"import mldashboard.plotter took {total/1e3:.0f} ms"
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_import_budget()
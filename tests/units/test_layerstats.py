@@ -0,0 +1,107 @@
+import os
+import sys
+from   pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+from   dash import no_update
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.utils import LayerStatsTracker
+from mldashboard.containers.datastore import LayerStatsData
+from mldashboard.dash.components.callbacks import callback_generate_layer_patch
+from mldashboard.dash.dashprocess import fold_ring_records
+from mldashboard.plotter import DashPlotter
+
+from helpers import make_test_config, operations
+
+
+def _train_step(net: nn.Module, opt: torch.optim.Optimizer):
+    opt.zero_grad()
+    net(torch.randn(16, 8)).pow(2).mean().backward()
+
+def test_tracker_matches_reference():
+    torch.manual_seed(0)
+    net     = nn.Sequential(nn.Linear(8, 16), nn.ReLU(), nn.Linear(16, 1))
+    opt     = torch.optim.SGD(net.parameters(), lr=0.1)
+    tracker = LayerStatsTracker(net, every=2)
+    assert tracker.names == ["0.weight", "0.bias", "2.weight", "2.bias"]
+
+    _train_step(net, opt)
+    assert tracker.before(1) is False
+    opt.step()
+    assert tracker.after() is None
+
+    _train_step(net, opt)
+    grad_norms   = [p.grad.norm().item() for p in net.parameters()]
+    weight_norms = [p.norm().item() for p in net.parameters()]
+    assert tracker.before(2) is True
+    opt.step()
+    values = tracker.after()
+    assert tracker._before is None # the copy of the weights is only kept for the tracked step
+    assert values.dtype == np.float32 and values.shape == (3, 4)
+    assert np.allclose(values[0], grad_norms, rtol=1e-5)
+    assert np.allclose(values[1], weight_norms, rtol=1e-5)
+    # plain sgd moves every tensor by lr * its gradient
+    assert np.allclose(values[2], 0.1 * np.array(grad_norms) / np.array(weight_norms), rtol=1e-4)
+
+def test_ring_and_heatmap_patch():
+    l_store = LayerStatsData(["a", "b"], capacity=4)
+    l_store.extend(np.arange(3), np.ones((3, 3, 2), dtype=np.float32))
+
+    # a new viewer gets all columns, appended
+    patch, seen = callback_generate_layer_patch(l_store, 0)
+    assert seen == 3
+    extended = [op for op in operations(patch) if op["operation"] == "Extend"]
+    assert extended[0]["location"] == ["data", 0, "x"] and extended[0]["params"]["value"] == [0, 1, 2]
+    assert extended[1]["params"]["value"] == [[0.0, 0.0]] * 3
+    assert callback_generate_layer_patch(l_store, seen)[0] is no_update
+
+    # two more steps drop the oldest column (ring capacity 4): the whole ring is assigned once per heatmap, no deletes
+    l_store.extend(np.arange(3, 5), np.full((2, 3, 2), 10.0, dtype=np.float32))
+    patch, seen = callback_generate_layer_patch(l_store, seen)
+    assert seen == 5
+    assert [op for op in operations(patch) if op["operation"] != "Assign"] == []
+    assigned = {str(op["location"]): op["params"]["value"] for op in operations(patch)}
+    assert len(assigned) == 6 and assigned["['data', 2, 'x']"] == [1, 2, 3, 4]
+    assert assigned["['data', 1, 'z']"] == [[0.0, 0.0]] * 2 + [[1.0, 1.0]] * 2
+
+    # a viewer that fell behind by more than the ring gets the heatmaps replaced
+    l_store.extend(np.arange(5, 15), np.zeros((10, 3, 2), dtype=np.float32))
+    patch, seen = callback_generate_layer_patch(l_store, seen)
+    assigned = {str(op["location"]): op["params"]["value"] for op in operations(patch) if op["operation"] == "Assign"}
+    assert assigned["['data', 0, 'x']"] == [11, 12, 13, 14]
+    assert assigned["['data', 0, 'z']"] == [[None, None]] * 4 # log10(0)
+
+def test_plotter_tracks_layers():
+    torch.manual_seed(0)
+    net     = nn.Sequential(nn.Linear(8, 16), nn.ReLU(), nn.Linear(16, 1))
+    opt     = torch.optim.Adam(net.parameters(), lr=1e-3)
+    plotter = DashPlotter(make_test_config(), model=net, layer_stats=3)
+    assert "layer-heatmap" in str(plotter._app.layout())
+
+    for step in range(10):
+        _train_step(net, opt)
+        with plotter.track_layers(step):
+            opt.step()
+    assert plotter._store.layers.count == 4
+    _, steps, values = plotter._store.layers.read(0)
+    assert np.array_equal(steps, [0, 3, 6, 9]) and np.all(values > 0)
+
+    # out of process, the steps arrive as one ring record per layer
+    dashboard = DashPlotter(make_test_config())
+    dashboard._store.layers = LayerStatsData(plotter._store.layers.names)
+    records = np.column_stack([
+        np.full(4, -1.0), np.arange(4.0), np.full(4, 9.0), values[-1].T.astype(np.float64)
+    ])
+    fold_ring_records(dashboard, records)
+    assert np.array_equal(dashboard._store.layers.read(0)[2][0], values[-1])
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_tracker_matches_reference()
+    test_ring_and_heatmap_patch()
+    test_plotter_tracks_layers()
@@ -0,0 +1,91 @@
+import os
+import sys
+from   pathlib import Path
+
+import torch
+import torch.nn as nn
+import torchinfo
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.utils import modelsummary as modelsummary_module
+from mldashboard.utils.modelsummary import model_summary, architecture_key, summary_cache_dir
+from mldashboard.plotter import DashPlotter
+
+from helpers import make_test_config
+
+
+class _Net(nn.Module):
+    def __init__(self, n_hidden: int = 8):
+        super().__init__()
+        self.lin1 = nn.Linear(4, n_hidden)
+        self.lin2 = nn.Linear(n_hidden, 1)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.lin2(self.lin1(x).relu())
+
+class _BranchyNet(nn.Module):
+    """ data dependent control flow, does not run on the meta device """
+
+    def __init__(self):
+        super().__init__()
+        self.lin = nn.Linear(4, 1)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.lin(x) if x.sum() > 0 else -self.lin(x)
+
+class _BrokenNet(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.lin = nn.Linear(4, 1)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        raise RuntimeError("broken forward")
+
+def _live_summary(net: nn.Module, x: torch.Tensor) -> str:
+    return str(torchinfo.summary(net, input_data=x, col_names=["num_params"], col_width=12, verbose=False))
+
+def test_architecture_key():
+    x   = torch.randn(16, 4)
+    key = architecture_key(_Net(), x)
+    # only the architecture and the input shapes count, not the values
+    assert architecture_key(_Net(), torch.zeros(16, 4)) == key
+    assert architecture_key(_Net(n_hidden=16), x) != key
+    assert architecture_key(_Net(), torch.randn(32, 4)) != key
+    assert architecture_key(_Net(), [{"x": x}]) == architecture_key(_Net(), [{"x": x.clone()}])
+
+def test_summary_cached(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    net, x  = _Net(), torch.randn(16, 4)
+    plotter = DashPlotter(make_test_config(), model=net, input_data=x)
+    # same summary as torchinfo on the model itself, computed on a meta copy of it
+    assert plotter._store.msummary == _live_summary(net, x)
+    assert (summary_cache_dir() / f"{architecture_key(net, x)}.txt").is_file()
+
+    # the same architecture again comes from the cache, without a forward pass
+    monkeypatch.setattr(modelsummary_module, "_summarize", lambda *args: "not from the cache")
+    again = DashPlotter(make_test_config(), model=_Net(), input_data=torch.randn(16, 4))
+    assert again._store.msummary == plotter._store.msummary
+
+def test_summary_fallback(tmp_path):
+    x = torch.ones(16, 4)
+    # can not be hashed (uninitialized parameters), copied (weight_norm) or run (control flow) on the meta device, the
+    # live model is summarized instead
+    for make_net in [lambda: nn.LazyLinear(1), lambda: nn.utils.weight_norm(nn.Linear(4, 1)), _BranchyNet]:
+        text = model_summary(make_net(), x, cache_dir=tmp_path)
+        assert text == _live_summary(make_net(), x)
+
+    # fails on the live model too, shown instead of the summary and not cached
+    net  = _BrokenNet()
+    text = model_summary(net, x, cache_dir=tmp_path)
+    assert text.startswith("no model summary available (RuntimeError")
+    assert not (tmp_path / f"{architecture_key(net, x)}.txt").is_file()
+
+
+if __name__ == "__main__":
+    import tempfile
+    import pytest
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_architecture_key()
+    test_summary_cached(Path(tempfile.mkdtemp()), pytest.MonkeyPatch())
+    test_summary_fallback(Path(tempfile.mkdtemp()))
@@ -0,0 +1,88 @@
+import os
+import sys
+from   pathlib import Path
+
+import dataclasses
+
+import numpy as np
+import pytest
+import torch
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.plotter import DashPlotter
+from mldashboard.containers.setupconfig import Config
+from mldashboard.utils import adjust_alpha, plotly_color
+
+from helpers import make_test_config
+
+
+def test_add_batch():
+    plotter = DashPlotter(make_test_config())
+    
+    x = np.arange(10)
+    y = torch.linspace(0, 1, 10, dtype=torch.float32)
+    plotter.add_batch(1, 0, x, y, yerrLo=0.1, yerrHi=torch.full((10,), 0.2))
+    plotter.add_batch(1, 0, 10, 5.0) # scalars work too
+    
+    trace = plotter._store.graph1.trc_data[0]
+    assert trace.length == 11
+    assert np.array_equal(trace.x, np.arange(11))
+    assert np.allclose(trace.ylo[:10], y.numpy() - 0.1)
+    assert np.allclose(trace.yhi[:10], y.numpy() + 0.2)
+    assert (trace.ymin, trace.ymax) == (0.0, 5.0)
+
+def test_add_many_matches_add_data():
+    batched = DashPlotter(make_test_config())
+    single  = DashPlotter(make_test_config())
+    
+    x  = np.arange(50, dtype=np.float64)
+    y1 = torch.randn(50)
+    y2 = torch.randn(50, dtype=torch.float64)
+    y3 = torch.randint(0, 100, (50,))
+    
+    batched.add_many({
+        (1, 1): (x, y1),
+        (2, 0): (x, y2),
+        (3, 0): (torch.from_numpy(x), y3),
+        (1, 0): (x, y1, y1.abs(), y2.abs()),
+    })
+    for i in range(50):
+        single.add_data(1, 1, x[i], y1[i])
+        single.add_data(2, 0, x[i], y2[i])
+        single.add_data(3, 0, x[i], y3[i])
+        single.add_data(1, 0, x[i], y1[i], y1[i].abs(), y2[i].abs())
+    
+    for g_nr, t_nr in [(1, 0), (1, 1), (2, 0), (3, 0)]:
+        trc_b = getattr(batched._store, f"graph{g_nr}").trc_data[t_nr]
+        trc_s = getattr(single._store, f"graph{g_nr}").trc_data[t_nr]
+        assert np.array_equal(trc_b.x, trc_s.x)
+        assert np.allclose(trc_b.y, trc_s.y)
+        assert (trc_b.ymin, trc_b.ymax) == (trc_s.ymin, trc_s.ymax)
+        if trc_s.ylo is not None:
+            assert np.allclose(trc_b.ylo, trc_s.ylo) and np.allclose(trc_b.yhi, trc_s.yhi)
+
+def test_trace_colors():
+    # the color forms matplotlib understood before (without the single letter and gray level shorthands)
+    assert adjust_alpha("#fff", 0.5)      == "rgba(255, 255, 255, 0.500)"
+    assert adjust_alpha("#f008", 1.0)     == "rgba(255, 0, 0, 0.533)"
+    assert adjust_alpha("#ff000080", 1.0) == "rgba(255, 0, 0, 0.502)"
+    assert adjust_alpha("Tomato", 1.0)    == "rgba(255, 99, 71, 1.000)"
+    assert adjust_alpha("tab:blue", 1.0)  == adjust_alpha("C0", 1.0) == "rgba(31, 119, 180, 1.000)"
+    assert adjust_alpha("C9", 1.0)        == "rgba(23, 190, 207, 1.000)"
+    # plotly does not know the tableau palette
+    assert plotly_color("tab:orange") == "rgb(255, 127, 14)"
+    assert plotly_color("#fff")       == "#fff"
+
+    # a color that can not be drawn is an error when the plotter is set up
+    CONFIG = make_test_config()
+    G_CFG  = dataclasses.replace(CONFIG.graph1, traces=[dataclasses.replace(CONFIG.graph1.traces[0], color="tab:foo")])
+    with pytest.raises(ValueError):
+        DashPlotter(Config(G_CFG, CONFIG.graph2, CONFIG.graph3))
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+    
+    test_add_batch()
+    test_add_many_matches_add_data()
+    test_trace_colors()
@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import threading
+import time
+from   pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.containers.updatesignal import UpdateSignal
+from mldashboard.dash.components.push import stream_updates, PUSH_ROUTE
+from mldashboard.plotter import DashPlotter
+
+from helpers import make_test_config
+
+
+def _parse(message: str) -> dict:
+    assert message.startswith("data: ") and message.endswith("\n\n")
+    return json.loads(message[len("data: "):])
+
+def test_stream_coalesces_per_frame():
+    signal = UpdateSignal()
+    stream = stream_updates(signal, frame_interval=0.05, keepalive=0.2)
+
+    # everything published before / during one frame ends up in one event, with the latest versions
+    for _ in range(100):
+        signal.publish("graph1")
+    signal.publish("procs")
+    assert _parse(next(stream)) == {"graph1": 100, "procs": 1}
+
+    # publishing from another thread wakes the stream up, only changed topics are sent
+    threading.Timer(0.05, signal.publish, args=("graph2",)).start()
+    t0 = time.perf_counter()
+    assert _parse(next(stream)) == {"graph2": 1}
+    assert time.perf_counter() - t0 < 0.5
+
+    # idle: only keepalive comments
+    assert next(stream) == ": keepalive\n\n"
+
+    # closing the stream (client disconnect) unsubscribes
+    assert len(signal._subscribers) == 1
+    stream.close()
+    assert len(signal._subscribers) == 0
+
+def test_plotter_publishes():
+    plotter = DashPlotter(make_test_config(), push_updates=True)
+    signal  = plotter._store.signal
+
+    plotter.add_data(1, 0, 0, 1.0)
+    plotter.add_batch(2, 1, np.arange(10), np.arange(10))
+    plotter.add_many({(2, 0): (np.arange(3), np.arange(3)), (3, 0): (0, 0)})
+    plotter.batchtimer("start")
+    plotter.batchtimer("stop", batch_size=8)
+    assert signal.snapshot() == {"graph1": 1, "graph2": 2, "graph3": 1, "procs": 1}
+
+def test_push_app_layout():
+    plotter = DashPlotter(make_test_config(), push_updates=True)
+    assert PUSH_ROUTE in [rule.rule for rule in plotter._app.server.url_map.iter_rules()]
+    assert "ud-interval-graphs" not in str(plotter._app.layout())
+
+    # polling stays the default
+    plotter = DashPlotter(make_test_config())
+    assert PUSH_ROUTE not in [rule.rule for rule in plotter._app.server.url_map.iter_rules()]
+    assert "ud-interval-graphs" in str(plotter._app.layout())
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_stream_coalesces_per_frame()
+    test_plotter_publishes()
+    test_push_app_layout()
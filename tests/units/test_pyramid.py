@@ -0,0 +1,93 @@
+import os
+import sys
+from   pathlib import Path
+
+import numpy as np
+from   dash import no_update
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.containers.pyramid import TracePyramid
+from mldashboard.containers.pyramid import PYRAMID_FANOUT
+from mldashboard.dash.components.callbacks import callback_generate_lod_patch
+from mldashboard.plotter import DashPlotter
+from mldashboard.containers.setupconfig import Config, GraphConfig, TraceConfig
+from mldashboard.containers.datastore import TraceCursor
+
+
+def test_pyramid_envelope_and_size():
+    rng = np.random.default_rng(0)
+    n   = 1_000_003
+    x   = np.arange(n, dtype=np.float64)
+    y   = np.cumsum(rng.normal(size=n))
+    y[777_777] = 1e6
+    y[12_345]  = np.nan
+    
+    pyramid = TracePyramid()
+    for stop in [10, 1_000, 500_000, n]: # built incrementally
+        pyramid.update(x[:stop], y[:stop])
+    
+    for i_start, i_stop, npix in [(0, n, 1_000), (123, 777_900, 500), (500_000, 500_100, 1_000), (5, 6, 10)]:
+        xs, ys = pyramid.query(x, y, i_start, i_stop, npix)
+        assert np.nanmax(ys) == np.nanmax(y[i_start:i_stop])
+        assert np.nanmin(ys) == np.nanmin(y[i_start:i_stop])
+        assert np.all(np.diff(xs) >= 0) and xs[0] >= i_start and xs[-1] < i_stop
+        # O(npix): 2 points per block plus a few finer blocks at both ends of the range
+        assert len(xs) <= 2 * (npix + 2 * PYRAMID_FANOUT * len(pyramid.levels))
+    
+    # a short range is served raw
+    xs, ys = pyramid.query(x, y, 100, 110, 1_000)
+    assert np.array_equal(xs, x[100:110])
+
+def test_pyramid_incremental_matches_oneshot():
+    rng = np.random.default_rng(1)
+    x   = np.arange(10_000, dtype=np.float64)
+    y   = rng.normal(size=10_000)
+    
+    incremental, oneshot = TracePyramid(), TracePyramid()
+    for stop in range(0, 10_001, 333):
+        incremental.update(x[:stop], y[:stop])
+    incremental.update(x, y)
+    oneshot.update(x, y)
+    
+    assert len(incremental.levels) == len(oneshot.levels)
+    for lvl_inc, lvl_one in zip(incremental.levels, oneshot.levels):
+        assert lvl_inc.length == lvl_one.length
+        for name in lvl_inc.COLUMNS:
+            assert np.array_equal(lvl_inc.view(name, 0, lvl_inc.length), lvl_one.view(name, 0, lvl_one.length))
+
+def test_lod_callback():
+    G_CFG = GraphConfig(
+        title  = "lod",
+        totalx = 100_000,
+        nxdown = 1_000,
+        lod    = 200,
+        traces = [TraceConfig("t0", "red", errors=True), TraceConfig("t1", "green")],
+    )
+    plotter = DashPlotter(Config(G_CFG, G_CFG, G_CFG))
+    x = np.arange(50_000)
+    plotter.add_batch(1, 0, x, np.sin(x / 1000), 0.1, 0.1)
+    plotter.add_batch(1, 1, x, np.cos(x / 1000))
+    
+    # events without x range change are ignored
+    cursors = [TraceCursor(), TraceCursor()]
+    assert callback_generate_lod_patch(G_CFG, plotter._store.graph1, {"autosize": True}, cursors) is no_update
+    assert [cursor.chkp for cursor in cursors] == [-1, -1]
+    
+    patch = callback_generate_lod_patch(
+        G_CFG, plotter._store.graph1, {"xaxis.range[0]": 10_000, "xaxis.range[1]": 12_000}, cursors
+    )
+    ops = patch.to_plotly_json()["operations"]
+    # last grid point covered by raw data, same as the regular callback
+    assert [cursor.chkp for cursor in cursors] == [499, 499]
+    served_x = [op["params"]["value"] for op in ops if op["location"][-1] == "x"]
+    assert len(served_x) == 4 # main + lo + hi, main
+    assert all(len(xs) < 2_000 for xs in served_x)
+    assert max(served_x[0]) <= plotter._store.graph1.trc_data[0].xdown[499]
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+    
+    test_pyramid_envelope_and_size()
+    test_pyramid_incremental_matches_oneshot()
+    test_lod_callback()
@@ -0,0 +1,126 @@
+import os
+import sys
+import subprocess
+from   pathlib import Path
+
+import h5py
+import numpy as np
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.containers.runlog import LOG_CHUNK, RunLogWriter, load_run_log
+from mldashboard.dash.components.callbacks import callback_generate_flexgraph_patch
+from mldashboard.dash.components.sessions import SessionCursors
+from mldashboard.plotter import DashPlotter
+
+from helpers import make_test_config
+
+
+# a training process that writes its log (flushed every 10 ms, so that the columns grow while the log is read)
+WRITER_SCRIPT = """
+import sys, time
+import numpy as np
+from mldashboard.containers.runlog import RunLogWriter
+sys.path.insert(0, "tests/units")
+from helpers import make_test_config
+writer = RunLogWriter(sys.argv[1], make_test_config(), flush_interval=0.01)
+print("ready", flush=True)
+for i in range(0, 300_000, 300):
+    x = np.arange(i, i + 300, dtype=np.float64)
+    writer.put(1, 0, x, -x, -x - 1, -x + 1)
+    writer.put(2, 0, x, 2 * x)
+    time.sleep(0.001)
+writer.close()
+"""
+
+def test_log_write_and_grow(tmp_path):
+    path   = str(tmp_path / "run.h5")
+    writer = RunLogWriter(path, make_test_config(), flush_interval=60.0)
+    try:
+        writer.put(1, 0, 0.0, 1.0, 0.5, 1.5)
+        writer.put(1, 0, np.arange(1.0, 5.0), np.arange(1.0, 5.0)) # no errorband values
+        writer.flush()
+
+        # readable while the run is still going, only up to the published length
+        _, traces = load_run_log(path)
+        cols, ymin, ymax = traces[(1, 0)]
+        assert np.array_equal(cols["x"], np.arange(5.0))
+        assert np.array_equal(cols["ylo"], [0.5, 1, 2, 3, 4]) and np.array_equal(cols["yhi"], [1.5, 1, 2, 3, 4])
+        assert (ymin, ymax) == (1.0, 4.0)
+        assert traces[(1, 1)][0]["ylo"] is None and len(traces[(1, 1)][0]["x"]) == 0
+
+        # more than the points of the graph (totalx), the columns just grow
+        writer.put(2, 0, np.arange(25_000.0), np.sin(np.arange(25_000.0)))
+        writer.flush()
+        tail = load_run_log(path, since={(2, 0): 24_990})[1][(2, 0)][0]["x"]
+        assert np.array_equal(tail, np.arange(24_990.0, 25_000))
+        with h5py.File(path, "r", swmr=True) as file:
+            assert file["graph2/trace0/y"].chunks == (LOG_CHUNK,)
+    finally:
+        writer.close()
+
+    # the finished log has contiguous columns, which are memory-mapped, and nothing that was left behind
+    CONFIG, traces = load_run_log(path)
+    assert CONFIG == make_test_config()
+    assert np.array_equal(traces[(2, 0)][0]["y"], np.sin(np.arange(25_000.0)))
+    assert isinstance(traces[(2, 0)][0]["y"], np.memmap)
+    assert traces[(2, 0)][1:] == (float(np.sin(np.arange(25_000.0)).min()), float(np.sin(np.arange(25_000.0)).max()))
+    assert os.path.getsize(path) < 8 * (2 * 25_000 + 4 * 5) + 100_000
+
+def test_read_while_growing(tmp_path):
+    path   = str(tmp_path / "run.h5")
+    writer = subprocess.Popen(
+        [sys.executable, "-c", WRITER_SCRIPT, path],
+        stdout = subprocess.PIPE,
+        text   = True,
+        cwd    = Path(__file__).resolve().parents[2],
+    )
+    assert writer.stdout.readline() == "ready\n"
+
+    # every snapshot only shows complete flushes, also while the columns grow
+    n_snapshots, last_length = 0, 0
+    while writer.poll() is None:
+        _, traces = load_run_log(path)
+        cols, n   = traces[(1, 0)][0], len(traces[(1, 0)][0]["x"])
+        assert np.array_equal(cols["x"], np.arange(n)) and np.array_equal(cols["y"], -cols["x"])
+        assert np.array_equal(cols["ylo"], -cols["x"] - 1) and np.array_equal(cols["yhi"], -cols["x"] + 1)
+        assert np.array_equal(traces[(2, 0)][0]["y"], 2 * traces[(2, 0)][0]["x"])
+        assert n >= last_length
+        n_snapshots, last_length = n_snapshots + 1, n
+    assert writer.returncode == 0 and n_snapshots > 10
+    assert len(load_run_log(path)[1][(1, 0)][0]["x"]) == 300_000
+
+def test_replay_matches_live_run(tmp_path):
+    path = str(tmp_path / "run.h5")
+    live = DashPlotter(make_test_config(), log_path=path)
+    for i in range(50):
+        live.add_data(1, 0, i, np.cos(i), 0.1, 0.2)
+        live.add_data(1, 1, i, i)
+    live.add_batch(2, 0, np.arange(20_000), np.sqrt(np.arange(20_000)))
+    live.flush()
+
+    replay = DashPlotter.from_log(path)
+    for g_nr, t_nr in [(1, 0), (1, 1), (2, 0), (2, 1), (3, 0)]:
+        expected = getattr(live._store, f"graph{g_nr}").trc_data[t_nr]
+        actual   = getattr(replay._store, f"graph{g_nr}").trc_data[t_nr]
+        for column in ["x", "y", "ylo", "yhi"]:
+            assert np.array_equal(getattr(actual, column), getattr(expected, column))
+        assert (actual.ymin, actual.ymax) == (expected.ymin, expected.ymax)
+
+    # the dashboard downsamples straight from the memory maps (built on first use, registers the plotly ids)
+    replay._app
+    G_CFG    = replay._CONFIG.graph2
+    sessions = SessionCursors(replay._CONFIG)
+    with sessions.checkout("tab", "graph2") as cursors:
+        patch = callback_generate_flexgraph_patch(G_CFG, replay._store.graph2, cursors)
+    extended = {str(op["location"]): op["params"]["value"]
+                for op in patch.to_plotly_json()["operations"] if op["operation"] == "Extend"}
+    assert len(extended["['data', 0, 'x']"]) == G_CFG.nxdown
+
+
+if __name__ == "__main__":
+    import tempfile
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_log_write_and_grow(Path(tempfile.mkdtemp()))
+    test_read_while_growing(Path(tempfile.mkdtemp()))
+    test_replay_matches_live_run(Path(tempfile.mkdtemp()))
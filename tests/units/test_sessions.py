@@ -0,0 +1,180 @@
+import os
+import sys
+import dataclasses
+from   pathlib import Path
+from   types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.dash.components import sessions as sessions_module
+from mldashboard.dash.components.sessions import SessionCursors, SegmentCache, BACKOFF_PATIENCE, BACKOFF_MAX_INTERVAL
+from mldashboard.dash.components.callbacks import callback_generate_flexgraph_patch
+from mldashboard.utils.downsampling import DOWNSAMPLERS
+from mldashboard.plotter import DashPlotter
+from mldashboard.containers.setupconfig import Config
+
+from helpers import make_test_config
+
+
+def _extended_lengths(patch) -> dict:
+    return {str(op["location"]): len(op["params"]["value"])
+            for op in patch.to_plotly_json()["operations"] if op["operation"] == "Extend"}
+
+def _assigned_locations(patch) -> set:
+    return {str(op["location"]) for op in patch.to_plotly_json()["operations"] if op["operation"] == "Assign"}
+
+def test_sessions_are_independent():
+    CONFIG   = make_test_config()
+    G_CFG    = dataclasses.replace(CONFIG.graph1, showmin="trace0")
+    plotter  = DashPlotter(Config(G_CFG, CONFIG.graph2, CONFIG.graph3))
+    plotter._app # the app is built on first use, its figures register the plotly ids of the traces
+    sessions = SessionCursors(plotter._CONFIG)
+    plotter.add_batch(1, 0, np.arange(100), -np.arange(100))
+
+    # the first tab consuming the data (and the new minimum) must not take it away from the second tab
+    patches = {}
+    for session_id in ["tab A", "tab B"]:
+        with sessions.checkout(session_id, "graph1") as cursors:
+            patches[session_id] = callback_generate_flexgraph_patch(G_CFG, plotter._store.graph1, cursors)
+            assert cursors[0].chkp == 99
+    assert _extended_lengths(patches["tab A"]) == _extended_lengths(patches["tab B"])
+    assert "['layout', 'annotations', 0, 'text']" in _assigned_locations(patches["tab B"])
+
+    # each session only gets what is new for itself
+    plotter.add_batch(1, 0, np.arange(100, 110), np.zeros(10))
+    with sessions.checkout("tab A", "graph1") as cursors:
+        patch = callback_generate_flexgraph_patch(G_CFG, plotter._store.graph1, cursors)
+    assert _extended_lengths(patch)["['data', 0, 'x']"] == 10
+    with sessions.checkout("tab C", "graph1") as cursors:
+        patch = callback_generate_flexgraph_patch(G_CFG, plotter._store.graph1, cursors)
+    assert _extended_lengths(patch)["['data', 0, 'x']"] == 110
+    assert len(sessions) == 3
+
+def test_range_patch_only_when_it_moves():
+    plotter  = DashPlotter(make_test_config())
+    plotter._app # the app is built on first use, its figures register the plotly ids of the traces
+    sessions = SessionCursors(plotter._CONFIG)
+    ranges   = {f"['layout', '{axis}', 'autorangeoptions', '{bound}allowed']" for axis in ["yaxis", "yaxis2"]
+                for bound in ["min", "max"]}
+    
+    def update(g_name: str) -> set:
+        with sessions.checkout("tab", g_name) as cursors:
+            G_CFG = plotter._CONFIG.graphs[g_name]
+            return _assigned_locations(callback_generate_flexgraph_patch(G_CFG, plotter._store.graphs[g_name], cursors))
+    
+    plotter.add_batch(1, 0, np.arange(10), np.arange(10.0))
+    plotter.add_data(1, 1, 0, -2.0)
+    assert ranges <= update("graph1")
+    # a new max that hardly moves the range, the figure keeps its range
+    plotter.add_data(1, 0, 10, 9.05)
+    assert ranges.isdisjoint(update("graph1"))
+    plotter.add_data(1, 0, 11, 20.0)
+    assert ranges <= update("graph1")
+    
+    # data outside of the range that was sent is never left out, even if the range moves less than the tolerance
+    plotter.add_batch(3, 0, np.arange(10), np.linspace(0, 100, 10)) # range [-10, 110]
+    update("graph3")
+    plotter.add_data(3, 0, 10, -10.5)
+    assert "['layout', 'yaxis', 'autorangeoptions', 'minallowed']" in update("graph3")
+
+def test_sessions_expire():
+    sessions = SessionCursors(make_test_config(), timeout=0.0)
+    with sessions.checkout("tab A", "graph2") as cursors:
+        cursors[0].chkp = 10
+    with sessions.checkout("tab B", "graph2") as cursors:
+        pass
+    assert len(sessions) == 1
+    with sessions.checkout("tab A", "graph2") as cursors:
+        assert cursors[0].chkp == -1
+
+def test_cadence_and_backoff(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(sessions_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    CONFIG   = make_test_config()
+    CONFIG   = Config(dataclasses.replace(CONFIG.graph1, update_interval=200), CONFIG.graph2, CONFIG.graph3)
+    sessions = SessionCursors(CONFIG)
+    assert sessions.base_interval == 200
+    
+    # graph1 is due every 0.2 s, the others every 0.5 s. held back graphs come with a later poll
+    assert sessions.changed_graphs("tab", {}) == {"graph1", "graph2", "graph3"}
+    clock[0] = 0.2
+    assert sessions.changed_graphs("tab", {"graph1": 1, "graph2": 1}) == {"graph1"}
+    clock[0] = 0.4
+    assert sessions.changed_graphs("tab", {"graph1": 1, "graph2": 1}) == set()
+    clock[0] = 0.6
+    assert sessions.changed_graphs("tab", {"graph1": 1, "graph2": 1}) == {"graph2"}
+    assert sessions.poll_interval("tab") is None
+    
+    # without new data the polling interval backs off, and is back at the fastest graph as soon as there is some
+    intervals = []
+    for _ in range(8 * BACKOFF_PATIENCE):
+        clock[0] += 10.0
+        assert sessions.changed_graphs("tab", {"graph1": 1, "graph2": 1, "procs": clock[0]}) == set()
+        intervals.append(sessions.poll_interval("tab"))
+    assert [i for i in intervals if i is not None] == [400, 800, 1_600, 3_200, 6_400, BACKOFF_MAX_INTERVAL]
+    assert sessions.changed_graphs("tab", {"graph1": 1, "graph2": 1, "layers": 1}) == set()
+    assert sessions.poll_interval("tab") == 200
+
+def test_segment_cache_shared():
+    CONFIG    = make_test_config()
+    G_CFG     = dataclasses.replace(CONFIG.graph2, downsampling="m4")
+    plotter   = DashPlotter(Config(CONFIG.graph1, G_CFG, CONFIG.graph3))
+    sessions  = SessionCursors(plotter._CONFIG)
+    seg_cache = SegmentCache()
+    plotter.add_batch(2, 0, np.arange(5_000), np.sin(np.arange(5_000)))
+    plotter.add_batch(2, 1, np.arange(5_000), np.cos(np.arange(5_000)))
+
+    patches = []
+    for session_id in ["tab A", "tab B", "tab C"]:
+        with sessions.checkout(session_id, "graph2") as cursors:
+            patches.append(callback_generate_flexgraph_patch(G_CFG, plotter._store.graph2, cursors, seg_cache))
+    # downsampled once per trace, the other sessions are served from the cache
+    assert (seg_cache.misses, seg_cache.hits) == (2, 4)
+    assert patches[0].to_plotly_json() == patches[2].to_plotly_json()
+
+def test_segment_cache_lttb_anchor():
+    CONFIG    = make_test_config()
+    G_CFG     = dataclasses.replace(CONFIG.graph2, downsampling="lttb")
+    plotter   = DashPlotter(Config(CONFIG.graph1, G_CFG, CONFIG.graph3))
+    plotter._app # the app is built on first use, its figures register the plotly ids of the traces
+    sessions  = SessionCursors(plotter._CONFIG)
+    seg_cache = SegmentCache()
+    trace     = plotter._store.graph2.trc_data[0]
+    main_id   = plotter._store.graph2.trc_t2id[0].main
+
+    def main_y(session_id: str) -> list:
+        with sessions.checkout(session_id, "graph2") as cursors:
+            patch = callback_generate_flexgraph_patch(G_CFG, plotter._store.graph2, cursors, seg_cache)
+        ops = patch.to_plotly_json()["operations"]
+        return [op["params"]["value"] for op in ops if op["location"] == ["data", main_id, "y"]][0]
+
+    plotter.add_batch(2, 0, np.arange(5_000), np.sin(np.arange(5_000)))
+    main_y("tab A")
+    # a spike in the incomplete bucket after the checkpoint moves the right anchor of the last bucket, not the checkpoint
+    plotter.add_batch(2, 0, np.arange(5_000, 5_010), np.full(10, 100.0))
+    new_chkp    = int(np.searchsorted(trace.xdown, 4_999, side="right")) - 1
+    _, expected = DOWNSAMPLERS["lttb"](trace.xdown, trace.x, [trace.y], -1, new_chkp)
+    assert main_y("tab B") == list(expected[0])
+    assert (seg_cache.misses, seg_cache.hits) == (2, 0)
+
+def test_segment_cache_lru():
+    seg_cache = SegmentCache(maxsize=2)
+    for key in [(0, -1, 1), (0, 1, 2), (0, -1, 1), (0, 2, 3)]:
+        seg_cache.get(key, lambda: key)
+    # (0, 1, 2) was the least recently used one
+    assert seg_cache.get((0, -1, 1), lambda: None) == (0, -1, 1)
+    assert seg_cache.get((0, 1, 2), lambda: None) is None
+
+
+if __name__ == "__main__":
+    import pytest
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_sessions_are_independent()
+    test_range_patch_only_when_it_moves()
+    test_sessions_expire()
+    test_cadence_and_backoff(pytest.MonkeyPatch())
+    test_segment_cache_shared()
+    test_segment_cache_lttb_anchor()
+    test_segment_cache_lru()
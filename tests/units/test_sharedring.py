@@ -0,0 +1,198 @@
+import os
+import sys
+import contextlib
+import io
+import json
+import multiprocessing
+import socket
+import time
+import urllib.request
+from   pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.containers.sharedring import SharedRingBuffer
+from mldashboard.dash import dashprocess
+from mldashboard.dash.dashprocess import fold_ring_records, drain_ring
+from mldashboard.plotter import DashPlotter
+
+from helpers import make_test_config, dash_id, update_graphs_body
+
+
+def _read_in_child(ring_name: str, queue):
+    ring = SharedRingBuffer(name=ring_name)
+    queue.put(ring.read())
+    ring.close()
+
+def _write_in_child(ring_name: str, n_batches: int, batch_size: int):
+    ring = SharedRingBuffer(name=ring_name)
+    for i in range(0, n_batches * batch_size, batch_size):
+        x = np.arange(i, i + batch_size, dtype=np.float64)
+        ring.extend(1, 0, x, 2 * x)
+    ring.close()
+
+def test_ring_wraparound_and_drops():
+    ring = SharedRingBuffer(capacity=8)
+    try:
+        ring.extend(1, 0, np.arange(5.0), np.arange(5.0))
+        assert np.array_equal(ring.read()[:, 2], np.arange(5.0))
+
+        # wraps around the end of the buffer
+        ring.extend(1, 1, np.arange(5.0, 11.0), np.zeros(6), np.zeros(6), np.ones(6))
+        ring.append(2, 0, 11.0, 1.0)
+        records = ring.read()
+        assert np.array_equal(records[:, 2], np.arange(5.0, 12.0))
+        assert np.array_equal(records[:, 0], [1]*6 + [2])
+        assert np.isnan(records[-1, 4]) and records[0, 5] == 1.0
+        assert ring.dropped == 0
+
+        # the reader fell behind by more than the capacity, only the newest records are left
+        ring.extend(3, 0, np.arange(20.0), np.arange(20.0))
+        assert np.array_equal(ring.read()[:, 2], np.arange(12.0, 20.0))
+        assert ring.dropped == 12
+        assert len(ring.read()) == 0
+    finally:
+        ring.close()
+
+def test_ring_across_processes():
+    ring = SharedRingBuffer(capacity=1_000)
+    try:
+        ring.extend(1, 0, np.arange(500.0), np.sin(np.arange(500.0)))
+        ctx   = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        child = ctx.Process(target=_read_in_child, args=(ring.name, queue))
+        child.start()
+        records = queue.get(timeout=60)
+        child.join()
+        assert np.array_equal(records[:, 3], np.sin(np.arange(500.0)))
+    finally:
+        ring.close()
+
+def test_ring_never_returns_overwritten_records():
+    # batches almost as large as the ring, so that the writer is overwriting records in nearly every read
+    ring = SharedRingBuffer(capacity=4096)
+    try:
+        ctx   = multiprocessing.get_context("spawn")
+        child = ctx.Process(target=_write_in_child, args=(ring.name, 3000, 3000))
+        child.start()
+
+        n_records, expected_x = 0, 0.0
+        while child.is_alive() or (ring._header[0] > ring._n_read):
+            dropped = ring.dropped
+            records = ring.read()
+            # whatever was dropped, the rest is contiguous and every record is complete
+            expected_x += ring.dropped - dropped
+            assert np.array_equal(records[:, 2], np.arange(expected_x, expected_x + len(records)))
+            assert np.array_equal(records[:, 3], 2 * records[:, 2])
+            expected_x += len(records)
+            n_records  += len(records)
+        child.join()
+        assert expected_x == 3000 * 3000 and n_records > 0
+    finally:
+        ring.close()
+
+def test_fold_matches_in_process():
+    inproc = DashPlotter(make_test_config())
+    outproc = DashPlotter(make_test_config(), out_of_process=True)
+    viewer  = DashPlotter(make_test_config()) # stands in for the store of the dashboard process
+    try:
+        for plotter in [inproc, outproc]:
+            for i in range(10):
+                plotter.add_data(1, 0, i, i**2, 0.5, 0.5)
+                plotter.add_data(2, 1, i, -i)
+            plotter.add_batch(1, 1, np.arange(10, 20), np.arange(10))
+            plotter.add_many({(3, 0): (np.arange(3), np.ones(3)), (1, 0): (np.arange(10, 12), np.zeros(2))})
+            plotter.batchtimer("start")
+            plotter.batchtimer("stop", batch_size=16)
+
+        # out of process, nothing lands in the local store
+        assert outproc._store.graph1.trc_data[0].length == 0
+        fold_ring_records(viewer, outproc._ring.read())
+
+        for g_nr, t_nr in [(1, 0), (1, 1), (2, 1), (3, 0)]:
+            expected = getattr(inproc._store, f"graph{g_nr}").trc_data[t_nr]
+            actual   = getattr(viewer._store, f"graph{g_nr}").trc_data[t_nr]
+            for column in ["x", "y", "ylo", "yhi"]:
+                assert np.array_equal(getattr(actual, column), getattr(expected, column))
+        assert len(viewer._store.procs.speed) == 1
+        assert viewer._store.signal.snapshot()["graph1"] == 2 # one vectorized fold per trace
+    finally:
+        outproc._ring.close()
+
+def test_drain_survives_bad_batch(monkeypatch):
+    outproc = DashPlotter(make_test_config(), out_of_process=True)
+    viewer  = DashPlotter(make_test_config())
+    folds   = []
+
+    def _fold_failing_once(plotter, records):
+        folds.append(len(records))
+        if len(folds) == 1:
+            raise ValueError("bad batch")
+        fold_ring_records(plotter, records)
+
+    monkeypatch.setattr(dashprocess, "fold_ring_records", _fold_failing_once)
+    output = io.StringIO()
+    stop   = drain_ring(viewer, outproc._ring, interval=0.01)
+    try:
+        with contextlib.redirect_stdout(output):
+            for i in range(20):
+                outproc.add_data(1, 0, i, i)
+                time.sleep(0.01)
+            deadline = time.time() + 5.0
+            while (viewer._store.graph1.trc_data[0].length == 0) and (time.time() < deadline):
+                time.sleep(0.01)
+        # the thread is still draining after the failed batch, which is reported once
+        assert len(folds) > 1 and viewer._store.graph1.trc_data[0].length > 0
+        assert output.getvalue().count("warning: could not read the ring buffer") == 1
+    finally:
+        stop.set()
+        outproc._ring.close()
+
+def test_dashboard_process_serves_data():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    plotter = DashPlotter(make_test_config(), out_of_process=True)
+    process = plotter._start_server("127.0.0.1", port)
+    try:
+        plotter.add_batch(1, 0, np.arange(100), np.arange(100))
+
+        # wait for the dashboard process to come up
+        t0 = time.perf_counter()
+        while True:
+            try:
+                layout = urllib.request.urlopen(f"http://127.0.0.1:{port}/_dash-layout").read()
+                break
+            except OSError:
+                assert time.perf_counter() - t0 < 60
+                time.sleep(0.2)
+
+        children   = json.loads(layout)["props"]["children"]
+        session_id = [c for c in children if c["props"].get("id") == "session-id"][0]["props"]["data"]
+        body = update_graphs_body(session_id, ["graph1", "graph2", "graph3"], 1)
+        request  = urllib.request.Request(
+            f"http://127.0.0.1:{port}/_dash-update-component",
+            data    = json.dumps(body).encode(),
+            headers = {"Content-Type": "application/json"},
+        )
+        response = json.loads(urllib.request.urlopen(request).read())
+        ops      = response["response"][dash_id({"type": "graph-card", "index": "graph1"})]["figure"]["operations"]
+        assert [op["params"]["value"] for op in ops if op["location"][-1] == "x"][0] == list(range(100))
+    finally:
+        process.terminate()
+        process.join()
+        plotter._ring.close()
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_ring_wraparound_and_drops()
+    test_ring_across_processes()
+    test_ring_never_returns_overwritten_records()
+    test_fold_matches_in_process()
+    test_drain_survives_bad_batch(pytest.MonkeyPatch())
+    test_dashboard_process_serves_data()
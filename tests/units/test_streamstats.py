@@ -0,0 +1,116 @@
+import os
+import sys
+import dataclasses
+from   pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.utils.streamstats import EMA, RollingMeanStd, QuantileBand, WindowAggregator, derive_traces
+from mldashboard.plotter import DashPlotter
+from mldashboard.containers.setupconfig import Config, TraceConfig
+
+from helpers import make_test_config, make_stats_config
+
+
+def test_stats_match_reference():
+    rng = np.random.default_rng(0)
+    ys  = rng.normal(size=5_000)
+
+    # debiased ema
+    ema, _, _ = EMA(0.8).extend(ys)
+    biased    = np.zeros(len(ys))
+    for i, y in enumerate(ys):
+        biased[i] = 0.8 * (biased[i-1] if i > 0 else 0.0) + 0.2 * y
+    assert np.allclose(ema, biased / (1 - 0.8**np.arange(1, len(ys) + 1)))
+
+    # rolling mean / std, without re-summing the window
+    mean, lo, hi = RollingMeanStd(20).extend(ys)
+    windows      = np.lib.stride_tricks.sliding_window_view(ys, 20)
+    assert np.allclose(mean[19:], windows.mean(axis=1))
+    assert np.allclose((hi - lo)[19:] / 2, windows.std(axis=1, ddof=1))
+
+    # P² quantiles are estimates, but close for a few thousand points
+    mid, lo, hi = QuantileBand((0.1, 0.5, 0.9)).extend(ys)
+    assert np.allclose([lo[-1], mid[-1], hi[-1]], np.quantile(ys, [0.1, 0.5, 0.9]), atol=0.05)
+
+def test_stats_skip_nans():
+    stat = RollingMeanStd(3)
+    mean, _, _ = stat.extend(np.array([1.0, np.nan, 3.0, np.inf, 5.0]))
+    assert np.array_equal(mean, [1.0, 1.0, 2.0, 2.0, 3.0])
+    assert np.isnan(EMA(0.5).push(np.nan)[0])
+
+def test_derived_traces():
+    CONFIG, plan = derive_traces(make_stats_config())
+    assert [t.name for t in CONFIG.graph1.traces] == ["loss", "valid", "loss ema", "loss mean20", "loss p50"]
+    assert [t.errors for t in CONFIG.graph1.traces[2:]] == [False, True, True]
+    assert [t_derived for t_derived, _ in plan[(1, 0)]] == [2, 3, 4]
+    # already expanded configs stay as they are (replay of run logs, dashboard process)
+    assert derive_traces(CONFIG) == (CONFIG, {})
+
+    # add_data and add_batch give the same derived values
+    single  = DashPlotter(make_stats_config())
+    batched = DashPlotter(make_stats_config())
+    ys      = np.random.default_rng(1).normal(size=200)
+    for i, y in enumerate(ys):
+        single.add_data(1, 0, i, y)
+    batched.add_batch(1, 0, np.arange(100), ys[:100])
+    batched.add_batch(1, 0, np.arange(100, 200), ys[100:])
+    for t_nr, columns in [(2, ["y"]), (3, ["y", "ylo", "yhi"]), (4, ["y", "ylo", "yhi"])]:
+        for column in columns:
+            assert np.allclose(getattr(single._store.graph1.trc_data[t_nr], column),
+                               getattr(batched._store.graph1.trc_data[t_nr], column))
+    assert np.allclose(single._store.graph1.trc_data[3].y[-1], ys[-20:].mean())
+
+def test_window_aggregation():
+    rng = np.random.default_rng(2)
+    x   = np.arange(1_000.0)
+    y   = rng.normal(size=1_000)
+
+    # point windows, single values and uneven batches give the same windows
+    for band in ["std", "minmax", "quantiles"]:
+        agg     = WindowAggregator(window=64, band=band)
+        single  = [agg.push(xi, yi) for xi, yi in zip(x, y)]
+        single  = np.array([w for w in single if w is not None])
+        batched = WindowAggregator(window=64, band=band)
+        parts   = [batched.extend(x[a:b], y[a:b]) for a, b in [(0, 10), (10, 300), (300, 301), (301, 1_000)]]
+        batched = np.column_stack([np.concatenate(cols) for cols in zip(*parts)])
+        assert np.allclose(single, batched)
+        assert len(batched) == 1_000 // 64
+
+    windows = y[:15*64].reshape(15, 64)
+    assert np.allclose(batched[:, 0], x[63:15*64:64])
+    assert np.allclose(batched[:, 1], windows.mean(axis=1))
+    assert np.allclose(batched[:, 2], np.quantile(windows, 0.1, axis=1))
+
+    # x-buckets only close when the next bucket starts
+    agg = WindowAggregator(xbucket=100.0)
+    xs, means, lo, hi = agg.extend(x[:250], y[:250])
+    assert np.array_equal(xs, [99.0, 199.0])
+    assert np.allclose(hi - means, y[:200].reshape(2, 100).std(axis=1, ddof=1))
+    assert agg.push(260.0, 1.0) is None
+    assert agg.push(300.0, 1.0)[0] == 260.0
+
+def test_plotter_aggregates():
+    CONFIG  = make_test_config()
+    G_CFG   = dataclasses.replace(CONFIG.graph3, traces=[TraceConfig("grad norm", "red", window=10, ema=True)])
+    plotter = DashPlotter(Config(**{**CONFIG.graphs, "graph3": G_CFG}))
+    assert plotter._CONFIG.graph3.traces[0].errors is True
+
+    for i in range(25):
+        plotter.add_data(3, 0, i, float(i))
+    trace = plotter._store.graph3.trc_data[0]
+    assert np.array_equal(trace.x, [9, 19]) and np.array_equal(trace.y, [4.5, 14.5])
+    assert np.allclose(trace.yhi - trace.y, np.std(np.arange(10), ddof=1))
+    # the statistics follow the aggregated points
+    assert plotter._store.graph3.trc_data[1].length == 2
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_stats_match_reference()
+    test_stats_skip_nans()
+    test_derived_traces()
+    test_window_aggregation()
+    test_plotter_aggregates()
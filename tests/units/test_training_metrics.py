@@ -0,0 +1,50 @@
+import os
+import sys
+from   pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.utils.training_metrics import calc_net_weightnorm
+from mldashboard.utils.training_metrics import calc_net_gradnorm
+from mldashboard.utils.training_metrics import calc_adam_rates
+from mldashboard.utils.training_metrics import calc_net_stats
+
+
+def test_net_stats_matches_single_metrics():
+    torch.manual_seed(0)
+    net = nn.Sequential(nn.Linear(5, 7), nn.ReLU(), nn.Linear(7, 1))
+    net[0].bias.requires_grad_(False)
+    opt = torch.optim.Adam(net.parameters(), lr=1e-3)
+    
+    # before the first backward / step, only the weight norm is available
+    stats = calc_net_stats(net, opt)
+    assert np.isclose(stats["weightnorm"], calc_net_weightnorm(net))
+    assert stats["gradnorm"] is None and stats["adam_lr"] is None and stats["adam_udr"] is None
+    
+    for _ in range(3):
+        net(torch.randn(16, 5)).pow(2).mean().backward()
+        opt.step()
+    
+    stats = calc_net_stats(net, opt)
+    assert np.isclose(stats["weightnorm"], calc_net_weightnorm(net))
+    assert np.isclose(calc_net_stats(net, only_trainable=True)["weightnorm"], calc_net_weightnorm(net, True))
+    assert np.isclose(stats["gradnorm"], calc_net_gradnorm(net))
+    assert np.allclose([stats["adam_lr"], stats["adam_udr"]], calc_adam_rates(net, opt))
+
+def test_net_stats_as_tensor():
+    net = nn.Linear(3, 2)
+    net(torch.randn(4, 3)).sum().backward()
+    
+    stats = calc_net_stats(net, as_tensor=True)
+    assert isinstance(stats["weightnorm"], torch.Tensor) and stats["weightnorm"].dim() == 0
+    assert isinstance(stats["gradnorm"], torch.Tensor)
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+    
+    test_net_stats_matches_single_metrics()
+    test_net_stats_as_tensor()
@@ -0,0 +1,100 @@
+import os
+import sys
+from   pathlib import Path
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.plotter import DashPlotter
+from mldashboard.containers.transferqueue import TransferQueue
+from mldashboard.utils.training_metrics import calc_net_gradnorm
+from mldashboard.utils.training_metrics import calc_net_weightnorm
+
+from helpers import make_test_config
+
+
+def _log_steps(plotter: DashPlotter, n_steps: int):
+    """ logs a mix of tensors, numpy values and python floats like a training loop would """
+    
+    torch.manual_seed(0)
+    net = nn.Linear(4, 1)
+    for step in range(n_steps):
+        loss = net(torch.randn(8, 4)).pow(2).mean()
+        loss.backward()
+        
+        plotter.add_data(1, 0, step, loss, loss.detach()*0.1, torch.tensor(0.2))
+        plotter.add_data(1, 1, step, calc_net_gradnorm(net, as_tensor=True))
+        plotter.add_data(2, 0, step, np.float32(step % 7))
+        plotter.add_batch(3, 0, [2*step, 2*step+1], torch.tensor([1.0, 2.0]) * step)
+        plotter.add_data(2, 1, step, calc_net_weightnorm(net, as_tensor=True))
+        net.zero_grad()
+
+def _assert_same_store(plotter_a: DashPlotter, plotter_b: DashPlotter):
+    for g_nr, t_nr in [(1, 0), (1, 1), (2, 0), (2, 1), (3, 0)]:
+        trc_a = getattr(plotter_a._store, f"graph{g_nr}").trc_data[t_nr]
+        trc_b = getattr(plotter_b._store, f"graph{g_nr}").trc_data[t_nr]
+        assert trc_a.length == trc_b.length > 0
+        assert np.array_equal(trc_a.x, trc_b.x)
+        assert np.allclose(trc_a.y, trc_b.y)
+        assert (trc_a.ymin, trc_a.ymax) == (trc_b.ymin, trc_b.ymax)
+        if trc_a.ylo is not None:
+            assert np.allclose(trc_a.ylo, trc_b.ylo) and np.allclose(trc_a.yhi, trc_b.yhi)
+
+def test_deferred_every_n_matches_immediate():
+    immediate = DashPlotter(make_test_config())
+    deferred  = DashPlotter(make_test_config(), defer_transfer=7)
+    
+    _log_steps(immediate, 50)
+    _log_steps(deferred,  50)
+    
+    # nothing of the last, incomplete chunk is in the store before flushing
+    assert deferred._store.graph1.trc_data[0].length < 50
+    deferred.flush()
+    _assert_same_store(immediate, deferred)
+
+def test_deferred_background_thread():
+    immediate = DashPlotter(make_test_config())
+    deferred  = DashPlotter(make_test_config(), defer_transfer=True)
+    
+    _log_steps(immediate, 50)
+    _log_steps(deferred,  50)
+    
+    # the background thread has to pick everything up on its own
+    t_start = time.perf_counter()
+    while deferred._store.graph2.trc_data[1].length < 50 and time.perf_counter() - t_start < 5:
+        time.sleep(0.05)
+    _assert_same_store(immediate, deferred)
+
+def test_queue_clones_tensors():
+    received = []
+    queue    = TransferQueue(lambda *args: received.append(args))
+    
+    running = torch.zeros(1)
+    for step in range(3):
+        running += 1 # in-place, the queued values must not change afterwards
+        queue.put(1, 0, step, running)
+    queue.flush()
+    
+    assert len(received) == 1
+    g_nr, t_nr, x, y, yerrLo, yerrHi = received[0]
+    assert np.array_equal(y, [1, 2, 3]) and yerrLo is None
+
+def test_gradnorm_as_tensor():
+    net = nn.Linear(4, 1)
+    net(torch.randn(8, 4)).sum().backward()
+    
+    assert isinstance(calc_net_gradnorm(net, as_tensor=True), torch.Tensor)
+    assert np.isclose(calc_net_gradnorm(net, as_tensor=True).item(), calc_net_gradnorm(net))
+    assert np.isclose(calc_net_weightnorm(net, as_tensor=True).item(), calc_net_weightnorm(net))
+    
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+    
+    test_deferred_every_n_matches_immediate()
+    test_deferred_background_thread()
+    test_queue_clones_tensors()
+    test_gradnorm_as_tensor()
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import subprocess
+from   pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.containers.runlog import RunLogWriter, load_run_log
+from mldashboard.dash.components.callbacks import callback_generate_flexgraph_patch
+from mldashboard.dash.components.sessions import SessionCursors
+from mldashboard.plotter import DashPlotter
+from mldashboard.viewer import follow_run_log, main
+import mldashboard.viewer as viewer_module
+
+from helpers import make_test_config
+
+
+# a viewer is a separate program, not a child of the training process
+VIEWER_SCRIPT = """
+import sys
+from mldashboard.viewer import attach_ring
+from mldashboard.dash.dashprocess import fold_ring_records
+plotter, ring = attach_ring(sys.argv[1])
+fold_ring_records(plotter, ring.read())
+print(len(plotter._CONFIG), plotter._store.graph1.trc_data[0].x.tolist())
+"""
+
+def test_headless_follow_log(tmp_path):
+    path = str(tmp_path / "run.h5")
+    live = DashPlotter(make_test_config(), log_path=path, headless=True)
+    assert live._app is None
+    with pytest.raises(ValueError):
+        live.run_script()
+
+    live.add_batch(1, 0, np.arange(10), np.arange(10.0))
+    live.flush()
+    viewer = DashPlotter.from_log(path)
+    viewer._app # the app is built on first use, its figures register the plotly ids of the traces
+    G_CFG    = viewer._CONFIG.graph1
+    sessions = SessionCursors(viewer._CONFIG)
+    with sessions.checkout("tab", "graph1") as cursors:
+        callback_generate_flexgraph_patch(G_CFG, viewer._store.graph1, cursors)
+
+    # following the log only sends the new points, and no range without a new min / max
+    live.add_batch(1, 0, np.arange(10, 15), np.full(5, 5.0))
+    live.flush()
+    viewer._attach_log(load_run_log(path)[1])
+    with sessions.checkout("tab", "graph1") as cursors:
+        patch = callback_generate_flexgraph_patch(G_CFG, viewer._store.graph1, cursors)
+    operations = patch.to_plotly_json()["operations"]
+    main_id    = viewer._store.graph1.trc_t2id[0].main
+    new_x      = [op["params"]["value"] for op in operations if op["location"] == ["data", main_id, "x"]]
+    assert new_x == [[10, 11, 12, 13, 14]]
+    assert not any(op["location"][0] == "layout" for op in operations)
+
+def test_follow_growing_log(tmp_path, monkeypatch):
+    path   = str(tmp_path / "run.h5")
+    writer = RunLogWriter(path, make_test_config(), flush_interval=0.01)
+    writer.put(1, 0, 0.0, 0.0, -1.0, 1.0)
+    writer.flush()
+    viewer = DashPlotter.from_log(path)
+
+    # reloads that fail (e.g. a read in the middle of a flush) do not end the follower, it tries again next time
+    failures = iter([TypeError("no offset"), ValueError("mmap length is greater than file size")])
+    def flaky_load_run_log(path: str, **kwargs):
+        err = next(failures, None)
+        if err is not None:
+            raise err
+        return load_run_log(path, **kwargs)
+    monkeypatch.setattr(viewer_module, "load_run_log", flaky_load_run_log)
+
+    stop = follow_run_log(viewer, path, interval=0.01)
+    try:
+        trace = viewer._store.graph1.trc_data[0]
+        for i in range(1, 100): # grows the columns a few times while they are followed
+            x = np.arange(1000 * i - 999, 1000 * i + 1, dtype=np.float64)
+            writer.put(1, 0, x, -x, -x - 1, -x + 1)
+            time.sleep(0.002)
+            snap = trace.snapshot()
+            assert np.array_equal(snap.x, np.arange(snap.length)) and np.array_equal(snap.y, -snap.x)
+            assert np.array_equal(snap.ylo, -snap.x - 1) and np.array_equal(snap.yhi, -snap.x + 1)
+        writer.flush()
+
+        deadline = time.monotonic() + 10
+        while (trace.length < 99_001) and (time.monotonic() < deadline):
+            time.sleep(0.01)
+        assert np.array_equal(trace.x, np.arange(99_001.0)) and np.array_equal(trace.y, -trace.x)
+        assert next(failures, None) is None
+    finally:
+        stop.set()
+        writer.close()
+
+def test_attach_to_headless_ring():
+    live = DashPlotter(make_test_config(), out_of_process=True, headless=True)
+    try:
+        live.add_batch(1, 0, np.arange(5), np.arange(5.0))
+        result = subprocess.run(
+            [sys.executable, "-c", VIEWER_SCRIPT, live.ring_name],
+            capture_output = True,
+            text           = True,
+            check          = True,
+            cwd            = Path(__file__).resolve().parents[2],
+        )
+        assert result.stdout.split(maxsplit=1) == ["3", "[0.0, 1.0, 2.0, 3.0, 4.0]\n"]
+    finally:
+        live._ring.close()
+
+def test_viewer_arguments():
+    with pytest.raises(SystemExit):
+        main(["run.h5", "--attach", "ring"])
+    with pytest.raises(SystemExit):
+        main([])
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+
+    import tempfile
+    test_headless_follow_log(Path(tempfile.mkdtemp()))
+    test_follow_growing_log(Path(tempfile.mkdtemp()), pytest.MonkeyPatch())
+    test_attach_to_headless_ring()
+    test_viewer_arguments()
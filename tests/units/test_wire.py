@@ -0,0 +1,105 @@
+import os
+import sys
+import base64
+import dataclasses
+from   pathlib import Path
+
+import numpy as np
+import pytest
+from   dash import no_update
+
+sys.path.insert(0, os.path.normcase(Path(__file__).resolve().parents[2]))
+from mldashboard.dash.components.wire import PatchWriter, encode_typed_array
+from mldashboard.dash.components.callbacks import callback_generate_flexgraph_patch
+from mldashboard.plotter import DashPlotter
+from mldashboard.containers.setupconfig import Config
+from mldashboard.containers.datastore import TraceCursor
+
+from helpers import make_test_config
+
+
+def _decode(value) -> list:
+    """ python version of the clientside decoder (assets/wire.js) """
+    if isinstance(value, dict) and ("bdata" in value):
+        return np.frombuffer(base64.b64decode(value["bdata"]), dtype=f"<{value['dtype']}").tolist()
+    return value
+
+def _applied_values(result) -> list:
+    """ (operation, location, decoded value) of a json patch or a binary wire payload """
+    ops = result["operations"] if isinstance(result, dict) else result.to_plotly_json()["operations"]
+    return sorted((op["operation"], str(op["location"]), _decode(op["params"]["value"])) for op in ops)
+
+def test_typed_array_roundtrip():
+    values = np.array([0.0, -1.5, 1e300, np.nan, np.inf, 3.0])
+
+    spec = encode_typed_array(values, "f8")
+    assert np.array_equal(np.array(_decode(spec)), values, equal_nan=True)
+    # float32 is exact for values it can represent
+    spec = encode_typed_array(values[[0, 1, 5]], "f4")
+    assert _decode(spec) == [0.0, -1.5, 3.0]
+    # non-contiguous views are fine
+    assert _decode(encode_typed_array(np.arange(10.0)[::3], "f8")) == [0.0, 3.0, 6.0, 9.0]
+
+def test_patch_writer():
+    with pytest.raises(ValueError):
+        PatchWriter("msgpack")
+
+    # nothing changed: binary transports skip the clientside round
+    assert PatchWriter("binary64").result() is no_update
+
+    for transport in ["json", "binary64"]:
+        writer = PatchWriter(transport)
+        writer.extend_array(["data", 0, "x"], np.arange(3.0))
+        writer.assign_array(["data", 1, "y"], np.ones(2))
+        writer["layout"]["annotations"][0]["visible"] = True
+        assert _applied_values(writer.result()) == [
+            ("Assign", "['data', 1, 'y']", [1.0, 1.0]),
+            ("Assign", "['layout', 'annotations', 0, 'visible']", True),
+            ("Extend", "['data', 0, 'x']", [0.0, 1.0, 2.0]),
+        ]
+
+@pytest.mark.parametrize("nxdown", [False, 100])
+def test_binary_matches_json(nxdown):
+    CONFIG  = make_test_config()
+    results = {}
+    for transport in ["json", "binary64"]:
+        G_CFG   = dataclasses.replace(CONFIG.graph1, nxdown=nxdown, transport=transport)
+        plotter = DashPlotter(Config(G_CFG, CONFIG.graph2, CONFIG.graph3))
+        x = np.arange(5_000)
+        plotter.add_batch(1, 0, x, np.sin(x / 100), 0.1, 0.2)
+        plotter.add_batch(1, 1, x, np.cos(x / 100))
+
+        cursors = [TraceCursor(), TraceCursor()]
+        result  = callback_generate_flexgraph_patch(G_CFG, plotter._store.graph1, cursors)
+        results[transport] = (_applied_values(result), [cursor.chkp for cursor in cursors])
+
+    assert results["json"] == results["binary64"]
+
+def test_binary32_keeps_x_exact():
+    # step counts past 2**24 are not representable in float32, neighbouring steps would share one x
+    x = 2.0**24 + np.arange(4.0)
+    y = np.array([0.1, 0.2, 0.3, 0.4])
+    writer = PatchWriter("binary32")
+    writer.extend_array(["data", 0, "x"], x)
+    writer.extend_array(["data", 0, "y"], y)
+    x_op, y_op = writer.result()["operations"]
+    assert (x_op["params"]["value"]["dtype"], y_op["params"]["value"]["dtype"]) == ("f8", "f4")
+    assert _decode(x_op["params"]["value"]) == x.tolist()
+    assert _decode(y_op["params"]["value"]) == y.astype(np.float32).tolist()
+
+def test_invalid_transport():
+    CONFIG = make_test_config()
+    G_CFG  = dataclasses.replace(CONFIG.graph1, transport="xml")
+    with pytest.raises(ValueError):
+        DashPlotter(Config(G_CFG, CONFIG.graph2, CONFIG.graph3))
+
+
+if __name__ == "__main__":
+    os.system("cls" if os.name=="nt" else "clear")
+
+    test_typed_array_roundtrip()
+    test_patch_writer()
+    test_binary_matches_json(False)
+    test_binary_matches_json(100)
+    test_binary32_keeps_x_exact()
+    test_invalid_transport()